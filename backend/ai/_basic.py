@@ -1,8 +1,10 @@
 from enum import Enum
+from typing import List
 
 from pydantic import BaseModel, Field
 
-from common import chat_client, chat_model, chat_vlm_model, s3_operator
+from common import (chat_client, chat_model, chat_vlm_model, s3_operator,
+                    settings)
 
 
 class AlgoType(Enum):
@@ -16,6 +18,61 @@ class AlgoConfig(BaseModel):
     algo_type: AlgoType = Field(AlgoType.video)
     duration_in_sec: int = Field(60)  # 每过60秒保存一次结果，对音视频类数据处理有效
     bndbox_threshold: float = Field(0.5)  # 重叠阈值， 对视频处理有效
+    reid_batch_size: int = Field(32)  # ReID 单次批量推理的最大图像数量
+    decode_queue_size: int = Field(32)  # 解码 → 检测 队列深度
+    detect_queue_size: int = Field(32)  # 检测 → 跟踪 队列深度
+    reid_workers: int = Field(8)  # ReID 推理线程数
+    reid_queue_size: int = Field(16)  # 等待 ReID 推理的最大批次数
+    detect_stride: int = Field(1)  # 每隔多少帧检测一次, 其余帧只 grab 不解码
+    motion_threshold: float = Field(0.0)  # 运动门控的变化像素占比阈值, 0 表示不启用
+    motion_pixel_threshold: int = Field(25)  # 像素灰度变化超过该值才计为运动
+    detect_backend: str = Field("ultralytics")  # 检测后端: ultralytics / onnx
+    detect_batch_size: int = Field(1)  # 单次检测推理的帧数
+    detect_imgsz: int = Field(640)  # 检测输入分辨率
+    analysis_height: int = Field(0)  # 检测和跟踪使用的分辨率 (高度), 0 表示原始分辨率
+    detect_classes: List[int] = Field([0])  # 推理时只保留的 COCO 类别, 默认只保留行人
+    segment_workers: int = Field(1)  # 分段并行分析的进程数, 1 表示不分段
+    # 相邻分段重叠的秒数, 应不小于 tracker 丢失缓冲时长
+    segment_overlap_sec: float = Field(3.0)
+    min_segment_sec: float = Field(60.0)  # 每段最短秒数, 视频较短时减少分段数
+    # 视频输入: cache 下载到本地缓存 / url 从预签名 URL 直接解码 / auto
+    input_mode: str = Field("cache")
+    # auto 模式下超过该大小且未缓存的视频直接从 URL 解码
+    url_min_size_mb: int = Field(256)
+    # 实时流的目标延迟, 缓冲中超过该时长的帧直接丢弃
+    live_latency_sec: float = Field(2.0)
+    live_report_sec: float = Field(1.0)  # 实时流每隔多少秒推送一次当前轨迹和统计
+    live_reconnect_attempts: int = Field(5)  # 实时流读取失败时的连续重连次数上限
+    reid_interval_sec: int = Field(1)  # 每隔多少秒刷新一次对象的 ReID 特征
+    live_adaptive_quality: bool = Field(True)  # 实时流处理跟不上时自动降低分析质量
+    live_min_analysis_height: int = Field(360)  # 自动降低质量时分析分辨率 (高度) 的下限
+    live_max_detect_stride: int = Field(4)  # 自动降低质量时检测间隔的上限
+    live_max_reid_interval_sec: int = Field(4)  # 自动降低质量时 ReID 刷新间隔的上限
+    # 同一进程内多路流合并检测的最大帧数, 0 表示不合并
+    shared_detect_batch_size: int = Field(0)
+    shared_detect_max_delay_ms: float = Field(20.0)  # 合并检测时请求最多等待的毫秒数
+
+
+class OrtSessionProfile(BaseModel):
+    """ONNX Runtime 会话配置, 默认从环境变量 (settings) 读取"""
+
+    intra_op_threads: int = Field(0)  # 0 表示由 ONNX Runtime 决定
+    inter_op_threads: int = Field(0)
+    graph_optimization: str = Field("all")  # disable / basic / extended / all
+    enable_mem_arena: bool = Field(True)
+    io_binding: bool = Field(False)
+    int8: bool = Field(False)  # 优先加载 INT8 量化模型
+
+    @classmethod
+    def from_settings(cls) -> "OrtSessionProfile":
+        return cls(
+            intra_op_threads=settings.reid_intra_op_threads,
+            inter_op_threads=settings.reid_inter_op_threads,
+            graph_optimization=settings.reid_graph_optimization,
+            enable_mem_arena=settings.reid_enable_mem_arena,
+            io_binding=settings.reid_io_binding,
+            int8=settings.reid_int8,
+        )
 
 
 class BasicAlgo:
@@ -0,0 +1,196 @@
+""" 多路流共享的批量检测服务: 汇集同一进程内多路流的待检测帧, 合并为一批推理后分发回各路流
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional
+
+import numpy as np
+import supervision as sv
+
+from common import logger
+
+
+class _Request:
+    __slots__ = ("stream_id", "frames", "future", "submitted_at")
+
+    def __init__(self, stream_id: int, frames: List[np.ndarray]):
+        self.stream_id = stream_id
+        self.frames = frames
+        self.future: Future = Future()
+        self.submitted_at = time.monotonic()
+
+
+class BatchedDetector:
+    """
+    多路流共享的批量检测服务
+
+    每路流在自己的检测阶段调用 detect() 提交一批帧并等待结果, 后台线程把各路流的请求
+    合并为一次推理, 结果按请求拆分后返回, 各路流仍交给自己的 tracker 处理。
+
+    - 凑满 max_batch 帧、或最早的请求已等待 max_delay 秒、或所有已注册的流都在等待时立即推理
+    - 各路流轮流取请求 (每次从上一批没有轮到的流开始), 一批放不下时留到下一批,
+      帧数多的流不会挤占其他流
+    - 单个请求超过 max_batch 帧时单独成批, 不拆分
+    """
+
+    def __init__(
+        self,
+        detect: Callable[[List[np.ndarray]], List[sv.Detections]],
+        max_batch: int = 16,
+        max_delay: float = 0.02,
+    ):
+        """
+        Args:
+            detect: 批量推理函数, 输入帧列表, 按顺序返回检测结果
+            max_batch: 单次推理的最大帧数
+            max_delay: 请求最多等待多少秒以凑成更大的批
+        """
+        self._detect = detect
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._pending: "OrderedDict[int, Deque[_Request]]" = OrderedDict()
+        self._streams: Dict[int, int] = {}  # 已注册的流 → 累计检测帧数
+        self._ids = itertools.count(1)
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.frames = 0
+        self.wait_seconds = 0.0  # 请求从提交到开始推理的累计等待时间
+        self.infer_seconds = 0.0
+
+    def register(self) -> int:
+        """注册一路流, 返回流标识, 不再检测时调用 unregister"""
+        with self._cond:
+            stream_id = next(self._ids)
+            self._streams[stream_id] = 0
+            self._pending[stream_id] = deque()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="batched-detector", daemon=True
+                )
+                self._thread.start()
+            return stream_id
+
+    def unregister(self, stream_id: int) -> None:
+        with self._cond:
+            self._streams.pop(stream_id, None)
+            requests = self._pending.pop(stream_id, None)
+            # 流已注销, 剩余请求不再推理; 其他流可能都在等它, 唤醒调度线程重新判断
+            self._cond.notify_all()
+        for request in requests or ():
+            request.future.cancel()
+
+    def detect(self, stream_id: int, frames: List[np.ndarray]) -> List[sv.Detections]:
+        """
+        提交一路流的一批帧并等待检测结果
+
+        Args:
+            stream_id: register 返回的流标识
+            frames: 待检测的帧
+
+        Returns:
+            List[sv.Detections]: 与 frames 顺序一致
+        """
+        if not frames:
+            return []
+        request = _Request(stream_id, frames)
+        with self._cond:
+            if stream_id not in self._pending:
+                raise RuntimeError(f"流 {stream_id} 未注册")
+            self._pending[stream_id].append(request)
+            self._cond.notify_all()
+        return request.future.result()
+
+    def stats(self) -> dict:
+        """批量推理统计: 平均批大小、请求平均等待和推理耗时、各路流的检测帧数"""
+        with self._cond:
+            n = self.batches
+            return {
+                "streams": len(self._streams),
+                "batches": n,
+                "frames": self.frames,
+                "avg_batch": round(self.frames / n, 2) if n else None,
+                "avg_wait_ms": round(self.wait_seconds / n * 1000, 1) if n else None,
+                "avg_infer_ms": round(self.infer_seconds / n * 1000, 1) if n else None,
+                "stream_frames": dict(self._streams),
+            }
+
+    def _ready(self, now: float) -> bool:
+        """是否应当立即推理, 调用方持有锁"""
+        waiting = [q for q in self._pending.values() if q]
+        if not waiting:
+            return False
+        if sum(len(r.frames) for q in waiting for r in q) >= self.max_batch:
+            return True
+        if len(waiting) >= len(self._streams):
+            return True
+        oldest = min(q[0].submitted_at for q in waiting)
+        return now - oldest >= self.max_delay
+
+    def _take(self) -> List[_Request]:
+        """按流轮流取出一批请求, 调用方持有锁"""
+        batch, size, served = [], 0, []
+        progress = True
+        while progress:
+            progress = False
+            for stream_id, queue in self._pending.items():
+                if not queue:
+                    continue
+                frames = len(queue[0].frames)
+                if batch and size + frames > self.max_batch:
+                    continue
+                batch.append(queue.popleft())
+                size += frames
+                served.append(stream_id)
+                progress = True
+                if size >= self.max_batch:
+                    break
+            if size >= self.max_batch:
+                break
+        # 本批取到的流移到队尾, 下一批优先其他流
+        for stream_id in served:
+            if stream_id in self._pending:
+                self._pending.move_to_end(stream_id)
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    if self._ready(now):
+                        break
+                    waiting = [q[0].submitted_at for q in self._pending.values() if q]
+                    timeout = min(waiting) + self.max_delay - now if waiting else None
+                    self._cond.wait(timeout)
+                batch = self._take()
+
+            start = time.monotonic()
+            frames = [frame for request in batch for frame in request.frames]
+            try:
+                detections = self._detect(frames)
+            except Exception as e:
+                logger.error(f"批量检测出错: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            infer = time.monotonic() - start
+
+            offset = 0
+            for request in batch:
+                n = len(request.frames)
+                request.future.set_result(detections[offset : offset + n])
+                offset += n
+            with self._cond:
+                self.batches += 1
+                self.frames += len(frames)
+                self.infer_seconds += infer
+                waits = [start - request.submitted_at for request in batch]
+                self.wait_seconds += sum(waits) / len(waits)
+                for request in batch:
+                    if request.stream_id in self._streams:
+                        self._streams[request.stream_id] += len(request.frames)
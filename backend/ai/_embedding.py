@@ -0,0 +1,168 @@
+""" 追踪对象特征向量库
+"""
+
+import threading
+from typing import Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+
+class EmbeddingBank:
+    """
+    特征向量库
+
+    所有追踪对象的特征向量存放在同一个可扩容的 float32 矩阵中, 通过 id → 行号索引。
+    指数滑动平均 (EMA) 与归一化按批次向量化执行, 相似度查询直接在矩阵上计算,
+    合并与链路构建不再逐个对象收集、重复归一化向量。
+
+    所有读写都在锁内进行, 读取接口返回副本, 可在多个线程间共享。
+    """
+
+    def __init__(self, dim: Optional[int] = None, capacity: int = 256):
+        """
+        Args:
+            dim: 向量维度, 为 None 时由第一次写入的向量决定
+            capacity: 初始行数, 不足时按倍数扩容
+        """
+        self.dim = dim
+        self._capacity = max(1, capacity)
+        self._matrix: Optional[np.ndarray] = (
+            np.zeros((self._capacity, dim), dtype=np.float32) if dim else None
+        )
+        self._rows: Dict[Hashable, int] = {}
+        self._ids: List[Hashable] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, object_id: Hashable) -> bool:
+        return object_id in self._rows
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """按行归一化, 与 ClassTrackerObject._normalize_vector 一致"""
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.where(norms > 1e-6, vectors / (norms + 1e-6), vectors)
+
+    def _ensure_rows(self, object_ids: List[Hashable], dim: int) -> np.ndarray:
+        """返回各 id 对应的行号, 不存在的 id 分配新行 (调用方持有锁)"""
+        if self._matrix is None:
+            self.dim = dim
+            self._matrix = np.zeros((self._capacity, dim), dtype=np.float32)
+        elif dim != self.dim:
+            raise ValueError(f"向量维度 {dim} 与特征库维度 {self.dim} 不一致")
+
+        rows = np.empty(len(object_ids), dtype=np.int64)
+        for i, object_id in enumerate(object_ids):
+            row = self._rows.get(object_id)
+            if row is None:
+                row = len(self._ids)
+                self._rows[object_id] = row
+                self._ids.append(object_id)
+            rows[i] = row
+
+        if len(self._ids) > self._capacity:
+            self._capacity = max(len(self._ids), self._capacity * 2)
+            matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+            matrix[: len(self._matrix)] = self._matrix
+            self._matrix = matrix
+        return rows
+
+    def set(self, object_id: Hashable, vector) -> None:
+        """直接写入某个对象的向量 (不做 EMA 与归一化)"""
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self._lock:
+            row = self._ensure_rows([object_id], len(vector))[0]
+            self._matrix[row] = vector
+
+    def update(
+        self, object_ids: Iterable[Hashable], vectors, alpha: float = 0.7
+    ) -> None:
+        """
+        批量使用指数滑动平均融合新的特征向量
+
+        Args:
+            object_ids: 对象 id 列表
+            vectors: 新的特征向量, shape=(N, D)
+            alpha: 融合系数，取值范围[0,1], alpha 越大越依赖历史特征
+        """
+        object_ids = list(object_ids)
+        if not object_ids:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(object_ids), -1)
+
+        # 同一批次中重复的 id 需要按顺序依次融合
+        if len(set(object_ids)) != len(object_ids):
+            for object_id, vector in zip(object_ids, vectors):
+                self.update([object_id], vector[None], alpha)
+            return
+
+        new = self._normalize(vectors)
+        with self._lock:
+            is_new = np.array([oid not in self._rows for oid in object_ids])
+            rows = self._ensure_rows(object_ids, vectors.shape[1])
+            fused = self._normalize(alpha * self._matrix[rows] + (1 - alpha) * new)
+            # 首次写入的对象直接使用新向量
+            self._matrix[rows] = np.where(is_new[:, None], new, fused)
+
+    def get(self, object_id: Hashable) -> Optional[np.ndarray]:
+        """获取某个对象向量的副本, 不存在时返回 None"""
+        with self._lock:
+            row = self._rows.get(object_id)
+            return None if row is None else self._matrix[row].copy()
+
+    def vectors(self, object_ids: Iterable[Hashable]) -> np.ndarray:
+        """
+        按顺序获取多个对象的向量副本
+
+        Returns:
+            np.ndarray: shape=(N, D), 不存在的 id 对应行为零向量
+        """
+        object_ids = list(object_ids)
+        with self._lock:
+            if self._matrix is None:
+                return np.zeros((len(object_ids), 0), dtype=np.float32)
+            out = np.zeros((len(object_ids), self.dim), dtype=np.float32)
+            rows = [self._rows.get(oid, -1) for oid in object_ids]
+            found = np.array([row >= 0 for row in rows], dtype=bool)
+            if found.any():
+                out[found] = self._matrix[np.array(rows)[found]]
+            return out
+
+    def similarity(
+        self, object_id: Hashable, object_ids: Optional[Iterable[Hashable]] = None
+    ) -> np.ndarray:
+        """
+        某个对象与全部 (或指定) 对象的余弦相似度
+
+        Args:
+            object_id: 查询对象 id
+            object_ids: 比对对象 id 列表, 为 None 时与库中全部对象比对 (按写入顺序)
+
+        Returns:
+            np.ndarray: 相似度数组, 任一向量为零向量或不存在时相似度为 0
+        """
+        query = self.get(object_id)
+        if object_ids is None:
+            with self._lock:
+                targets = (
+                    self._matrix[: len(self._ids)].copy()
+                    if self._matrix is not None
+                    else np.zeros((0, 0), dtype=np.float32)
+                )
+        else:
+            targets = self.vectors(object_ids)
+        if query is None:
+            return np.zeros(len(targets), dtype=np.float32)
+
+        norms = np.linalg.norm(targets, axis=1) * np.linalg.norm(query)
+        dots = targets @ query
+        return np.where(norms > 0, dots / np.where(norms > 0, norms, 1), 0.0).astype(
+            np.float32
+        )
+
+    def ids(self) -> List[Hashable]:
+        """按行号顺序返回所有对象 id"""
+        with self._lock:
+            return list(self._ids)
@@ -0,0 +1,165 @@
+""" 实时流输入: 独立线程读取 RTSP 等实时流, 写入丢弃最旧帧的有界环形缓冲区
+"""
+
+import collections
+import threading
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from common import logger
+
+LIVE_SCHEMES = ("rtsp://", "rtsps://", "rtmp://", "srt://")
+
+
+def is_live_source(path: str) -> bool:
+    return path.lower().startswith(LIVE_SCHEMES)
+
+
+def open_capture(source: str, timeout_ms: int) -> cv2.VideoCapture:
+    """通过 FFmpeg 打开网络视频源, 设置打开和读取的超时时间"""
+    return cv2.VideoCapture(
+        source,
+        cv2.CAP_FFMPEG,
+        [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC,
+            timeout_ms,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC,
+            timeout_ms,
+        ],
+    )
+
+
+class FrameRingBuffer:
+    """
+    有界环形缓冲区, 写满时丢弃最旧的帧, 写入方 (采集线程) 永不阻塞
+
+    元素为 (帧号, 采集时间 time.monotonic(), 帧)
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._frames: collections.deque = collections.deque(maxlen=self.capacity)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0  # 缓冲区写满时丢弃的帧数
+
+    def put(self, item: Tuple[int, float, np.ndarray]) -> None:
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float = None) -> Optional[Tuple[int, float, np.ndarray]]:
+        """取出最旧的一帧, 超时或缓冲区已关闭且为空时返回 None"""
+        with self._cond:
+            if not self._frames and not self._closed:
+                self._cond.wait(timeout)
+            return self._frames.popleft() if self._frames else None
+
+    def close(self) -> None:
+        """不再写入, 已缓冲的帧仍可读取"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def finished(self) -> bool:
+        """已关闭且所有帧都已读取"""
+        with self._cond:
+            return self._closed and not self._frames
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+
+class LiveReader(threading.Thread):
+    """
+    实时流采集线程
+
+    持续从视频源读取帧写入环形缓冲区, 处理速度跟不上时由缓冲区丢弃最旧的帧, 采集不受影响。
+    帧号按读取顺序从 1 递增 (包括被丢弃的帧), 与离线分析一致;
+    跳帧检测时不需要检测的帧只 grab() 不解码, 也不写入缓冲区。
+    读取失败时按指数退避重连, 连续失败超过 reconnect_attempts 次后结束。
+    """
+
+    def __init__(
+        self,
+        source: str,
+        video: cv2.VideoCapture,
+        buffer: FrameRingBuffer,
+        stride: int = 1,
+        reconnect_attempts: int = 5,
+        timeout_ms: int = 10000,
+        realtime_fps: float = 0.0,
+    ):
+        """
+        Args:
+            source: 视频源地址, 重连时使用
+            video: 已打开的 VideoCapture, 由采集线程接管并在结束时释放
+            buffer: 环形缓冲区
+            stride: 每隔多少帧写入一帧
+            reconnect_attempts: 连续重连次数上限, 0 表示不重连
+            timeout_ms: 重连时的打开和读取超时时间
+            realtime_fps: 大于 0 时按该帧率限速读取, 用本地文件模拟实时流
+        """
+        super().__init__(name="live-reader", daemon=True)
+        self.source = source
+        self.video = video
+        self.buffer = buffer
+        self.stride = max(1, stride)
+        self.reconnect_attempts = reconnect_attempts
+        self.timeout_ms = timeout_ms
+        self.realtime_fps = realtime_fps
+        self.frame_id = 0  # 已读取的帧数
+        self.reconnects = 0
+        self._stop_event = threading.Event()
+
+    def stop(self, timeout: float = 15) -> None:
+        self._stop_event.set()
+        if self.ident is not None:
+            self.join(timeout=timeout)
+
+    def run(self) -> None:
+        interval = 1 / self.realtime_fps if self.realtime_fps > 0 else 0
+        next_at = time.monotonic()
+        failures = 0
+        try:
+            while not self._stop_event.is_set():
+                if interval:
+                    next_at += interval
+                    delay = next_at - time.monotonic()
+                    if delay > 0 and self._stop_event.wait(delay):
+                        break
+
+                if self.frame_id % self.stride:
+                    ok, frame = self.video.grab(), None
+                else:
+                    ok, frame = self.video.read()
+                if ok:
+                    failures = 0
+                    self.frame_id += 1
+                    if frame is not None:
+                        self.buffer.put((self.frame_id, time.monotonic(), frame))
+                    continue
+
+                failures += 1
+                if failures > self.reconnect_attempts:
+                    logger.info(f"实时流已结束: {self.source}")
+                    break
+                backoff = min(2 ** (failures - 1), 10)
+                logger.warning(f"实时流读取失败, {backoff}s 后第 {failures} 次重连: {self.source}")
+                if self._stop_event.wait(backoff):
+                    break
+                self.video.release()
+                self.video = open_capture(self.source, self.timeout_ms)
+                self.reconnects += 1
+                next_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"实时流采集出错: {e}")
+        finally:
+            self.video.release()
+            self.buffer.close()
@@ -0,0 +1,185 @@
+""" 多阶段流水线: 各阶段运行在独立线程中, 通过有界队列串联
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from common import logger
+
+_END = object()  # 流结束标记
+
+
+class PipelineStage(threading.Thread):
+    """
+    流水线阶段
+
+    从 in_queue 取数据, 经 fn 处理后放入 out_queue。fn 返回 None 时丢弃该条数据。
+    单线程消费保证输出顺序与输入一致。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        in_queue: "queue.Queue",
+        out_queue: "queue.Queue",
+        stop_event: threading.Event,
+    ):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.error: Optional[BaseException] = None
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                item = _get(self.in_queue, self.stop_event)
+                if item is _END:
+                    break
+                result = self.fn(item)
+                if result is not None:
+                    _put(self.out_queue, result, self.stop_event)
+        except BaseException as e:
+            self.error = e
+            self.stop_event.set()
+            logger.error(f"流水线阶段 {self.name} 出错: {e}")
+        finally:
+            _put(self.out_queue, _END, self.stop_event, force=True)
+
+
+class SourceStage(PipelineStage):
+    """流水线的数据源阶段, 迭代 source 并放入 out_queue"""
+
+    def __init__(
+        self,
+        name: str,
+        source: Callable[[], Iterable[Any]],
+        out_queue: "queue.Queue",
+        stop_event: threading.Event,
+    ):
+        super().__init__(name, None, None, out_queue, stop_event)
+        self.source = source
+
+    def run(self):
+        try:
+            for item in self.source():
+                if self.stop_event.is_set():
+                    break
+                _put(self.out_queue, item, self.stop_event)
+        except BaseException as e:
+            self.error = e
+            self.stop_event.set()
+            logger.error(f"流水线阶段 {self.name} 出错: {e}")
+        finally:
+            _put(self.out_queue, _END, self.stop_event, force=True)
+
+
+class Pipeline:
+    """
+    由数据源和若干处理阶段组成的流水线
+
+    每个阶段之间的队列深度有上限, 下游处理不过来时上游阻塞,
+    内存占用因此有界。迭代 Pipeline 得到最后一个阶段的有序输出,
+    任意阶段出错时在迭代结束后重新抛出。
+
+    示例:
+        pipeline = Pipeline(
+            ("decode", read_frames, 32),
+            [("detect", detect, 32)],
+        )
+        for item in pipeline:
+            ...
+    """
+
+    def __init__(
+        self,
+        source: Tuple[str, Callable[[], Iterable[Any]], int],
+        stages: List[Tuple[str, Callable[[Any], Any], int]],
+    ):
+        """
+        Args:
+            source: (阶段名, 数据源生成函数, 输出队列深度)
+            stages: [(阶段名, 处理函数, 输出队列深度)], 按顺序串联
+        """
+        self.stop_event = threading.Event()
+
+        name, fn, size = source
+        out_queue = queue.Queue(maxsize=max(1, size))
+        self.stages: List[PipelineStage] = [
+            SourceStage(name, fn, out_queue, self.stop_event)
+        ]
+        for name, fn, size in stages:
+            in_queue, out_queue = out_queue, queue.Queue(maxsize=max(1, size))
+            self.stages.append(
+                PipelineStage(name, fn, in_queue, out_queue, self.stop_event)
+            )
+        self.output = out_queue
+        self._started = False
+
+    def start(self) -> "Pipeline":
+        self._started = True
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def __iter__(self) -> Iterator[Any]:
+        if not self._started:
+            self.start()
+        try:
+            while True:
+                item = _get(self.output, self.stop_event)
+                if item is _END:
+                    break
+                yield item
+        finally:
+            self.close()
+
+        for stage in self.stages:
+            if stage.error is not None:
+                raise stage.error
+
+    def queue_depths(self) -> List[Tuple[str, int]]:
+        """各阶段输出队列的当前深度"""
+        return [(stage.name, stage.out_queue.qsize()) for stage in self.stages]
+
+    def close(self, timeout: float = 5) -> None:
+        """停止所有阶段并等待线程退出"""
+        self.stop_event.set()
+        for stage in self.stages:
+            if stage.ident is not None:
+                stage.join(timeout=timeout)
+
+
+def _put(
+    q: "queue.Queue",
+    item: Any,
+    stop_event: threading.Event,
+    force: bool = False,
+    interval: float = 0.1,
+) -> None:
+    """带停止检查的阻塞 put, force=True 时队列已满则丢弃最旧的数据以保证结束标记送达"""
+    while True:
+        try:
+            q.put(item, timeout=interval)
+            return
+        except queue.Full:
+            if stop_event.is_set():
+                if not force:
+                    return
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+def _get(q: "queue.Queue", stop_event: threading.Event, interval: float = 0.1) -> Any:
+    """带停止检查的阻塞 get, 停止后队列为空时返回结束标记"""
+    while True:
+        try:
+            return q.get(timeout=interval)
+        except queue.Empty:
+            if stop_event.is_set():
+                return _END
@@ -0,0 +1,160 @@
+""" 实时流的自适应分析质量: 处理跟不上实时时逐级降低分析质量, 负载下降后逐级恢复
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class QualityLevel(BaseModel):
+    analysis_height: int = Field(0)  # 分析分辨率 (高度), 0 表示原始分辨率
+    detect_stride: int = Field(1)  # 每隔多少帧检测一次
+    reid_interval_sec: int = Field(1)  # 每隔多少秒刷新一次对象的 ReID 特征
+
+
+def build_quality_levels(
+    full: QualityLevel,
+    source_height: int,
+    min_analysis_height: int,
+    max_detect_stride: int,
+    max_reid_interval_sec: int,
+) -> List[QualityLevel]:
+    """
+    生成从全质量到最低质量的等级列表
+
+    每一级只调整一项, 按 ReID 刷新间隔 → 分析分辨率 → 检测间隔 的顺序轮流降低:
+    ReID 刷新对实时轨迹影响最小, 检测间隔影响最大, 放在最后。
+
+    Args:
+        full: 全质量等级, 即 AlgoConfig 中的配置
+        source_height: 视频原始高度, 用于 analysis_height 为 0 时计算缩放
+        min_analysis_height: 分析分辨率下限
+        max_detect_stride: 检测间隔上限
+        max_reid_interval_sec: ReID 刷新间隔上限
+
+    Returns:
+        List[QualityLevel]: 第 0 级为全质量
+    """
+
+    def lower_reid(level: QualityLevel) -> QualityLevel:
+        interval = min(max_reid_interval_sec, level.reid_interval_sec * 2)
+        return level.model_copy(
+            update={"reid_interval_sec": max(level.reid_interval_sec, interval)}
+        )
+
+    def lower_resolution(level: QualityLevel) -> QualityLevel:
+        height = level.analysis_height or source_height
+        if height <= min_analysis_height:
+            return level
+        # 每级像素数约减半, 保持偶数高度
+        lowered = max(min_analysis_height, round(height * 0.707 / 2) * 2)
+        return level.model_copy(update={"analysis_height": lowered})
+
+    def lower_stride(level: QualityLevel) -> QualityLevel:
+        stride = min(max_detect_stride, level.detect_stride + 1)
+        return level.model_copy(
+            update={"detect_stride": max(level.detect_stride, stride)}
+        )
+
+    levels = [full]
+    while True:
+        current = levels[-1]
+        for lower in (lower_reid, lower_resolution, lower_stride):
+            lowered = lower(levels[-1])
+            if lowered != levels[-1]:
+                levels.append(lowered)
+        if levels[-1] == current:
+            return levels
+
+
+class QualityController:
+    """
+    自适应质量控制器
+
+    每个汇报周期根据处理延迟、丢帧、缓冲区积压和各阶段的繁忙程度调整一次质量等级:
+    - 过载 (延迟接近目标、有丢帧, 或处理阶段满负荷且缓冲区积压) 时立即降低一级
+    - 连续 recover_windows 个周期负载较低时恢复一级; 恢复后立即又过载时,
+      下一次恢复需要的周期数加倍, 避免在两个等级之间来回切换
+    - 每次调整后跳过一个周期, 该周期的统计仍包含调整前的帧
+    """
+
+    def __init__(
+        self,
+        levels: List[QualityLevel],
+        target_latency: float,
+        recover_windows: int = 3,
+    ):
+        """
+        Args:
+            levels: 质量等级, 第 0 级为全质量
+            target_latency: 目标延迟 (秒)
+            recover_windows: 连续多少个低负载周期后恢复一级
+        """
+        self.levels = levels
+        self.target_latency = target_latency
+        self.recover_windows = max(1, recover_windows)
+        self.level = 0
+        self.changes = 0  # 累计调整次数
+        self._recover_after = self.recover_windows
+        self._healthy_windows = 0
+        self._settling = False
+        self._recovered = False  # 上一次调整是恢复, 尚未确认恢复后的负载
+
+    @property
+    def current(self) -> QualityLevel:
+        return self.levels[self.level]
+
+    def update(
+        self,
+        lag: Optional[float],
+        dropped: int,
+        utilization: float,
+        backlog: float,
+    ) -> Optional[QualityLevel]:
+        """
+        输入一个汇报周期的统计, 等级变化时返回新的等级
+
+        Args:
+            lag: 周期内从采集到完成跟踪的平均延迟 (秒), 没有处理任何帧时为 None
+            dropped: 周期内丢弃的帧数 (缓冲区满和超过目标延迟)
+            utilization: 最繁忙的处理阶段在周期内的繁忙时间占比
+            backlog: 缓冲区占用比例
+        """
+        if self._settling:
+            self._settling = False
+            return None
+
+        lag = lag or 0.0
+        overloaded = (
+            lag > 0.8 * self.target_latency
+            or dropped > 0
+            or (utilization > 0.95 and backlog > 0.5)
+        )
+        if self._recovered:
+            self._recovered = False
+            if overloaded:
+                self._recover_after = min(
+                    self._recover_after * 2, self.recover_windows * 8
+                )
+            else:
+                self._recover_after = self.recover_windows
+
+        if overloaded:
+            self._healthy_windows = 0
+            if self.level + 1 < len(self.levels):
+                return self._change(self.level + 1)
+            return None
+
+        idle = lag < 0.5 * self.target_latency and utilization < 0.6
+        self._healthy_windows = self._healthy_windows + 1 if idle else 0
+        if self._healthy_windows >= self._recover_after and self.level > 0:
+            self._healthy_windows = 0
+            self._recovered = True
+            return self._change(self.level - 1)
+        return None
+
+    def _change(self, level: int) -> QualityLevel:
+        self.level = level
+        self.changes += 1
+        self._settling = True
+        return self.current
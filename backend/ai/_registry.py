@@ -0,0 +1,92 @@
+""" 进程级模型注册表: 每个模型每个进程只加载一次, 在各分析任务间共享
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict
+
+import psutil
+
+from common import logger
+
+
+class ModelRegistry:
+    """
+    模型注册表
+
+    按 key 缓存已加载的模型, 同一个 key 并发请求时只加载一次。
+    记录每个模型的加载耗时、预热耗时和加载前后进程 RSS 的增量。
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        获取模型, 不存在时调用 loader 加载
+
+        Args:
+            key: 模型标识, 例如 "yolo:yolo11n.pt"
+            loader: 加载函数
+
+        Returns:
+            Any: 已加载的模型
+        """
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._key_lock(key):
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            process = psutil.Process()
+            rss_before = process.memory_info().rss
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            rss_delta = process.memory_info().rss - rss_before
+
+            self._models[key] = model
+            self._stats[key] = {
+                "load_seconds": round(load_seconds, 3),
+                "memory_mb": round(max(rss_delta, 0) / (1024**2), 2),
+                "warmup_seconds": None,
+                "loaded_at": int(time.time()),
+            }
+            logger.info(
+                f"模型 {key} 加载完成, 耗时 {load_seconds:.2f}s, "
+                f"内存增加 {rss_delta / (1024 ** 2):.1f}MB"
+            )
+            return model
+
+    def warmup(self, key: str, loader: Callable[[], Any], fn: Callable[[Any], Any]):
+        """
+        加载模型并执行一次预热推理
+
+        Args:
+            key: 模型标识
+            loader: 加载函数
+            fn: 预热函数, 参数为模型
+        """
+        model = self.get(key, loader)
+        start = time.perf_counter()
+        fn(model)
+        self._stats[key]["warmup_seconds"] = round(time.perf_counter() - start, 3)
+        return model
+
+    def stats(self) -> Dict[str, dict]:
+        """各模型的加载耗时与内存占用"""
+        return {key: dict(value) for key, value in self._stats.items()}
+
+
+# 全局模型注册表
+model_registry = ModelRegistry()
@@ -0,0 +1,252 @@
+""" 分段并行分析: 按时间把长视频切成相互重叠的片段, 各片段在独立进程中分析后拼接轨迹
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def plan_segments(
+    frame_count: int, workers: int, overlap: int, min_frames: int
+) -> List[Tuple[int, Optional[int]]]:
+    """
+    划分分段
+
+    第 k 段分析帧号 (start_k, end_k], end_k = start_{k+1} + overlap,
+    即每段向后多分析 overlap 帧, 与下一段开头重叠; 最后一段读到视频结束 (end 为 None)。
+
+    Args:
+        frame_count: 视频总帧数 (可能是估计值)
+        workers: 最多分成几段
+        overlap: 重叠帧数
+        min_frames: 每段最少帧数, 视频较短时减少分段数
+
+    Returns:
+        List[Tuple[int, Optional[int]]]: [(start, end), ...]
+    """
+    n = max(1, min(workers, frame_count // max(1, min_frames)))
+    starts = [round(i * frame_count / n) for i in range(n)]
+    segments = [(starts[i], starts[i + 1] + overlap) for i in range(n - 1)]
+    segments.append((starts[-1], None))
+    return segments
+
+
+def analyze_segment(
+    video_file: str,
+    config,
+    roi: Optional[list],
+    frame_range: Tuple[int, Optional[int]],
+    overlap: int,
+    cancel_event=None,
+    video_meta: Optional[dict] = None,
+) -> Optional[dict]:
+    """
+    在子进程中分析一个分段
+
+    Args:
+        video_file: 已下载到本地的视频文件
+        config: 算法配置 (AlgoConfig)
+        roi: 感兴趣区域多边形
+        frame_range: 分段帧号范围 (start, end]
+        overlap: 重叠帧数
+        cancel_event: 取消标记
+        video_meta: 视频元数据, 各分段与主进程使用相同的帧率
+
+    Returns:
+        Optional[dict]: Algo_1.export_segment() 的结果, 被取消时返回 None
+    """
+    from ai.algo_1 import Algo_1
+
+    algo = Algo_1(
+        video_file,
+        config=config,
+        roi=roi,
+        local_path=video_file,
+        frame_range=frame_range,
+        overlap_frames=overlap,
+        video_meta=video_meta,
+    )
+
+    finished = threading.Event()
+
+    def watch_cancel() -> None:
+        while not finished.wait(0.5):
+            if cancel_event.is_set():
+                algo.cancel()
+                return
+
+    if cancel_event is not None:
+        threading.Thread(target=watch_cancel, daemon=True).start()
+    try:
+        for _ in algo.track():
+            pass
+    finally:
+        finished.set()
+
+    if algo.cancelled:
+        return None
+    return algo.export_segment()
+
+
+def _box_iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _cosine(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> float:
+    if a is None or b is None:
+        return 0.0
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-12))
+
+
+def match_boundary(
+    prev: List[dict],
+    cur: List[dict],
+    window: Tuple[int, int],
+    iou_threshold: float = 0.5,
+    sim_threshold: float = 0.75,
+    max_gap: int = 0,
+) -> Dict[int, int]:
+    """
+    匹配相邻两段在分段边界处的轨迹
+
+    1. 重叠区间内两段处理的是相同的帧, 同一目标的检测框应基本一致,
+       按共同帧上的平均 IoU 一对一贪心匹配
+    2. 重叠区间内没有匹配上的, 若前一段轨迹在边界附近结束、后一段轨迹在边界后 max_gap 帧内开始,
+       按 ReID 特征相似度贪心匹配 (对应单进程中 tracker 丢失后重新找回的情况)
+
+    Args:
+        prev: 前一段的轨迹
+        cur: 后一段的轨迹
+        window: 重叠区间帧号 (start, end]
+        iou_threshold: 平均 IoU 阈值
+        sim_threshold: 特征相似度阈值
+        max_gap: 特征匹配允许的最大间隔帧数
+
+    Returns:
+        Dict[int, int]: 后一段轨迹下标 → 前一段轨迹下标
+    """
+    start, end = window
+    scores = []
+    for i, a in enumerate(prev):
+        boxes_a = a["overlap_boxes"]
+        if not boxes_a:
+            continue
+        for j, b in enumerate(cur):
+            boxes_b = b["overlap_boxes"]
+            common = [f for f in boxes_a if start < f <= end and f in boxes_b]
+            if not common:
+                continue
+            iou = np.mean([_box_iou(boxes_a[f], boxes_b[f]) for f in common])
+            if iou >= iou_threshold:
+                scores.append((len(common) * iou, i, j))
+
+    matches: Dict[int, int] = {}
+    used = set()
+    for _, i, j in sorted(scores, reverse=True):
+        if i in used or j in matches:
+            continue
+        matches[j] = i
+        used.add(i)
+
+    if max_gap > 0:
+        pairs = []
+        for i, a in enumerate(prev):
+            if i in used or a["end_frame"] > end:
+                continue
+            for j, b in enumerate(cur):
+                if j in matches or b["start_frame"] <= start:
+                    continue
+                gap = b["start_frame"] - a["end_frame"]
+                if 0 < gap <= max_gap:
+                    sim = _cosine(a["embed_vector"], b["embed_vector"])
+                    if sim >= sim_threshold:
+                        pairs.append((sim, i, j))
+        for _, i, j in sorted(pairs, reverse=True):
+            if i in used or j in matches:
+                continue
+            matches[j] = i
+            used.add(i)
+    return matches
+
+
+def _merge_state(owner: dict, part: dict, max_images: int = 10) -> None:
+    """将后一段的轨迹并入拼接中的轨迹, 重叠区间内的每秒 bbox 以后一段为准"""
+    per_sec = owner["bndbox_per_sec"]
+    if owner["tail_entries"] and part["start_frame"] <= owner["end_frame"]:
+        per_sec = per_sec[: len(per_sec) - owner["tail_entries"]]
+    owner["bndbox_per_sec"] = np.concatenate([per_sec, part["bndbox_per_sec"]])
+
+    if part["end_frame"] >= owner["end_frame"]:
+        owner["end_frame"] = part["end_frame"]
+        owner["current_bounding_box"] = part["current_bounding_box"]
+
+    a, b = owner["embed_vector"], part["embed_vector"]
+    if a is None or b is None:
+        owner["embed_vector"] = a if b is None else b
+    else:
+        fused = a / np.linalg.norm(a) + b / np.linalg.norm(b)
+        owner["embed_vector"] = (fused / np.linalg.norm(fused)).astype(np.float32)
+
+    if owner["cover"] is None:
+        owner["cover"] = part["cover"]
+    owner["images"] = (owner["images"] + part["images"])[-max_images:]
+    owner["crop_nbytes"] = (owner["crop_nbytes"] + part["crop_nbytes"])[-max_images:]
+    owner["tail_entries"] = part["tail_entries"]
+    owner["overlap_boxes"] = part["overlap_boxes"]
+
+
+def stitch_segments(
+    segments: List[dict],
+    overlap: int,
+    iou_threshold: float = 0.5,
+    sim_threshold: float = 0.75,
+    max_gap: int = 0,
+) -> Tuple[List[dict], int]:
+    """
+    按时间顺序拼接各分段的轨迹
+
+    Args:
+        segments: 各分段 export_segment() 的结果, 按时间顺序排列
+        overlap: 重叠帧数
+        iou_threshold: 重叠区间内平均 IoU 阈值
+        sim_threshold: 边界附近特征匹配的相似度阈值
+        max_gap: 特征匹配允许的最大间隔帧数
+
+    Returns:
+        (拼接后的轨迹状态列表, 拼接前的分段轨迹总数)
+    """
+    stitched: List[dict] = []
+    prev: List[dict] = []
+    prev_owner: List[dict] = []
+    total = 0
+    for segment in segments:
+        tracklets = segment["tracklets"]
+        total += len(tracklets)
+        start = segment["frame_range"][0]
+        matches = match_boundary(
+            prev,
+            tracklets,
+            (start, start + overlap),
+            iou_threshold,
+            sim_threshold,
+            max_gap,
+        )
+
+        owners = []
+        for j, tracklet in enumerate(tracklets):
+            if j in matches:
+                owner = prev_owner[matches[j]]
+                _merge_state(owner, tracklet)
+            else:
+                owner = dict(tracklet)
+                stitched.append(owner)
+            owners.append(owner)
+        prev, prev_owner = tracklets, owners
+
+    stitched.sort(key=lambda state: (state["start_frame"], state["end_frame"]))
+    return stitched, total
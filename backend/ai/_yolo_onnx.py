@@ -0,0 +1,208 @@
+""" 基于 ONNX Runtime 的批量 YOLO 检测
+"""
+
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+import supervision as sv
+
+from common import logger
+
+
+def export_yolo_onnx(model_path: str = "yolo11n.pt", imgsz: int = 640) -> str:
+    """
+    将 Ultralytics YOLO 模型导出为 batch 维度动态的 ONNX 模型, 已导出时直接复用
+
+    Args:
+        model_path: .pt 模型路径
+        imgsz: 输入分辨率 (正方形边长)
+
+    Returns:
+        str: ONNX 模型路径, 例如 yolo11n.640.onnx
+    """
+    root, _ = os.path.splitext(model_path)
+    onnx_path = f"{root}.{imgsz}.onnx"
+    if os.path.exists(onnx_path):
+        return onnx_path
+
+    from ultralytics import YOLO
+
+    logger.info(f"导出 {model_path} 为 ONNX (imgsz={imgsz})")
+    exported = YOLO(model_path, verbose=False).export(
+        format="onnx", imgsz=imgsz, dynamic=True, simplify=True, verbose=False
+    )
+    os.replace(exported, onnx_path)
+    return onnx_path
+
+
+class YOLOOnnxDetector:
+    """
+    批量 YOLO 检测器
+
+    多帧 letterbox 到同一个预分配的 NCHW 缓冲区后一次推理,
+    置信度过滤、坐标还原向量化完成, NMS 使用 OpenCV 的按类别批量 NMS。
+    输出 sv.Detections, 后续 ByteTrack 流程不变。
+
+    预处理缓冲区按线程独立持有, ONNX Runtime 会话可在线程间共享。
+    """
+
+    def __init__(
+        self,
+        model_path: str = "yolo11n.pt",
+        imgsz: int = 640,
+        conf_threshold: float = 0.25,
+        iou_threshold: float = 0.7,
+        intra_op_threads: int = 0,
+    ):
+        """
+        Args:
+            model_path: .pt 或 .onnx 模型路径, .pt 会先导出为 ONNX
+            imgsz: 输入分辨率, 须与导出时一致
+            conf_threshold: 置信度阈值
+            iou_threshold: NMS IoU 阈值
+            intra_op_threads: ONNX Runtime 算子内线程数, 0 表示由 ONNX Runtime 决定
+        """
+        if not model_path.endswith(".onnx"):
+            model_path = export_yolo_onnx(model_path, imgsz)
+        self.imgsz = imgsz
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+        options = ort.SessionOptions()
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self._local = threading.local()
+
+    def _buffers(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """当前线程的 uint8 画布与 float32 输入缓冲区, 容量不足时扩容"""
+        canvas = getattr(self._local, "canvas", None)
+        if canvas is None or canvas.shape[0] < n:
+            self._local.canvas = np.empty((n, self.imgsz, self.imgsz, 3), np.uint8)
+            self._local.tensor = np.empty((n, 3, self.imgsz, self.imgsz), np.float32)
+        return self._local.canvas[:n], self._local.tensor[:n]
+
+    def preprocess(
+        self, frames: Sequence[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        批量 letterbox
+
+        Returns:
+            (输入张量 [N,3,S,S], 每帧缩放比例 [N], 每帧 (pad_x, pad_y) [N,2])
+        """
+        n = len(frames)
+        canvas, tensor = self._buffers(n)
+        ratios = np.empty(n, dtype=np.float32)
+        pads = np.empty((n, 2), dtype=np.float32)
+        canvas.fill(114)
+        for i, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            ratio = min(self.imgsz / w, self.imgsz / h)
+            new_w, new_h = max(1, round(w * ratio)), max(1, round(h * ratio))
+            pad_x, pad_y = (self.imgsz - new_w) // 2, (self.imgsz - new_h) // 2
+            cv2.resize(
+                frame,
+                (new_w, new_h),
+                dst=canvas[i, pad_y : pad_y + new_h, pad_x : pad_x + new_w],
+                interpolation=cv2.INTER_LINEAR,
+            )
+            ratios[i] = ratio
+            pads[i] = (pad_x, pad_y)
+
+        # [N,H,W,BGR] → [N,RGB,H,W] 并归一化, 整批一次写入
+        np.multiply(canvas[..., ::-1].transpose(0, 3, 1, 2), 1 / 255.0, out=tensor)
+        return tensor, ratios, pads
+
+    def postprocess(
+        self,
+        output: np.ndarray,
+        ratios: np.ndarray,
+        pads: np.ndarray,
+        shapes: Sequence[Tuple[int, int]],
+        classes: Optional[Sequence[int]] = None,
+    ) -> List[sv.Detections]:
+        """
+        输出解码: 置信度过滤、坐标还原和 NMS
+
+        Args:
+            output: 模型输出, shape=[N, 4+C, A]
+            ratios: 每帧缩放比例
+            pads: 每帧 letterbox 偏移
+            shapes: 每帧原始尺寸 (H, W)
+            classes: 只保留的类别, 为 None 时保留全部类别
+        """
+        preds = output.transpose(0, 2, 1)  # [N, A, 4+C]
+        scores = preds[..., 4:]
+        class_map = None
+        if classes is not None:
+            class_map = np.asarray(classes, dtype=np.int64)
+            scores = scores[..., class_map]
+        class_ids = scores.argmax(axis=-1)
+        confidences = np.take_along_axis(scores, class_ids[..., None], -1)[..., 0]
+        if class_map is not None:
+            class_ids = class_map[class_ids]
+
+        results = []
+        for i, (h, w) in enumerate(shapes):
+            keep = confidences[i] > self.conf_threshold
+            if not keep.any():
+                results.append(sv.Detections.empty())
+                continue
+            boxes = preds[i, keep, :4]
+            conf = confidences[i, keep]
+            cls = class_ids[i, keep]
+
+            # cxcywh (letterbox 坐标) → xyxy (原图坐标)
+            xyxy = np.empty_like(boxes)
+            xyxy[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+            xyxy[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+            xyxy -= np.tile(pads[i], 2)
+            xyxy /= ratios[i]
+            xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, w)
+            xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, h)
+
+            wh = xyxy[:, 2:] - xyxy[:, :2]
+            indices = cv2.dnn.NMSBoxesBatched(
+                np.concatenate([xyxy[:, :2], wh], axis=1).tolist(),
+                conf.tolist(),
+                cls.tolist(),
+                self.conf_threshold,
+                self.iou_threshold,
+            )
+            indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+            results.append(
+                sv.Detections(
+                    xyxy=xyxy[indices].astype(np.float32),
+                    confidence=conf[indices].astype(np.float32),
+                    class_id=cls[indices].astype(int),
+                )
+            )
+        return results
+
+    def __call__(
+        self, frames: Sequence[np.ndarray], classes: Optional[Sequence[int]] = None
+    ) -> List[sv.Detections]:
+        """
+        批量检测
+
+        Args:
+            frames: BGR 帧列表
+            classes: 只保留的类别, 例如 [0] 只保留行人
+
+        Returns:
+            List[sv.Detections]: 与输入顺序一致
+        """
+        if not frames:
+            return []
+        tensor, ratios, pads = self.preprocess(frames)
+        output = self.session.run(None, {self.input_name: tensor})[0]
+        shapes = [frame.shape[:2] for frame in frames]
+        return self.postprocess(output, ratios, pads, shapes, classes)
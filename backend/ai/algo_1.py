@@ -2,11 +2,18 @@
 """
 
 import asyncio
+import json
 import logging
+import math
+import multiprocessing
 import os
+import sys
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, List, Set, Tuple
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Set, Tuple
 
 import cv2
 import numpy as np
@@ -15,8 +22,16 @@ import supervision as sv
 from ultralytics import YOLO
 from ultralytics.utils import LOGGER
 
-from ai._basic import AlgoConfig, AlgoType, BasicAlgo
-from common import logger, numpy_to_base64, save_s3_temp_file
+from ai._basic import AlgoConfig, AlgoType, BasicAlgo, OrtSessionProfile
+from ai._batch_detect import BatchedDetector
+from ai._embedding import EmbeddingBank
+from ai._live import FrameRingBuffer, LiveReader, is_live_source, open_capture
+from ai._pipeline import Pipeline
+from ai._quality import QualityController, QualityLevel, build_quality_levels
+from ai._registry import model_registry
+from ai._segments import analyze_segment, plan_segments, stitch_segments
+from ai._yolo_onnx import YOLOOnnxDetector
+from common import logger, numpy_to_base64, presign_read_url, video_cache
 
 LOGGER.setLevel(logging.WARNING)  # 只输出 warning 以上的日志
 
@@ -46,6 +61,22 @@ def bndbox_overlap(
     return overlap_area / min(area1, area2)
 
 
+def interpolate_bbox(
+    bbox0: Tuple[float, float, float, float],
+    frame0: int,
+    bbox1: Tuple[float, float, float, float],
+    frame1: int,
+    frame: float,
+) -> np.ndarray:
+    """在两次检测之间线性插值 bbox, 用于跳帧检测时估计中间帧的位置"""
+    if frame1 <= frame0:
+        return np.asarray(bbox1, dtype=np.float32)
+    t = min(max((frame - frame0) / (frame1 - frame0), 0.0), 1.0)
+    bbox0 = np.asarray(bbox0, dtype=np.float32)
+    bbox1 = np.asarray(bbox1, dtype=np.float32)
+    return bbox0 + (bbox1 - bbox0) * t
+
+
 # === 工具方法 ===
 def crop_and_encode(frame, bbox):
     """裁剪bbox并转为base64"""
@@ -63,11 +94,280 @@ def crop(frame, bbox, id: str = "", save_image: bool = False):
     return crop_img
 
 
+class MotionGate:
+    """
+    运动门控
+
+    将帧缩小为灰度图后与上一次执行检测的帧做差, 变化像素占比低于阈值时认为画面静止。
+    参考帧只在检测后更新, 缓慢移动的目标会逐渐累积差异, 不会被一直跳过。
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        pixel_threshold: int = 25,
+        size: Tuple[int, int] = (160, 90),
+    ):
+        """
+        Args:
+            threshold: 变化像素占比阈值, 取值范围[0,1]
+            pixel_threshold: 单个像素灰度变化超过该值才计为变化
+            size: 差分前缩放到的尺寸 (W, H)
+        """
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.size = size
+        self.reference = None  # 上一次执行检测的帧
+
+    def _downscale(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def has_motion(self, frame: np.ndarray) -> bool:
+        """
+        判断当前帧相对参考帧是否有运动
+
+        Returns:
+            bool: 有运动 (或尚无参考帧) 时返回 True, 并将当前帧设为参考帧
+        """
+        gray = self._downscale(frame)
+        if self.reference is None:
+            self.reference = gray
+            return True
+
+        diff = cv2.absdiff(gray, self.reference)
+        ratio = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+        if ratio < self.threshold:
+            return False
+
+        self.reference = gray
+        return True
+
+    def update_reference(self, frame: np.ndarray) -> None:
+        """强制执行检测的帧同样更新参考帧"""
+        self.reference = self._downscale(frame)
+
+
+class RegionOfInterest:
+    """
+    感兴趣区域
+
+    由一个或多个多边形组成, 顶点为相对画面宽高的归一化坐标。
+    检测只在多边形外接矩形的裁剪区域上执行, 检测框映射回原图后,
+    底边中点 (脚下位置) 不在多边形内的目标在跟踪前丢弃。
+    """
+
+    def __init__(self, polygons: List[List[List[float]]], frame_size: Tuple[int, int]):
+        """
+        Args:
+            polygons: 多边形列表, 每个多边形为 [[x, y], ...], 取值范围[0,1]
+            frame_size: 画面尺寸 (W, H)
+        """
+        w, h = frame_size
+        scale = np.array([w - 1, h - 1], dtype=np.float32)
+        points = [
+            np.round(np.asarray(polygon, dtype=np.float32) * scale).astype(np.int32)
+            for polygon in polygons
+            if len(polygon) >= 3
+        ]
+        if not points:
+            raise ValueError("感兴趣区域至少需要一个包含 3 个顶点的多边形")
+
+        self.mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(self.mask, points, 1)
+        x, y, bw, bh = cv2.boundingRect(np.concatenate(points))
+        self.x0, self.y0 = x, y
+        self.x1, self.y1 = min(x + bw, w), min(y + bh, h)
+
+    @property
+    def area_ratio(self) -> float:
+        """裁剪区域占整个画面的比例"""
+        h, w = self.mask.shape
+        return (self.x1 - self.x0) * (self.y1 - self.y0) / (w * h)
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """裁剪出外接矩形区域 (视图, 不复制)"""
+        return frame[self.y0 : self.y1, self.x0 : self.x1]
+
+    def filter(self, detections: sv.Detections) -> sv.Detections:
+        """
+        将裁剪区域上的检测框映射回原图坐标, 并丢弃不在多边形内的目标
+
+        Args:
+            detections: 裁剪区域上的检测结果
+
+        Returns:
+            sv.Detections: 原图坐标下、位于区域内的检测结果
+        """
+        if len(detections) == 0:
+            return detections
+        detections.xyxy = detections.xyxy + np.array(
+            [self.x0, self.y0, self.x0, self.y0], dtype=detections.xyxy.dtype
+        )
+        h, w = self.mask.shape
+        xs = ((detections.xyxy[:, 0] + detections.xyxy[:, 2]) / 2).astype(int)
+        ys = detections.xyxy[:, 3].astype(int)
+        inside = self.mask[np.clip(ys, 0, h - 1), np.clip(xs, 0, w - 1)] > 0
+        return detections[inside]
+
+
+class ReIDPreprocessor:
+    """
+    ReID 批量预处理器
+
+    将裁剪图像 letterbox 后直接写入可复用的 float32 NCHW 缓冲区,
+    BGR → RGB、[H,W,C] → [C,H,W] 与归一化在同一次写入中完成,
+    每张裁剪图像不再产生新的中间数组。
+
+    缓冲区非线程安全, 多线程推理时每个线程持有独立实例。
+    """
+
+    def __init__(
+        self,
+        target_size: Tuple[int, int] = (128, 256),
+        capacity: int = 32,
+        pad_value: int = 128,
+    ):
+        """
+        Args:
+            target_size: 目标尺寸 (W, H)
+            capacity: 初始 batch 容量, 不足时自动扩容
+            pad_value: letterbox 填充的灰度值 (0~255)
+        """
+        self.target_w, self.target_h = target_size
+        self.pad_value = np.float32(pad_value / 255.0)
+        self.scale = np.float32(1.0 / 255.0)
+        self.buffer = np.empty(
+            (capacity, 3, self.target_h, self.target_w), dtype=np.float32
+        )
+        # resize 的中间结果写入该平铺缓冲区的连续视图
+        self._staging = np.empty(self.target_h * self.target_w * 3, dtype=np.uint8)
+
+    def _ensure_capacity(self, n: int) -> None:
+        if n > self.buffer.shape[0]:
+            capacity = max(n, self.buffer.shape[0] * 2)
+            self.buffer = np.empty(
+                (capacity, 3, self.target_h, self.target_w), dtype=np.float32
+            )
+
+    def letterbox_into(self, img: np.ndarray, out: np.ndarray) -> None:
+        """
+        对单张 BGR 图像做 letterbox, 结果以 RGB/CHW/归一化 形式写入 out
+
+        Args:
+            img: 输入图像, shape=[H,W,3] (BGR)
+            out: 目标缓冲区切片, shape=[3,target_h,target_w]
+        """
+        h, w = img.shape[:2]
+        scale = min(self.target_w / w, self.target_h / h)
+        new_w = max(1, min(self.target_w, int(w * scale)))
+        new_h = max(1, min(self.target_h, int(h * scale)))
+        pad_top = (self.target_h - new_h) // 2
+        pad_left = (self.target_w - new_w) // 2
+
+        resized = self._staging[: new_h * new_w * 3].reshape(new_h, new_w, 3)
+        cv2.resize(img, (new_w, new_h), dst=resized)
+
+        # 只填充 letterbox 的边缘区域
+        out[:, :pad_top] = self.pad_value
+        out[:, pad_top + new_h :] = self.pad_value
+        out[:, pad_top : pad_top + new_h, :pad_left] = self.pad_value
+        out[:, pad_top : pad_top + new_h, pad_left + new_w :] = self.pad_value
+
+        # [H,W,BGR] → [RGB,H,W] 并归一化, 一次写入目标区域
+        np.multiply(
+            resized.transpose(2, 0, 1)[::-1],
+            self.scale,
+            out=out[:, pad_top : pad_top + new_h, pad_left : pad_left + new_w],
+        )
+
+    def __call__(self, imgs: List[np.ndarray], batch_size: int = None) -> np.ndarray:
+        """
+        批量预处理
+
+        Args:
+            imgs: 图像列表, 每张 shape=[H,W,3] (BGR)
+            batch_size: 输出的 batch 大小, 大于图像数量时多余部分补零
+
+        Returns:
+            np.ndarray: 缓冲区视图, shape=[batch_size,3,target_h,target_w]
+        """
+        n = len(imgs)
+        batch_size = max(batch_size or n, n)
+        self._ensure_capacity(batch_size)
+        for i, img in enumerate(imgs):
+            self.letterbox_into(img, self.buffer[i])
+        if batch_size > n:
+            self.buffer[n:batch_size] = 0
+        return self.buffer[:batch_size]
+
+
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+def int8_model_path(onnx_model_path: str) -> str:
+    """INT8 量化模型的路径, 例如 model.onnx → model.int8.onnx"""
+    root, ext = os.path.splitext(onnx_model_path)
+    return f"{root}.int8{ext or '.onnx'}"
+
+
+def create_session_options(profile: OrtSessionProfile) -> ort.SessionOptions:
+    """根据会话配置创建 SessionOptions"""
+    options = ort.SessionOptions()
+    if profile.intra_op_threads > 0:
+        options.intra_op_num_threads = profile.intra_op_threads
+    if profile.inter_op_threads > 0:
+        options.inter_op_num_threads = profile.inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    options.graph_optimization_level = _GRAPH_OPTIMIZATION_LEVELS.get(
+        profile.graph_optimization, ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    options.enable_cpu_mem_arena = profile.enable_mem_arena
+    return options
+
+
 class ReIDModel:
-    def __init__(self, onnx_model_path: str):
-        self.session = ort.InferenceSession(onnx_model_path)
+    def __init__(self, onnx_model_path: str, profile: OrtSessionProfile = None):
+        """
+        Args:
+            onnx_model_path: FP32 模型路径
+            profile: 会话配置, 默认从 settings 读取; int8=True 且量化模型存在时加载量化模型
+        """
+        self.profile = profile or OrtSessionProfile.from_settings()
+        if self.profile.int8:
+            quantized = int8_model_path(onnx_model_path)
+            if os.path.exists(quantized):
+                onnx_model_path = quantized
+            else:
+                logger.warning(f"未找到 INT8 模型 {quantized}, 使用 FP32 模型")
+        self.model_path = onnx_model_path
+        self.session = ort.InferenceSession(
+            onnx_model_path,
+            sess_options=create_session_options(self.profile),
+            providers=["CPUExecutionProvider"],
+        )
         self.input_name = self.session.get_inputs()[0].name
         self.output_name = self.session.get_outputs()[0].name
+        # 部分导出的 ONNX 模型 batch 维度固定 (通常为 1), 动态维度时为字符串或 None
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.fixed_batch_size = batch_dim if isinstance(batch_dim, int) else None
+        # 每个推理线程持有独立的预处理缓冲区
+        self._local = threading.local()
+
+    @property
+    def preprocessor(self) -> ReIDPreprocessor:
+        """当前线程的预处理器"""
+        preprocessor = getattr(self._local, "preprocessor", None)
+        if preprocessor is None:
+            preprocessor = ReIDPreprocessor((128, 256))
+            self._local.preprocessor = preprocessor
+        return preprocessor
 
     def preprocess_for_reid(
         self, img: np.ndarray, target_size=(128, 256)
@@ -94,34 +394,59 @@ class ReIDModel:
     def extract_feature(self, img: np.ndarray) -> np.ndarray:
         """
         输入: img (np.ndarray), shape=[H,W,3] (BGR 或 RGB 都可以)
-        输出: feature 向量 (1, D)
+        输出: feature 向量 (D,)
         """
         if img is None:
             raise ValueError("输入图像为空")
 
-        # 确保是 RGB
-        if img.shape[2] == 3:
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        return self.extract_features([img], max_batch_size=1)[0]
+
+    def extract_features(
+        self, imgs: List[np.ndarray], max_batch_size: int = 32
+    ) -> np.ndarray:
+        """
+        批量提取特征, 将多张裁剪图像堆叠为 [N,3,256,128] 一次推理
+
+        Args:
+            imgs: 图像列表, 每张 shape=[H,W,3] (BGR)
+            max_batch_size: 单次推理的最大 batch, 超出部分分多次推理
+
+        Returns:
+            np.ndarray: shape=(N, D), 顺序与输入一致
+        """
+        if any(img is None for img in imgs):
+            raise ValueError("输入图像为空")
+        if not imgs:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # 模型 batch 维度固定时只能按固定大小推理, 不足的部分补零
+        batch_size = self.fixed_batch_size or max(1, max_batch_size)
 
-        # resize (W=128, H=256)
-        img_resized = self.preprocess_for_reid(img, (128, 256))
+        features = []
+        for start in range(0, len(imgs), batch_size):
+            chunk = imgs[start : start + batch_size]
+            batch = self.preprocessor(chunk, self.fixed_batch_size)
 
-        # float32 归一化
-        img_resized = img_resized.astype(np.float32) / 255.0
+            # 推理
+            output = self._run(batch)
+            features.append(output[: len(chunk)].reshape(len(chunk), -1))
 
-        # [H,W,C] → [C,H,W]
-        img_resized = np.transpose(img_resized, (2, 0, 1))
+        return np.concatenate(features)
 
-        # [1,C,H,W]
-        img_resized = np.expand_dims(img_resized, axis=0)
+    def _run(self, batch: np.ndarray) -> np.ndarray:
+        """执行一次推理, 启用 IO binding 时直接绑定预处理缓冲区, 避免输入拷贝"""
+        if not self.profile.io_binding:
+            return self.session.run([self.output_name], {self.input_name: batch})[0]
+
+        binding = self.session.io_binding()
+        binding.bind_cpu_input(self.input_name, batch)
+        binding.bind_output(self.output_name)
+        self.session.run_with_iobinding(binding)
+        return binding.copy_outputs_to_cpu()[0]
 
-        # 推理
-        features = self.session.run([self.output_name], {self.input_name: img_resized})[
-            0
-        ]
 
-        # 有些 ReID 模型会输出 (1, D)，直接返回即可
-        return features.squeeze()
+# 追踪对象共享的分段锁, 避免每个对象各持有一把锁
+_LOCK_STRIPES = [threading.Lock() for _ in range(64)]
 
 
 class ClassTrackerObject:
@@ -133,8 +458,32 @@ class ClassTrackerObject:
     - 边界框信息管理
     - 图像特征和向量管理
     - 线程安全的更新操作
+
+    单个视频可能产生数千个对象, 为控制内存:
+    - 使用 __slots__, 锁按 object_id 从共享的分段锁中选取
+    - 图像只保存缩略图, 历史图像保存在固定大小的环形缓冲区中
+    - 每秒 bbox 保存在 float32 数组中
     """
 
+    __slots__ = (
+        "object_id",
+        "start_frame",
+        "end_frame",
+        "features",
+        "bounding_box",
+        "current_bounding_box",
+        "embedding_bank",
+        "_embed_vector",
+        "image",
+        "_cover",
+        "cache_images",
+        "min_image_size",
+        "thumbnail_height",
+        "_bndbox_per_sec",
+        "_crop_nbytes",
+        "is_updating",
+    )
+
     def __init__(
         self,
         object_id: str,
@@ -145,6 +494,9 @@ class ClassTrackerObject:
         features: str = None,
         embed_vector=None,
         min_image_size: Tuple[int, int] = (10, 10),
+        embedding_bank: EmbeddingBank = None,
+        max_cache_size: int = 10,
+        thumbnail_height: int = 128,
     ):
         """
         初始化追踪对象
@@ -158,6 +510,9 @@ class ClassTrackerObject:
             features: 对象特征描述字符串
             embed_vector: 对象的特征向量
             min_image_size: 最小图像尺寸阈值
+            embedding_bank: 共享的特征向量库, 设置后特征向量存放在库中
+            max_cache_size: 缓存的历史图像数量
+            thumbnail_height: 缩略图高度, 更高的图像等比缩小到该高度
         """
         # 基本标识信息
         self.object_id = object_id
@@ -170,22 +525,42 @@ class ClassTrackerObject:
         self.current_bounding_box = current_bounding_box or bounding_box  # 当前边界框
 
         # 特征向量信息
-        self.embed_vector = embed_vector  # ReID特征向量
+        self.embedding_bank = embedding_bank
+        self._embed_vector = None
+        if embed_vector is not None:
+            self.embed_vector = embed_vector  # ReID特征向量
 
         # 图像信息
-        self.image = None  # 当前对象图像
-        self.image_base64 = None  # 图像的base64编码
-        self.cache_images = []  # 缓存的历史图像
+        self.image = None  # 当前对象图像 (缩略图)
+        self._cover = None  # 首张缩略图, 用于生成base64编码
+        self.cache_images = deque(maxlen=max_cache_size)  # 缓存的历史图像
         self.min_image_size = min_image_size  # 最小图像尺寸阈值
+        self.thumbnail_height = thumbnail_height
+        # 原始裁剪图像大小, 仅用于内存统计
+        self._crop_nbytes = deque(maxlen=max_cache_size)
 
-        self.bndbox_per_sec = []
+        self._bndbox_per_sec = array("f")  # 每秒 bbox, 按 x1,y1,x2,y2 平铺
 
         # 线程安全控制
-        self.lock = threading.Lock()  # 防止并发修改冲突
         self.is_updating = False  # 更新状态标记
 
+    @property
+    def lock(self) -> threading.Lock:
+        """防止并发修改冲突"""
+        return _LOCK_STRIPES[hash(self.object_id) % len(_LOCK_STRIPES)]
+
+    @property
+    def image_base64(self) -> str:
+        """首张图像的base64编码, 按需生成"""
+        return numpy_to_base64(self._cover) if self._cover is not None else None
+
+    @property
+    def bndbox_per_sec(self) -> np.ndarray:
+        """每秒 bbox, shape=(N, 4)"""
+        return np.frombuffer(self._bndbox_per_sec, dtype=np.float32).reshape(-1, 4)
+
     def update_bbox(self, bbox: Tuple[int, int, int, int]):
-        self.bndbox_per_sec.append(bbox)
+        self._bndbox_per_sec.extend(float(v) for v in bbox[:4])
 
     def update_image(self, image: np.ndarray, reid_model: ReIDModel) -> bool:
         """
@@ -198,26 +573,45 @@ class ClassTrackerObject:
             bool: 更新是否成功
         """
         # 检查图像尺寸是否满足最小要求
-        if not self._is_valid_image_size(image):
+        if image is None or not self._is_valid_image_size(image):
             return False
 
+        try:
+            feature_vector = reid_model.extract_feature(image)
+        except Exception as e:
+            logger.warning(f"提取对象 {self.object_id} 特征时发生错误: {e}")
+            return False
+
+        return self.set_image(image, feature_vector)
+
+    def set_image(self, image: np.ndarray, feature_vector: np.ndarray) -> bool:
+        """
+        使用已提取好的特征向量更新对象图像 (批量推理后回写)
+
+        Args:
+            image: 新的对象图像数组
+            feature_vector: 该图像对应的 ReID 特征向量
+
+        Returns:
+            bool: 更新是否成功
+        """
         try:
             with self.lock:
                 self.is_updating = True
 
-                # 更新图像
-                self.image = image.copy()  # 创建副本避免引用问题
+                # 更新图像, 只保存缩略图 (缩放或复制后不再引用原始帧)
+                self.image = self._thumbnail(image)
 
-                # 提取并更新特征向量
-                feature_vector = reid_model.extract_feature(image)
+                # 更新特征向量
                 self.update_embed_vector(feature_vector)
 
-                # 首次设置时生成base64编码
-                if self.image_base64 is None:
-                    self.image_base64 = numpy_to_base64(image)
+                # 首次设置时保留缩略图, base64编码按需生成
+                if self._cover is None:
+                    self._cover = self.image
 
                 # 缓存图像（限制缓存数量）
-                self._cache_image(image)
+                self._cache_image(self.image)
+                self._crop_nbytes.append(image.nbytes)
 
                 self.is_updating = False
                 return True
@@ -242,18 +636,70 @@ class ClassTrackerObject:
             and image.shape[1] >= self.min_image_size[1]
         )
 
-    def _cache_image(self, image: np.ndarray, max_cache_size: int = 10) -> None:
+    def _thumbnail(self, image: np.ndarray) -> np.ndarray:
+        """
+        生成缩略图, 高度超过 thumbnail_height 时等比缩小
+
+        Args:
+            image: 原始图像
+
+        Returns:
+            np.ndarray: 缩略图 (不与原始图像共享内存)
+        """
+        h, w = image.shape[:2]
+        if h <= self.thumbnail_height:
+            return image.copy()
+        new_w = max(1, round(w * self.thumbnail_height / h))
+        return cv2.resize(
+            image, (new_w, self.thumbnail_height), interpolation=cv2.INTER_AREA
+        )
+
+    def _cache_image(self, image: np.ndarray) -> None:
         """
-        缓存图像，维护固定大小的缓存
+        缓存图像，环形缓冲区满时自动丢弃最旧的图像
 
         Args:
             image: 要缓存的图像
-            max_cache_size: 最大缓存数量
         """
-        self.cache_images.append(image.copy())
-        # 保持缓存大小在限制范围内
-        if len(self.cache_images) > max_cache_size:
-            self.cache_images.pop(0)  # 移除最旧的图像
+        self.cache_images.append(image)
+
+    def memory_bytes(self) -> int:
+        """
+        估算对象当前占用的内存 (字节), 不含特征向量库中的向量
+
+        Returns:
+            int: 字节数
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.cache_images)
+        size += sum(img.nbytes for img in self.cache_images)
+        if self._cover is not None and not any(
+            img is self._cover for img in self.cache_images
+        ):
+            size += self._cover.nbytes
+        size += self._bndbox_per_sec.buffer_info()[1] * self._bndbox_per_sec.itemsize
+        if self._embed_vector is not None:
+            size += np.asarray(self._embed_vector).nbytes
+        return size
+
+    def legacy_memory_bytes(self) -> int:
+        """
+        估算按全分辨率保存图像时对象占用的内存 (字节), 用于对比:
+        属性字典 + 独立的锁 + 当前图像副本 + 历史图像副本
+        + 首张图像的 base64 (按缓存中最早图像的原始大小估算) + 每秒 bbox 列表
+
+        Returns:
+            int: 字节数
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(dict.fromkeys(self.__slots__))
+        size += sys.getsizeof(threading.Lock())
+        size += sum(self._crop_nbytes)
+        if self._crop_nbytes:
+            size += self._crop_nbytes[-1] + self._crop_nbytes[0]
+        n_boxes = len(self._bndbox_per_sec) // 4
+        size += n_boxes * (8 + sys.getsizeof(np.zeros(4, dtype=np.float32)))
+        if self._embed_vector is not None:
+            size += np.asarray(self._embed_vector).nbytes
+        return size
 
     def update_bounding_box(self, bounding_box: Tuple[int, int, int, int]) -> bool:
         """
@@ -313,6 +759,20 @@ class ClassTrackerObject:
         with self.lock:
             self.features = features
 
+    @property
+    def embed_vector(self) -> np.ndarray:
+        """ReID特征向量, 使用特征向量库时从库中读取"""
+        if self.embedding_bank is not None:
+            return self.embedding_bank.get(self.object_id)
+        return self._embed_vector
+
+    @embed_vector.setter
+    def embed_vector(self, vector) -> None:
+        if self.embedding_bank is not None:
+            self.embedding_bank.set(self.object_id, vector)
+        else:
+            self._embed_vector = vector
+
     def update_embed_vector(self, new_vec, alpha: float = 0.7) -> None:
         """
         使用指数滑动平均融合新的特征向量
@@ -326,6 +786,10 @@ class ClassTrackerObject:
         if new_vec is None:
             return
 
+        if self.embedding_bank is not None:
+            self.embedding_bank.update([self.object_id], [new_vec], alpha)
+            return
+
         # 规范化新向量
         new_vec = self._normalize_vector(new_vec)
 
@@ -352,6 +816,62 @@ class ClassTrackerObject:
         norm = np.linalg.norm(vec)
         return vec / (norm + 1e-6) if norm > 1e-6 else vec
 
+    def to_state(self) -> dict:
+        """
+        导出可跨进程传递 (可 pickle) 的对象状态, 分段并行分析时由子进程返回
+
+        Returns:
+            dict: 起止帧、边界框、每秒 bbox、特征向量和缩略图
+        """
+        embed_vector = self.embed_vector
+        return {
+            "object_id": self.object_id,
+            "start_frame": int(self.start_frame),
+            "end_frame": int(self.end_frame),
+            "bounding_box": tuple(float(v) for v in self.bounding_box[:4]),
+            "current_bounding_box": tuple(
+                float(v) for v in self.current_bounding_box[:4]
+            ),
+            "bndbox_per_sec": self.bndbox_per_sec.copy(),
+            "embed_vector": (
+                None if embed_vector is None else np.asarray(embed_vector, np.float32)
+            ),
+            "cover": self._cover,
+            "images": list(self.cache_images),
+            "crop_nbytes": list(self._crop_nbytes),
+        }
+
+    @classmethod
+    def from_state(
+        cls, state: dict, object_id, embedding_bank: EmbeddingBank = None
+    ) -> "ClassTrackerObject":
+        """
+        由 to_state() 导出的状态重建对象
+
+        Args:
+            state: 对象状态
+            object_id: 新的对象标识
+            embedding_bank: 共享的特征向量库
+        """
+        obj = cls(
+            object_id,
+            start_frame=state["start_frame"],
+            bounding_box=state["bounding_box"],
+            current_bounding_box=state["current_bounding_box"],
+            end_frame=state["end_frame"],
+            embed_vector=state["embed_vector"],
+            embedding_bank=embedding_bank,
+        )
+        obj._bndbox_per_sec.frombytes(
+            np.ascontiguousarray(state["bndbox_per_sec"], dtype=np.float32).tobytes()
+        )
+        obj._cover = state["cover"]
+        for image in state["images"]:
+            obj._cache_image(image)
+        obj.image = obj.cache_images[-1] if obj.cache_images else None
+        obj._crop_nbytes.extend(state["crop_nbytes"])
+        return obj
+
     def get_duration(self) -> int:
         """
         获取对象的持续时间（帧数）
@@ -424,6 +944,153 @@ class ClassTrackerObject:
         return f"TrackerObject(id={self.object_id}, frames={self.start_frame}-{self.end_frame})"
 
 
+def tracker_memory_report(global_info: Dict[str, ClassTrackerObject]) -> dict:
+    """
+    统计一次分析中追踪对象的内存占用
+
+    Returns:
+        dict: 对象数量、当前占用的字节数 (实测)、每对象字节数,
+            以及按全分辨率保存时每对象字节数的估算值 (按记录的裁剪图像大小计算)
+    """
+    objs = list(global_info.values())
+    count = max(len(objs), 1)
+    total = sum(obj.memory_bytes() for obj in objs)
+    legacy = sum(obj.legacy_memory_bytes() for obj in objs)
+    return {
+        "tracks": len(objs),
+        "total_bytes": total,
+        "bytes_per_track": total / count,
+        "legacy_bytes_per_track": legacy / count,
+    }
+
+
+def update_images_in_batch(
+    items: List[Tuple[ClassTrackerObject, np.ndarray]],
+    reid_model: ReIDModel,
+    max_batch_size: int = 32,
+    embedding_bank: EmbeddingBank = None,
+) -> int:
+    """
+    批量更新追踪对象的图像和特征向量
+
+    同一帧 (或同一秒) 内需要刷新特征的所有裁剪图像合并为一次 ReID 推理,
+    推理结果按输入顺序回写到对应的追踪对象。
+
+    Args:
+        items: (追踪对象, 裁剪图像) 列表
+        reid_model: ReID 模型
+        max_batch_size: 单次推理的最大 batch
+        embedding_bank: 特征向量库, 设置后整批特征向量一次性融合到库中
+
+    Returns:
+        int: 成功更新的对象数量
+    """
+    valid = [
+        (obj, img)
+        for obj, img in items
+        if img is not None and obj._is_valid_image_size(img)
+    ]
+    if not valid:
+        return 0
+
+    try:
+        features = reid_model.extract_features(
+            [img for _, img in valid], max_batch_size=max_batch_size
+        )
+    except Exception as e:
+        logger.warning(f"批量提取 {len(valid)} 个对象特征时发生错误: {e}")
+        return 0
+
+    if embedding_bank is not None:
+        embedding_bank.update([obj.object_id for obj, _ in valid], features)
+        return sum(obj.set_image(img, None) for obj, img in valid)
+
+    return sum(obj.set_image(img, feat) for (obj, img), feat in zip(valid, features))
+
+
+class SharedYOLO:
+    """
+    可在多个分析任务间共享的 YOLO 模型
+
+    Ultralytics 的推理接口不是线程安全的, 同一时刻只允许一个线程推理。
+    """
+
+    def __init__(self, model_path: str):
+        self.model = YOLO(model_path, verbose=False)
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            return self.model(*args, verbose=False, **kwargs)
+
+
+def load_yolo_model(model_path: str = "yolo11n.pt") -> SharedYOLO:
+    """从模型注册表获取 YOLO 模型, 每个进程只加载一次"""
+    return model_registry.get(f"yolo:{model_path}", lambda: SharedYOLO(model_path))
+
+
+def load_yolo_onnx_model(
+    model_path: str = "yolo11n.pt", imgsz: int = 640
+) -> YOLOOnnxDetector:
+    """从模型注册表获取 ONNX Runtime 批量检测器, 首次使用时导出 ONNX 模型"""
+    return model_registry.get(
+        f"yolo-onnx:{model_path}:{imgsz}",
+        lambda: YOLOOnnxDetector(model_path, imgsz=imgsz),
+    )
+
+
+def run_detector(
+    model, frames: List[np.ndarray], imgsz: int, classes: Optional[List[int]]
+) -> List[sv.Detections]:
+    """批量推理, 类别在推理时过滤"""
+    if isinstance(model, YOLOOnnxDetector):
+        return model(frames, classes=classes)
+    results = model(frames, imgsz=imgsz, classes=classes)
+    return [sv.Detections.from_ultralytics(result) for result in results]
+
+
+def load_shared_detector(model, model_path: str, config: AlgoConfig) -> BatchedDetector:
+    """从模型注册表获取多路流共享的批量检测服务, 检测模型和参数相同的流共用一个服务"""
+    classes = config.detect_classes
+    key = (
+        f"shared-detect:{config.detect_backend}:{model_path}:{config.detect_imgsz}:"
+        f"{classes}:{config.shared_detect_batch_size}:"
+        f"{config.shared_detect_max_delay_ms}"
+    )
+    return model_registry.get(
+        key,
+        lambda: BatchedDetector(
+            lambda frames: run_detector(model, frames, config.detect_imgsz, classes),
+            max_batch=config.shared_detect_batch_size,
+            max_delay=config.shared_detect_max_delay_ms / 1000,
+        ),
+    )
+
+
+def load_reid_model(
+    model_path: str = "resnet50_market1501_aicity156.onnx",
+) -> ReIDModel:
+    """从模型注册表获取 ReID 模型, 每个进程只加载一次"""
+    return model_registry.get(f"reid:{model_path}", lambda: ReIDModel(model_path))
+
+
+def warmup_models(
+    yolo_model_path: str = "yolo11n.pt",
+    reid_model_path: str = "resnet50_market1501_aicity156.onnx",
+) -> None:
+    """加载模型并各执行一次空推理, 应用启动时调用"""
+    model_registry.warmup(
+        f"yolo:{yolo_model_path}",
+        lambda: SharedYOLO(yolo_model_path),
+        lambda model: model(np.zeros((640, 640, 3), dtype=np.uint8)),
+    )
+    model_registry.warmup(
+        f"reid:{reid_model_path}",
+        lambda: ReIDModel(reid_model_path),
+        lambda model: model.extract_features([np.zeros((256, 128, 3), dtype=np.uint8)]),
+    )
+
+
 class ToBeMergedCadidate:
     def __init__(self, object_id: str, target_object_id: str):
         self.object_id = object_id
@@ -446,63 +1113,319 @@ class ToBeMergedCadidate:
         return f"{self.object_id} -> {self.target_object_id}, similarity: {self.similarity:.4f}, dist: {self.dist:.2f}"
 
 
+def _build_grid(
+    cells: np.ndarray, rows: np.ndarray, starts: np.ndarray
+) -> Dict[Tuple[int, int], np.ndarray]:
+    """按网格分组行号, 每个网格内按 start_frame 排序"""
+    if len(rows) == 0:
+        return {}
+    order = rows[np.lexsort((starts[rows], cells[rows, 1], cells[rows, 0]))]
+    keys, first = np.unique(cells[order], axis=0, return_index=True)
+    return dict(zip(map(tuple, keys), np.split(order, first[1:])))
+
+
+def _merge_candidate_pairs(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    centers: np.ndarray,
+    vecs: np.ndarray,
+    norms: np.ndarray,
+    rows_a: np.ndarray,
+    rows_b: np.ndarray,
+    sim_threshold: float,
+    max_dist: float,
+):
+    """
+    在 rows_a (前一个对象) 与 rows_b (后一个对象) 之间查找可合并的行对
+
+    按 bbox 中心划分边长为 max_dist 的网格, 只比对相邻 3x3 网格内的对象;
+    每个网格内按起始帧排序裁剪时间窗口, 余弦相似度按网格分块做矩阵乘法。
+
+    Yields:
+        (row_a, row_b, similarity, dist)
+    """
+    cells = np.floor(centers / max_dist).astype(np.int64)
+    grid_a = _build_grid(cells, rows_a, starts)
+    grid_b = _build_grid(cells, rows_b, starts)
+
+    for (cx, cy), idx_a in grid_a.items():
+        # 相邻网格的对象按 start_frame 排序后, 只保留晚于本网格最早结束帧的部分
+        neighbours = [
+            grid_b[(cx + dx, cy + dy)]
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+            if (cx + dx, cy + dy) in grid_b
+        ]
+        if not neighbours:
+            continue
+        idx_b = np.concatenate(neighbours)
+        idx_b = idx_b[np.argsort(starts[idx_b], kind="stable")]
+        idx_b = idx_b[np.searchsorted(starts[idx_b], ends[idx_a].min(), "right") :]
+        if len(idx_b) == 0:
+            continue
+
+        # 严格时间顺序：后一个对象第一帧 > 前一个对象最后一帧
+        mask = starts[idx_b][None, :] > ends[idx_a][:, None]
+
+        # bbox 中心移动距离
+        delta = centers[idx_a][:, None, :] - centers[idx_b][None, :, :]
+        dist = np.sqrt((delta**2).sum(axis=-1))
+        mask &= dist <= max_dist
+        if not mask.any():
+            continue
+
+        # embedding 余弦相似度
+        sims = (vecs[idx_a] @ vecs[idx_b].T) / (
+            norms[idx_a][:, None] * norms[idx_b][None, :] + 1e-6
+        )
+        mask &= sims >= sim_threshold
+
+        for i, j in zip(*np.nonzero(mask)):
+            yield idx_a[i], idx_b[j], sims[i, j], dist[i, j]
+
+
 def merge_candidates_by_similarity_and_bbox(
     global_info: Dict[str, "ClassTrackerObject"],
     candidates: set[ToBeMergedCadidate],
     sim_threshold: float = 0.85,
-    # max_bbox_move: float = 50.0,  # bbox中心最大移动像素阈值
+    max_dist: float = 50.0,  # bbox 中心最大移动像素阈值, 50 是一个经验值
+    embedding_bank: EmbeddingBank = None,
 ):
     """
-    循环遍历 global_info 中的对象，按 start_frame 排序两两比对，
-    如果 bbox 移动小于 max_bbox_move 且 embedding 相似度大于 sim_threshold，
+    比对 global_info 中的对象, 如果后一个对象的起始帧晚于前一个对象的结束帧,
+    且 bbox 中心移动不超过 max_dist、embedding 相似度不低于 sim_threshold,
     就加入 ToBeMergedCadidate 集合。
+
+    设置 embedding_bank 时直接从特征向量库中按行读取向量。
     """
-    from itertools import combinations
+    if embedding_bank is not None:
+        objs = [
+            obj for obj in list(global_info.values()) if obj.object_id in embedding_bank
+        ]
+    else:
+        objs = [
+            obj
+            for obj in list(global_info.values())
+            if getattr(obj, "embed_vector", None) is not None
+        ]
+    if len(objs) < 2:
+        return
+
+    starts = np.array(
+        [o.start_frame if o.start_frame is not None else o.end_frame for o in objs],
+        dtype=np.float64,
+    )
+    ends = np.array(
+        [o.end_frame if o.end_frame is not None else o.start_frame for o in objs],
+        dtype=np.float64,
+    )
+    boxes = np.asarray([o.bounding_box for o in objs], dtype=np.float64)
+    centers = 0.5 * (boxes[:, :2] + boxes[:, 2:])
+    if embedding_bank is not None:
+        vecs = embedding_bank.vectors([o.object_id for o in objs])
+    else:
+        vecs = np.stack(
+            [np.asarray(o.embed_vector, dtype=np.float32).reshape(-1) for o in objs]
+        )
+    norms = np.linalg.norm(vecs, axis=1)
 
-    objs = list(global_info.values())
-    # 按 start_frame 排序
-    objs.sort(key=lambda o: o.start_frame)
+    rows = np.arange(len(objs))
+    for a, b, sim, dist in _merge_candidate_pairs(
+        starts, ends, centers, vecs, norms, rows, rows, sim_threshold, max_dist
+    ):
+        tbm = ToBeMergedCadidate(objs[b].object_id, objs[a].object_id)
+        tbm.similarity = sim
+        tbm.dist = dist
+        # 同时满足条件，加入候选集合
+        candidates.add(tbm)
 
-    def bbox_center(bbox):
-        x1, y1, x2, y2 = bbox
-        return (0.5 * (x1 + x2), 0.5 * (y1 + y2))
 
-    for obj_a, obj_b in combinations(objs, 2):
-        # 获取 obj_a 的结束帧和 obj_b 的起始帧
-        end_a = obj_a.end_frame if obj_a.end_frame is not None else obj_a.start_frame
-        start_b = (
-            obj_b.start_frame if obj_b.start_frame is not None else obj_b.end_frame
+class MergeCandidateWorker:
+    """
+    后台合并候选 worker
+
+    跟踪阶段通过 mark() 标记发生变化的对象, request() 请求一次比对;
+    多次请求在 worker 忙碌时合并为一次。每次只重新读取被标记的对象,
+    并只将这些对象与已有对象比对, 每秒的计算量随变化量而不是对象总数增长。
+
+    对象的快照在各自的锁内读取, candidates 只由本 worker 修改。
+    """
+
+    def __init__(
+        self,
+        global_info: Dict[str, "ClassTrackerObject"],
+        candidates: Set[ToBeMergedCadidate],
+        sim_threshold: float = 0.85,
+        max_dist: float = 50.0,
+        embedding_bank: EmbeddingBank = None,
+    ):
+        self.global_info = global_info
+        self.candidates = candidates
+        self.embedding_bank = embedding_bank
+        self.sim_threshold = sim_threshold
+        self.max_dist = max_dist
+
+        # 对象快照, 按行存储
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._starts = np.empty(0, dtype=np.float64)
+        self._ends = np.empty(0, dtype=np.float64)
+        self._centers = np.empty((0, 2), dtype=np.float64)
+        self._vecs = None
+        self._norms = np.empty(0, dtype=np.float32)
+        self._valid = np.empty(0, dtype=bool)  # 是否已有特征向量
+
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.passes = 0  # 实际执行的比对次数
+        self.compared = 0  # 累计重新比对的对象数
+
+        self._thread = threading.Thread(
+            target=self._loop, name="merge-candidates", daemon=True
         )
+        self._thread.start()
 
-        # 严格时间顺序：后一个对象第一帧 >= 前一个对象最后一帧
-        if start_b <= end_a:
-            continue
+    def mark(self, object_ids) -> None:
+        """标记发生变化 (新增、延长或特征更新) 的对象"""
+        with self._lock:
+            self._dirty.update(object_ids)
 
-        # 计算 bbox 中心移动距离
-        center_a = bbox_center(obj_a.bounding_box)
-        center_b = bbox_center(obj_b.bounding_box)
-        dist = (
-            (center_a[0] - center_b[0]) ** 2 + (center_a[1] - center_b[1]) ** 2
-        ) ** 0.5
-        # if dist > 5 * (start_b - end_a):
-        #     continue
-        if dist > 50:  # 这里可以调整阈值，50 是一个经验值
-            continue
+    def request(self) -> None:
+        """请求一次比对, worker 忙碌时与后续请求合并"""
+        self._wakeup.set()
 
-        # 计算 embedding 相似度
-        v_a = getattr(obj_a, "embed_vector", None)
-        v_b = getattr(obj_b, "embed_vector", None)
-        if v_a is None or v_b is None:
-            continue
-        cos_sim = np.dot(v_a, v_b) / (np.linalg.norm(v_a) * np.linalg.norm(v_b) + 1e-6)
-        if cos_sim < sim_threshold:
-            continue
+    def close(self, flush: bool = True) -> None:
+        """
+        停止后台线程
 
-        tbm = ToBeMergedCadidate(obj_b.object_id, obj_a.object_id)
-        tbm.similarity = cos_sim
-        tbm.dist = dist
-        # 同时满足条件，加入候选集合
-        candidates.add(tbm)
+        Args:
+            flush: 是否在当前线程中处理剩余的变化。对象在两次标记之间延长的
+                结束帧也在这里补齐, 保证最终结果与全量比对一致
+        """
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        if not flush:
+            return
+
+        stale = []
+        for object_id, obj in list(self.global_info.items()):
+            row = self._rows.get(object_id)
+            if row is None or self._ends[row] != obj.end_frame:
+                stale.append(object_id)
+        self.mark(stale)
+        self._merge_pass()
+
+    def _loop(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._closed:
+                break
+            try:
+                self._merge_pass()
+            except Exception as e:
+                logger.warning(f"合并候选比对出错: {e}")
+
+    def _ensure_capacity(self, n: int, dim: int) -> None:
+        capacity = len(self._starts)
+        if self._vecs is None:
+            self._vecs = np.zeros((capacity, dim), dtype=np.float32)
+        if n <= capacity:
+            return
+        capacity = max(n, capacity * 2, 64)
+
+        def grow(arr):
+            out = np.zeros((capacity,) + arr.shape[1:], dtype=arr.dtype)
+            out[: len(arr)] = arr
+            return out
+
+        self._starts = grow(self._starts)
+        self._ends = grow(self._ends)
+        self._centers = grow(self._centers)
+        self._vecs = grow(self._vecs)
+        self._norms = grow(self._norms)
+        self._valid = grow(self._valid)
+
+    def _snapshot(self, object_ids: Set[str]) -> np.ndarray:
+        """在各对象的锁内读取快照写入对应行, 返回有特征向量的行号"""
+        snapshots = []
+        for object_id in object_ids:
+            obj = self.global_info.get(object_id)
+            if obj is None:
+                continue
+            with obj.lock:
+                start, end = obj.start_frame, obj.end_frame
+                bbox = obj.bounding_box
+                vec = obj.embed_vector if self.embedding_bank is None else None
+            if self.embedding_bank is None and vec is None:
+                continue
+            if self.embedding_bank is not None and object_id not in self.embedding_bank:
+                continue
+            snapshots.append((object_id, start, end, bbox, vec))
+        if not snapshots:
+            return np.empty(0, dtype=np.int64)
+
+        # 使用特征向量库时一次读取所有变化对象的向量
+        if self.embedding_bank is not None:
+            vecs = self.embedding_bank.vectors([snap[0] for snap in snapshots])
+        else:
+            vecs = [
+                np.asarray(snap[4], dtype=np.float32).reshape(-1) for snap in snapshots
+            ]
+
+        changed = np.empty(len(snapshots), dtype=np.int64)
+        pairs = enumerate(zip(snapshots, vecs))
+        for i, ((object_id, start, end, bbox, _), vec) in pairs:
+            row = self._rows.get(object_id)
+            if row is None:
+                row = len(self._ids)
+                self._ensure_capacity(row + 1, len(vec))
+                self._rows[object_id] = row
+                self._ids.append(object_id)
+            self._starts[row] = start if start is not None else end
+            self._ends[row] = end if end is not None else start
+            self._centers[row] = (
+                0.5 * (bbox[0] + bbox[2]),
+                0.5 * (bbox[1] + bbox[3]),
+            )
+            self._vecs[row] = vec
+            self._norms[row] = np.linalg.norm(vec)
+            self._valid[row] = True
+            changed[i] = row
+        return changed
+
+    def _merge_pass(self) -> None:
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return
+        changed = self._snapshot(dirty)
+        if len(changed) == 0:
+            return
+        self.passes += 1
+        self.compared += len(changed)
+
+        n = len(self._ids)
+        existing = np.nonzero(self._valid[:n])[0]
+        arrays = (
+            self._starts[:n],
+            self._ends[:n],
+            self._centers[:n],
+            self._vecs[:n],
+            self._norms[:n],
+        )
+        # 变化的对象分别作为前一个和后一个对象, 与所有已有对象比对
+        for rows_a, rows_b in ((changed, existing), (existing, changed)):
+            for a, b, sim, dist in _merge_candidate_pairs(
+                *arrays, rows_a, rows_b, self.sim_threshold, self.max_dist
+            ):
+                tbm = ToBeMergedCadidate(self._ids[b], self._ids[a])
+                tbm.similarity = sim
+                tbm.dist = dist
+                self.candidates.add(tbm)
 
 
 def build_time_ordered_chains_with_position_and_similarity(
@@ -510,11 +1433,13 @@ def build_time_ordered_chains_with_position_and_similarity(
     candidates: Set["ToBeMergedCadidate"],
     base_dist: float = 5,
     sim_threshold: float = 0.8,
+    embedding_bank: EmbeddingBank = None,
 ) -> List[List[str]]:
     """
     构建按时间顺序排列的链条，同时根据位置和向量相似度判断是否可以合并。
     - base_dist: 时间跨度为1帧时允许的最大中心点距离
     - sim_threshold: 融合向量的最小相似度要求
+    - embedding_bank: 特征向量库, 设置后与链条中所有节点的相似度一次计算
     """
     from collections import defaultdict
 
@@ -580,15 +1505,19 @@ def build_time_ordered_chains_with_position_and_similarity(
                     continue
 
                 # 相似度检查：与链条中所有节点都要超过阈值
-                all_sim_ok = True
-                for prev_oid in chain:
-                    sim = cosine_similarity(
-                        global_info[prev_oid].embed_vector,
-                        global_info[oid].embed_vector,
-                    )
-                    if sim < sim_threshold:
-                        all_sim_ok = False
-                        break
+                if embedding_bank is not None:
+                    sims = embedding_bank.similarity(oid, chain)
+                    all_sim_ok = bool((sims >= sim_threshold).all())
+                else:
+                    all_sim_ok = True
+                    for prev_oid in chain:
+                        sim = cosine_similarity(
+                            global_info[prev_oid].embed_vector,
+                            global_info[oid].embed_vector,
+                        )
+                        if sim < sim_threshold:
+                            all_sim_ok = False
+                            break
                 if not all_sim_ok:
                     continue
 
@@ -628,116 +1557,1082 @@ def filter_chains_unique_nodes(chains):
     return filtered
 
 
+def link_tracklets(
+    global_info: Dict[str, "ClassTrackerObject"],
+    candidates: Set["ToBeMergedCadidate"],
+    base_dist: float = 5,
+    sim_threshold: float = 0.8,
+    embedding_bank: EmbeddingBank = None,
+) -> List[List[str]]:
+    """
+    一次性将候选关系全局分配为链条, 判断条件与
+    build_time_ordered_chains_with_position_and_similarity 相同:
+    - 时间顺序: 后一个对象的起始帧不早于前一个对象的结束帧
+    - 中心点距离不超过 base_dist * 帧间隔
+    - 合并后链条中任意两个节点的相似度不低于 sim_threshold
+
+    所有候选边的检查向量化完成, 再按时间间隔从短到长 (相同时相似度高的优先)
+    贪心分配, 与逐条构建时优先选择最早出现的子节点一致: 每个节点最多一个
+    前驱和一个后继, 用并查集避免成环, 两条链条合并时一次矩阵乘法检查两两相似度。
+    每个节点只属于一条链条, 不会因为重叠而丢弃整条链条。
+
+    Returns:
+        List[List[str]]: 按时间排序的链条 (至少两个节点), 按首节点起始帧排序
+    """
+    pairs = [
+        (pair.target_object_id, pair.object_id)
+        for pair in candidates
+        if pair.target_object_id in global_info and pair.object_id in global_info
+    ]
+    if not pairs:
+        return []
+
+    # 节点编号与向量化属性
+    ids = list({oid for pair in pairs for oid in pair})
+    index = {oid: i for i, oid in enumerate(ids)}
+    objs = [global_info[oid] for oid in ids]
+    starts = np.array([o.start_frame for o in objs], dtype=np.float64)
+    ends = np.array(
+        [o.end_frame if o.end_frame is not None else o.start_frame for o in objs],
+        dtype=np.float64,
+    )
+    boxes = np.asarray([o.bounding_box for o in objs], dtype=np.float64)
+    centers = 0.5 * (boxes[:, :2] + boxes[:, 2:])
+    if embedding_bank is not None:
+        vecs = embedding_bank.vectors(ids)
+    else:
+        dim = next(
+            (len(np.ravel(o.embed_vector)) for o in objs if o.embed_vector is not None),
+            0,
+        )
+        vecs = np.zeros((len(ids), dim), dtype=np.float32)
+        for i, o in enumerate(objs):
+            if o.embed_vector is not None:
+                vecs[i] = np.ravel(o.embed_vector)
+    # 归一化后点积即余弦相似度, 零向量与任何向量的相似度为 0
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    vecs = vecs / np.where(norms > 0, norms, 1)
+
+    # 候选边检查
+    src = np.array([index[a] for a, _ in pairs])
+    dst = np.array([index[b] for _, b in pairs])
+    dt = starts[dst] - ends[src]
+    dist = np.linalg.norm(centers[dst] - centers[src], axis=1)
+    sims = np.einsum("ij,ij->i", vecs[src], vecs[dst])
+    ok = (dt >= 0) & (dist <= base_dist * dt) & (sims >= sim_threshold)
+    src, dst, sims, dt = src[ok], dst[ok], sims[ok], dt[ok]
+
+    # 时间间隔短的边优先, 相同时相似度高的优先
+    order = np.lexsort((-sims, dt))
+
+    n = len(ids)
+    parent = list(range(n))
+    members = [[i] for i in range(n)]
+    successor = [-1] * n
+    predecessor = [-1] * n
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for k in order:
+        a, b = int(src[k]), int(dst[k])
+        if successor[a] != -1 or predecessor[b] != -1:
+            continue
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b:
+            continue
+        # 合并后的链条中任意两个节点都要满足相似度要求
+        chain_a, chain_b = members[root_a], members[root_b]
+        if (vecs[chain_a] @ vecs[chain_b].T).min() < sim_threshold:
+            continue
+
+        successor[a], predecessor[b] = b, a
+        if len(chain_a) < len(chain_b):
+            root_a, root_b = root_b, root_a
+        parent[root_b] = root_a
+        members[root_a] = members[root_a] + members[root_b]
+        members[root_b] = []
+
+    chains = []
+    for head in range(n):
+        if predecessor[head] != -1 or successor[head] == -1:
+            continue
+        chain, node = [], head
+        while node != -1:
+            chain.append(ids[node])
+            node = successor[node]
+        chains.append(chain)
+
+    chains.sort(key=lambda chain: global_info[chain[0]].start_frame)
+    return chains
+
+
+_RUN_FINISHED = object()  # 后台分析线程结束标记
+_URL_TIMEOUT_MS = 30000  # 从 URL 解码时打开和读取的超时时间
+_URL_EXPIRE_SECONDS = 12 * 3600  # 预签名 URL 有效期, 需覆盖整个分析过程
+_LIVE_DEFAULT_FPS = 25.0  # 实时流未报告帧率 (或报告的帧率不合理) 时使用
+_LIVE_MAX_FPS = 240.0
+
+
 class Algo_1(BasicAlgo):
     __algo_name__ = "algo_1"
 
     def __init__(
         self,
-        video_path: str,  # must be a s3 path or rtsp stream, currently only support s3 path
+        video_path: str,  # s3 path, http(s) url or live stream (rtsp/rtmp/srt)
         config: AlgoConfig = None,
         reid_model_path: str = "resnet50_market1501_aicity156.onnx",
         yolo_model_path: str = "yolo11n.pt",
+        roi: List[List[List[float]]] = None,
+        local_path: str = None,
+        frame_range: Tuple[int, Optional[int]] = None,
+        overlap_frames: int = 0,
+        video_meta: dict = None,
     ):
+        """
+        Args:
+            video_path: 视频的 s3 路径, 也可以是 http(s) 地址 (直接解码)
+                或 rtsp / rtmp / srt 实时流地址 (持续分析直到流结束或取消)
+            config: 算法配置
+            reid_model_path: ReID 模型路径
+            yolo_model_path: YOLO 模型路径
+            roi: 感兴趣区域多边形, 归一化坐标, 为空时检测整个画面
+            local_path: 已下载到本地的视频文件, 设置后不经过视频缓存
+            frame_range: 只分析帧号 (start, end] 范围内的帧, end 为 None 表示到视频结束,
+                分段并行分析时由子进程使用
+            overlap_frames: 与相邻分段重叠的帧数, 重叠区间内逐帧记录检测框用于拼接
+            video_meta: 上传时探测的视频元数据 (fps / width / height / frame_count),
+                提供时优先使用, 否则从解码器读取
+        """
         super().__init__()
         self.config = config or AlgoConfig()
         assert self.config.algo_type == AlgoType.video
-        self.yolo_model = YOLO(yolo_model_path, verbose=False)
-        self.reid_model = ReIDModel(reid_model_path)
-        self.temp_file = save_s3_temp_file(video_path)
-
-        self.video = cv2.VideoCapture(self.temp_file)
-        self.fps = self.video.get(cv2.CAP_PROP_FPS)
+        # 模型在进程内共享, 只在首次使用时加载
+        if self.config.detect_backend == "onnx":
+            self.yolo_model = load_yolo_onnx_model(
+                yolo_model_path, self.config.detect_imgsz
+            )
+        else:
+            self.yolo_model = load_yolo_model(yolo_model_path)
+        # 多路流合并检测: 同一进程内的各路流把待检测帧交给共享的批量检测服务
+        self.shared_detector: Optional[BatchedDetector] = None
+        if self.config.shared_detect_batch_size > 0:
+            self.shared_detector = load_shared_detector(
+                self.yolo_model, yolo_model_path, self.config
+            )
+        self._shared_stream: Optional[int] = None
+        self.reid_model = load_reid_model(reid_model_path)
+        self.video_meta = meta = video_meta or {}
+        self.frame_range = frame_range
+        self._open_input(video_path, local_path)
+        self.fps = meta.get("fps") or self.video.get(cv2.CAP_PROP_FPS)
+        if self.live and not 0 < self.fps <= _LIVE_MAX_FPS:
+            self.fps = _LIVE_DEFAULT_FPS
         self.video_size = (
-            self.video.get(cv2.CAP_PROP_FRAME_WIDTH),
-            self.video.get(cv2.CAP_PROP_FRAME_HEIGHT),
+            meta.get("width") or self.video.get(cv2.CAP_PROP_FRAME_WIDTH),
+            meta.get("height") or self.video.get(cv2.CAP_PROP_FRAME_HEIGHT),
         )
 
+        # 跳帧检测时 tracker 每 detect_stride 帧更新一次, 按实际更新频率设置 frame_rate
+        self.detect_stride = max(1, self.config.detect_stride)
+        self.detect_batch_size = max(1, self.config.detect_batch_size)
         self.tracker = sv.ByteTrack(
             track_activation_threshold=0.5,
             lost_track_buffer=self.fps * 2,
-            frame_rate=self.fps,
+            frame_rate=self.fps / self.detect_stride,
         )
+        self.reid_interval = max(1, self.config.reid_interval_sec)
+        # 分析分辨率: 解码后缩放一次, 检测在缩放后的帧上进行,
+        # 检测结果映射回原始坐标后再交给 tracker, ReID 裁剪仍取自原始帧
+        self.analysis_size = self._analysis_size(self.config.analysis_height)
+        self.resize_seconds = 0.0  # 缩放到分析分辨率的累计耗时
+        self.resized_frames = 0  # 缩放到分析分辨率的帧数
+        self.gate_seconds = 0.0  # 检测阶段中感兴趣区域裁剪和运动门控的累计耗时
+        self.infer_seconds = 0.0  # 检测阶段中模型推理 (含预处理) 的累计耗时
+        self.detect_seconds = 0.0  # 检测阶段的累计耗时
+        self.track_seconds = 0.0  # 跟踪阶段的累计耗时
+
+        # 感兴趣区域, 只在区域的外接矩形上检测
+        self.roi_polygons = roi
+        self.roi = RegionOfInterest(roi, self.analysis_size) if roi else None
+        self._rois = {self.analysis_size: self.roi}  # 各分析分辨率下的感兴趣区域
         self.box_annotator = sv.BoxAnnotator()
         self.label_annotator = sv.LabelAnnotator()
+        self._stop_event = threading.Event()
+
+        # 运动门控, 阈值为 0 时不启用
+        self.motion_gate = (
+            MotionGate(self.config.motion_threshold, self.config.motion_pixel_threshold)
+            if self.config.motion_threshold > 0
+            else None
+        )
+        # 检测到目标后继续检测的帧数, 与 tracker 保留丢失目标的时长一致,
+        # 目标进入后静止不动时不会因跳过检测而被 tracker 丢弃
+        self._motion_hold_frames = max(1, round(self.fps * 2 / self.detect_stride))
+        self._motion_hold = 0  # 剩余需要继续检测的帧数, 只由检测阶段读写
+
+        self.frame_count = 0  # 已读取的帧数
+        self.detected_frames = 0  # 执行了检测的帧数
+        self.motion_skipped_frames = 0  # 画面静止跳过检测的帧数
+        self.global_info: Dict[str, ClassTrackerObject] = {}
+        self.embedding_bank = EmbeddingBank()
+        self.candidates: Set[ToBeMergedCadidate] = set()
+        self.chains: List[List[str]] = []
+
+        # 分段分析: 重叠区间内逐帧的检测框, 以及尾部重叠区间内记录的每秒 bbox 数量
+        self.overlap_frames = overlap_frames
+        self.overlap_boxes: Dict[str, Dict[int, Tuple[float, ...]]] = {}
+        self.tail_second_entries: Dict[str, int] = {}
+
+        # 实时流: 采集线程、环形缓冲区, 以及各帧的采集时间 (用于统计处理延迟)
+        self.live_reader: Optional[LiveReader] = None
+        self.live_buffer: Optional[FrameRingBuffer] = None
+        self.live_stale_frames = 0  # 在缓冲区中超过目标延迟而丢弃的帧数
+        self._live_captured: Dict[int, Tuple[float, float]] = {}  # 采集和出缓冲区时间
+        self._live_pipeline_lag = 0.0  # 出缓冲区到完成跟踪的耗时 (指数平均)
+        self._live_lags: List[float] = []  # 本次汇报周期内各帧的处理延迟
+        self._live_updated: Set = set()  # 本次汇报周期内出现过的对象
+        # 本次汇报周期开始时的 [检测耗时, 跟踪耗时, 丢弃帧数]
+        self._live_window = [0.0, 0.0, 0]
+        self.quality: Optional[QualityController] = None  # 自适应质量控制器
+
+    def _open_input(self, video_path: str, local_path: Optional[str]) -> None:
+        """
+        打开视频输入, input_mode 记录实际使用的方式:
+
+        - local: 调用方传入的本地文件
+        - url: 通过 FFmpeg HTTP 输入直接从 http(s) 地址或 S3 预签名 URL 解码, 不落盘
+        - cache: 下载到本地视频缓存后解码, 分析结束后释放引用, 文件保留供下次分析复用
+        - live: rtsp 等实时流, 由采集线程读取到环形缓冲区, 处理不过来时丢弃最旧的帧
+        """
+        self._input_started = time.perf_counter()
+        self.first_detection_seconds: Optional[float] = None
+        self._cached_file = False
+        if local_path:
+            self.input_mode = "local"
+            self.temp_file = local_path
+            self.video = cv2.VideoCapture(local_path)
+            return
+
+        if is_live_source(video_path):
+            video = open_capture(video_path, _URL_TIMEOUT_MS)
+            if not video.isOpened():
+                video.release()
+                raise IOError(f"无法打开实时流: {video_path}")
+            self.input_mode = "live"
+            self.temp_file = video_path
+            self.video = video
+            logger.info(f"开始读取实时流: {video_path}")
+            return
+
+        url = self._direct_url(video_path)
+        if url is not None:
+            video = open_capture(url, _URL_TIMEOUT_MS)
+            if video.isOpened():
+                self.input_mode = "url"
+                self.temp_file = url
+                self.video = video
+                logger.info(f"从 URL 直接解码视频: {video_path}")
+                return
+            video.release()
+            if url == video_path:
+                raise IOError(f"无法打开视频: {video_path}")
+            logger.warning(f"无法从预签名 URL 解码, 改为下载到本地缓存: {video_path}")
+
+        self.input_mode = "cache"
+        self.temp_file = video_cache.acquire(video_path)
+        self._cached_file = True
+        self.video = cv2.VideoCapture(self.temp_file)
+
+    def _direct_url(self, video_path: str) -> Optional[str]:
+        """
+        需要直接解码时返回视频地址, 否则返回 None (使用本地缓存)
+
+        分段并行分析或从分段中间开始分析需要定位, 经 HTTP 定位代价高, 使用本地缓存;
+        auto 模式下视频已缓存或小于 url_min_size_mb 时也使用本地缓存
+        """
+        if video_path.startswith(("http://", "https://")):
+            return video_path
+        mode = self.config.input_mode
+        if mode not in ("url", "auto"):
+            return None
+        if self.config.segment_workers > 1 or (
+            self.frame_range is not None and self.frame_range[0] > 0
+        ):
+            return None
+        if mode == "auto":
+            cached, size = video_cache.lookup(video_path)
+            if cached or size < self.config.url_min_size_mb * 1024 * 1024:
+                return None
+        return presign_read_url(video_path, _URL_EXPIRE_SECONDS)
+
+    @property
+    def live(self) -> bool:
+        return self.input_mode == "live"
+
+    def _read_frames(self):
+        """
+        解码阶段: 逐帧读取视频, 帧号从 1 开始
+
+        跳帧检测时, 不需要检测的帧只 grab() 不解码;
+        设置了 frame_range 时先定位到分段起点, 帧号仍为整个视频中的帧号
+        """
+        if self.live:
+            yield from self._read_live_frames()
+            return
+        frame_id, end = 0, None
+        if self.frame_range is not None:
+            frame_id, end = self.frame_range
+            if frame_id > 0:
+                self.video.set(cv2.CAP_PROP_POS_FRAMES, frame_id)
+        while end is None or frame_id < end:
+            if frame_id % self.detect_stride:
+                if not self.video.grab():
+                    break
+                frame_id += 1
+                self.frame_count = frame_id
+                continue
+            ret, frame = self.video.read()
+            if not ret:
+                break
+            frame_id += 1
+            self.frame_count = frame_id
+            yield frame_id, frame, self._downscale(frame)
+
+    def _analysis_size(self, analysis_height: int) -> Tuple[int, int]:
+        """按分析高度计算分析分辨率 (W, H), 不超过原始分辨率"""
+        width, height = int(self.video_size[0]), int(self.video_size[1])
+        if 0 < analysis_height < height:
+            return max(1, round(width * analysis_height / height)), analysis_height
+        return width, height
+
+    def _roi_for(self, size: Tuple[int, int]) -> Optional[RegionOfInterest]:
+        """与缩放后帧尺寸对应的感兴趣区域, 实时流调整分析分辨率后帧尺寸会变化"""
+        if self.roi is None:
+            return None
+        roi = self._rois.get(size)
+        if roi is None:
+            roi = self._rois[size] = RegionOfInterest(self.roi_polygons, size)
+        return roi
+
+    def _start_live_reader(self) -> None:
+        """
+        启动实时流采集线程
+
+        缓冲区容量按目标延迟折算为帧数, 处理速度跟不上时缓冲区丢弃最旧的帧,
+        排队等待处理的帧不会超过目标延迟
+        """
+        if self.config.live_adaptive_quality:
+            levels = build_quality_levels(
+                QualityLevel(
+                    analysis_height=self.analysis_size[1],
+                    detect_stride=self.detect_stride,
+                    reid_interval_sec=self.reid_interval,
+                ),
+                int(self.video_size[1]),
+                self.config.live_min_analysis_height,
+                self.config.live_max_detect_stride,
+                self.config.live_max_reid_interval_sec,
+            )
+            self.quality = QualityController(levels, self.config.live_latency_sec)
+        capacity = max(
+            self.detect_batch_size,
+            math.ceil(self.config.live_latency_sec * self.fps / self.detect_stride),
+        )
+        self.live_buffer = FrameRingBuffer(capacity)
+        self.live_reader = LiveReader(
+            self.temp_file,
+            self.video,
+            self.live_buffer,
+            stride=self.detect_stride,
+            reconnect_attempts=self.config.live_reconnect_attempts,
+            timeout_ms=_URL_TIMEOUT_MS,
+        )
+        self.live_reader.start()
+
+    def _read_live_frames(self):
+        """
+        从环形缓冲区读取实时流的帧
+
+        已等待的时间加上后续检测和跟踪的耗时会超过目标延迟的帧直接丢弃
+        """
+        buffer = self.live_buffer
+        while not self._stop_event.is_set() and not buffer.finished:
+            item = buffer.get(timeout=0.1)
+            if item is None:
+                continue
+            frame_id, captured_at, frame = item
+            self.frame_count = self.live_reader.frame_id
+            now = time.monotonic()
+            if (
+                now - captured_at + self._live_pipeline_lag
+                > self.config.live_latency_sec
+            ):
+                self.live_stale_frames += 1
+                continue
+            self._live_captured[frame_id] = (captured_at, now)
+            yield frame_id, frame, self._downscale(frame)
+
+    def _live_report(self, frame_id: int, elapsed: float):
+        """
+        实时流的周期汇报: 本周期内出现过的对象的最新位置, 丢帧、延迟和各阶段耗时,
+        以及当前的分析质量; 启用自适应质量时先根据本周期的负载调整质量
+        """
+        lags = self._live_lags
+        detect_start, track_start, dropped_start = self._live_window
+        detect = self.detect_seconds - detect_start
+        track = self.track_seconds - track_start
+        dropped = self.live_buffer.dropped + self.live_stale_frames
+        utilization = max(detect, track) / max(elapsed, 1e-6)
+        self._live_window = [self.detect_seconds, self.track_seconds, dropped]
+
+        if self.quality is not None:
+            level = self.quality.update(
+                sum(lags) / len(lags) if lags else None,
+                dropped - dropped_start,
+                utilization,
+                len(self.live_buffer) / self.live_buffer.capacity,
+            )
+            if level is not None:
+                self._apply_quality(level)
+                yield (
+                    f"实时流分析质量调整为第 {self.quality.level}/"
+                    f"{len(self.quality.levels) - 1} 级: "
+                    f"分析分辨率 {self.analysis_size[0]}x{self.analysis_size[1]}, "
+                    f"每 {self.detect_stride} 帧检测一次, "
+                    f"每 {self.reid_interval} 秒刷新 ReID 特征"
+                )
+
+        tracks = []
+        for object_id in self._live_updated:
+            obj = self.global_info.get(object_id)
+            if obj is None:
+                continue
+            tracks.append(
+                {
+                    "object_id": int(object_id),
+                    "start_frame": int(obj.start_frame),
+                    "end_frame": int(obj.end_frame),
+                    "bounding_box": [
+                        round(float(v), 1) for v in obj.current_bounding_box[:4]
+                    ],
+                }
+            )
+        report = {
+            "type": "live",
+            "frame_id": frame_id,
+            "tracks": tracks,
+            "objects": len(self.global_info),
+            "captured_frames": self.live_reader.frame_id,
+            "dropped_frames": self.live_buffer.dropped,
+            "stale_frames": self.live_stale_frames,
+            "buffered_frames": len(self.live_buffer),
+            "lag_ms": round(sum(lags) / len(lags) * 1000) if lags else None,
+            "max_lag_ms": round(max(lags) * 1000) if lags else None,
+            "reconnects": self.live_reader.reconnects,
+            "utilization": round(utilization, 2),
+            "stage_ms": {
+                "detect": round(detect / len(lags) * 1000, 1) if lags else None,
+                "track": round(track / len(lags) * 1000, 1) if lags else None,
+            },
+            "quality": {
+                "level": self.quality.level if self.quality is not None else 0,
+                "analysis_height": self.analysis_size[1],
+                "detect_stride": self.detect_stride,
+                "reid_interval_sec": self.reid_interval,
+            },
+        }
+        if self.shared_detector is not None:
+            stats = self.shared_detector.stats()
+            report["shared_detect"] = {
+                "streams": stats["streams"],
+                "avg_batch": stats["avg_batch"],
+                "avg_wait_ms": stats["avg_wait_ms"],
+            }
+        self._live_updated = set()
+        self._live_lags = []
+        yield json.dumps(report, ensure_ascii=False)
+
+    def _apply_quality(self, level: QualityLevel) -> None:
+        """
+        切换实时流的分析质量, 各阶段从下一帧开始生效
+
+        检测结果按每帧实际的缩放比例映射回原始坐标, 切换分辨率不影响 tracker;
+        tracker 的丢失缓冲仍按初始的检测间隔计算
+        """
+        self.analysis_size = self._analysis_size(level.analysis_height)
+        self.detect_stride = level.detect_stride
+        self.live_reader.stride = level.detect_stride
+        self.reid_interval = level.reid_interval_sec
+
+    def _stop_live_reader(self) -> None:
+        if self.live_reader is not None:
+            self.live_reader.stop()
+
+    def _downscale(self, frame: np.ndarray) -> np.ndarray:
+        """缩放到分析分辨率, 未设置分析分辨率时直接返回原始帧"""
+        if self.analysis_size == (frame.shape[1], frame.shape[0]):
+            return frame
+        start = time.perf_counter()
+        small = cv2.resize(frame, self.analysis_size, interpolation=cv2.INTER_AREA)
+        self.resize_seconds += time.perf_counter() - start
+        self.resized_frames += 1
+        return small
+
+    def _resize_report(self) -> str:
+        """
+        分析分辨率和检测各环节的实测耗时
+
+        分别以 analysis_height=0 和设置分析分辨率运行同一视频, 对比两次的耗时即为节省的开销
+        """
+        width, height = int(self.video_size[0]), int(self.video_size[1])
+        pixels = 1 - self.analysis_size[0] * self.analysis_size[1] / (width * height)
+        per_frame = 1000 / max(self.detected_frames, 1)
+        message = (
+            f"分析分辨率 {self.analysis_size[0]}x{self.analysis_size[1]} "
+            f"(原始 {width}x{height}), 检测和跟踪处理的像素减少 {pixels:.0%}, "
+        )
+        if self.resized_frames:
+            message += (
+                f"缩放 {self.resized_frames} 帧耗时 {self.resize_seconds:.2f}s "
+                f"({self.resize_seconds * 1000 / self.resized_frames:.2f}ms/帧), "
+            )
+        return message + (
+            f"区域裁剪和运动门控耗时 {self.gate_seconds:.2f}s, "
+            f"推理 {self.detected_frames} 帧耗时 {self.infer_seconds:.2f}s "
+            f"({self.infer_seconds * per_frame:.1f}ms/帧), "
+            f"检测阶段合计 {self.detect_seconds:.2f}s"
+        )
+
+    def _read_batches(self):
+        """解码阶段: 按 detect_batch_size 将帧分组, 供检测阶段批量推理"""
+        batch = []
+        for item in self._read_frames():
+            batch.append(item)
+            # 实时流不等待凑满一批, 缓冲区中没有更多的帧时立即推理
+            if len(batch) >= self.detect_batch_size or (
+                self.live and not len(self.live_buffer)
+            ):
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _infer(self, frames: List[np.ndarray]) -> List[sv.Detections]:
+        """
+        批量推理, 类别在推理时过滤, 只保留 detect_classes 中的类别
+
+        启用多路流合并检测时交给共享的批量检测服务, 与其他流的帧合并为一批推理
+        """
+        if self._shared_stream is not None:
+            return self.shared_detector.detect(self._shared_stream, frames)
+        config = self.config
+        return run_detector(
+            self.yolo_model, frames, config.detect_imgsz, config.detect_classes
+        )
+
+    def _detect(self, batch):
+        """
+        检测阶段: 一批帧合并推理, 画面静止且近期没有检测到目标的帧跳过推理
+
+        设置了感兴趣区域时, 运动判断和推理都只作用于区域的外接矩形,
+        区域外的目标在交给 tracker 之前丢弃
+        """
+        start = time.perf_counter()
+        outputs = [None] * len(batch)
+        rois = [self._roi_for((img.shape[1], img.shape[0])) for _, _, img in batch]
+        pending = []
+        for i, (_, _, frame) in enumerate(batch):
+            if rois[i] is not None:
+                frame = rois[i].crop(frame)
+            if self.motion_gate is not None:
+                # 本批已有帧需要推理时, 后续帧在拿到检测结果前无法判断目标是否离开, 一并推理
+                if pending or self._motion_hold > 0:
+                    self.motion_gate.update_reference(frame)
+                    self._motion_hold = max(0, self._motion_hold - 1)
+                elif not self.motion_gate.has_motion(frame):
+                    self.motion_skipped_frames += 1
+                    # 空检测结果仍交给 tracker, 保证丢失计数按帧推进
+                    outputs[i] = sv.Detections.empty()
+                    continue
+            pending.append((i, frame))
+        self.gate_seconds += time.perf_counter() - start
+
+        if pending:
+            self.detected_frames += len(pending)
+            infer_start = time.perf_counter()
+            detections = self._infer([frame for _, frame in pending])
+            self.infer_seconds += time.perf_counter() - infer_start
+            last = None  # 最后一个检测到目标的帧
+            for (i, _), det in zip(pending, detections):
+                outputs[i] = det if rois[i] is None else rois[i].filter(det)
+                if len(outputs[i]) > 0:
+                    last = i
+            if last is not None:
+                self._motion_hold = max(
+                    0, self._motion_hold_frames - (len(batch) - 1 - last)
+                )
+
+        results = []
+        for (frame_id, frame, small), det in zip(batch, outputs):
+            if len(det) > 0 and small is not frame:
+                # 分析分辨率坐标 → 原始分辨率坐标
+                det.xyxy = det.xyxy * np.array(
+                    [
+                        frame.shape[1] / small.shape[1],
+                        frame.shape[0] / small.shape[0],
+                    ]
+                    * 2,
+                    dtype=np.float32,
+                )
+            results.append((frame_id, frame, det))
+        self.detect_seconds += time.perf_counter() - start
+        return results
+
+    def _timed(self, frames):
+        """统计跟踪阶段的耗时: 每帧交给调用方处理到取下一帧之间的时间"""
+        for item in frames:
+            start = time.perf_counter()
+            yield item
+            self.track_seconds += time.perf_counter() - start
+
+    def _submit_reid(self, executor, slots, reid_due, merge_worker) -> None:
+        """ReID 阶段: 提交到线程池, 在途批次数受 slots 限制"""
+        slots.acquire()
+        future = executor.submit(
+            update_images_in_batch,
+            reid_due,
+            self.reid_model,
+            self.config.reid_batch_size,
+            self.embedding_bank,
+        )
+        object_ids = [obj.object_id for obj, _ in reid_due]
+
+        def done(_):
+            slots.release()
+            # 特征向量已更新, 下次比对时重新读取
+            if merge_worker is not None:
+                merge_worker.mark(object_ids)
+
+        future.add_done_callback(done)
 
     async def run(self):
-        global_info = {}
-        executor = ThreadPoolExecutor(max_workers=8)  # 控制并发线程数
-        candidates = set()
+        """
+        在后台线程中执行分析, 通过 asyncio 队列将进度回传给 SSE 生成器
+
+        视频解码与模型推理都是阻塞调用, 放在事件循环中执行会阻塞其它接口。
+        客户端断开时生成器被关闭, 后台线程在下一帧检查到停止标记后退出。
+        """
+        loop = asyncio.get_running_loop()
+        messages: asyncio.Queue = asyncio.Queue()
+
+        def emit(message) -> None:
+            try:
+                loop.call_soon_threadsafe(messages.put_nowait, message)
+            except RuntimeError:
+                # 事件循环已关闭
+                self._stop_event.set()
+
+        def worker() -> None:
+            try:
+                for message in self.analyze():
+                    emit(message)
+            except Exception as e:
+                logger.error(f"视频分析出错: {e}")
+                emit(e)
+            finally:
+                emit(_RUN_FINISHED)
+
+        thread = threading.Thread(target=worker, name="algo_1-analyze", daemon=True)
+        thread.start()
         try:
-            yield "开始检测..."
-            await asyncio.sleep(0.1)
-            frame_id = 0
             while True:
-                ret, frame = self.video.read()
-                if not ret:
-                    yield "视频检测完成..."
+                message = await messages.get()
+                if message is _RUN_FINISHED:
                     break
-                frame_id += 1
+                if isinstance(message, Exception):
+                    raise message
+                yield message
+        finally:
+            self._stop_event.set()
 
-                # 模型推理
-                results = self.yolo_model(frame)[0]
+    def cancel(self) -> None:
+        """请求停止分析, 分析线程在下一帧检查到后退出"""
+        self._stop_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._stop_event.is_set()
+
+    def summary(self) -> dict:
+        """
+        分析结果摘要, 可直接序列化为 JSON
 
-                detections = sv.Detections.from_ultralytics(results)
-                person_class_id = 0
-                mask = detections.class_id == person_class_id
-                detections = detections[mask]
+        Returns:
+            dict: 帧数统计、每个追踪对象的起止帧与边界框、合并链路
+        """
+        return {
+            "fps": self.fps,
+            "video_size": [int(v) for v in self.video_size],
+            "frame_count": self.frame_count,
+            "detected_frames": self.detected_frames,
+            "motion_skipped_frames": self.motion_skipped_frames,
+            "objects": [
+                {
+                    "object_id": int(obj.object_id),
+                    "start_frame": int(obj.start_frame),
+                    "end_frame": int(obj.end_frame),
+                    "bounding_box": np.asarray(obj.bounding_box).tolist(),
+                    "bndbox_per_sec": obj.bndbox_per_sec.tolist(),
+                }
+                for obj in self.global_info.values()
+            ],
+            "chains": [[int(oid) for oid in chain] for chain in self.chains],
+        }
+
+    def track(self):
+        """
+        检测与跟踪 (同步), 逐条产出进度消息, 结束后 global_info 和 candidates 已就绪
+
+        分段分析的子进程只执行这一步, 合并候选在拼接后统一计算
+        """
+        global_info = self.global_info
+        executor = ThreadPoolExecutor(max_workers=self.config.reid_workers)
+        reid_slots = threading.BoundedSemaphore(max(1, self.config.reid_queue_size))
+        merge_worker = None
+        if self.frame_range is None:
+            merge_worker = MergeCandidateWorker(
+                global_info, self.candidates, embedding_bank=self.embedding_bank
+            )
+
+        # 解码 → 检测 两个阶段各自运行在独立线程中, 跟踪在本线程中按帧序执行
+        # 队列元素为一批帧, 按批大小折算队列深度, 保持缓冲的帧数不变
+        batch_size = self.detect_batch_size
+        decode_queue_size = math.ceil(self.config.decode_queue_size / batch_size)
+        detect_queue_size = math.ceil(self.config.detect_queue_size / batch_size)
+        if self.live:
+            # 实时流的帧缓冲在环形缓冲区中, 阶段之间只保留一批, 避免排队增加延迟
+            decode_queue_size = detect_queue_size = 1
+            self._start_live_reader()
+        pipeline = Pipeline(
+            ("decode", self._read_batches, decode_queue_size),
+            [("detect", self._detect, detect_queue_size)],
+        )
+        frames = self._timed(item for batch in pipeline for item in batch)
+        if self.shared_detector is not None:
+            self._shared_stream = self.shared_detector.register()
+        try:
+            if self.roi is not None:
+                yield f"开始检测, 检测区域占画面 {self.roi.area_ratio:.0%}..."
+            else:
+                yield "开始检测..."
+            # 分段从视频中间开始时, 以分段起点前一帧所在的秒为准
+            start = self.frame_range[0] if self.frame_range is not None else 0
+            last_second = int(start // self.fps)
+            last_report = time.monotonic()
+            for frame_id, frame, detections in frames:
+                if self._stop_event.is_set():
+                    break
+                if self.live:
+                    now = time.monotonic()
+                    captured_at, dequeued_at = self._live_captured.pop(
+                        frame_id, (now, now)
+                    )
+                    self._live_lags.append(now - captured_at)
+                    self._live_pipeline_lag += 0.2 * (
+                        now - dequeued_at - self._live_pipeline_lag
+                    )
+                    if now - last_report >= self.config.live_report_sec:
+                        yield from self._live_report(frame_id, now - last_report)
+                        last_report = now
+                if self.first_detection_seconds is None:
+                    self.first_detection_seconds = (
+                        time.perf_counter() - self._input_started
+                    )
+                    logger.info(
+                        f"视频输入方式: {self.input_mode}, "
+                        f"首帧检测完成耗时 {self.first_detection_seconds:.2f}s"
+                    )
                 detections = self.tracker.update_with_detections(detections)
+                if self.live and len(detections) > 0:
+                    self._live_updated.update(detections.tracker_id)
+
+                # 是否进入新的一秒, 帧号始终为真实帧号, 与 detect_stride 无关
+                second = int(frame_id // self.fps)
+                new_second = second != last_second
+                last_second = second
                 if len(detections) == 0:
                     continue
 
+                # 本帧需要刷新特征的对象，统一批量推理
+                reid_due = []
                 for bbox, tracker_id in zip(detections.xyxy, detections.tracker_id):
                     if tracker_id not in global_info:
                         # 新对象
                         obj = ClassTrackerObject(
-                            tracker_id, start_frame=frame_id, bounding_box=bbox
+                            tracker_id,
+                            start_frame=frame_id,
+                            bounding_box=bbox,
+                            embedding_bank=self.embedding_bank,
                         )
                         global_info[tracker_id] = obj
+                        if new_second:
+                            obj.update_bbox(bbox)
                         # 更新裁剪图像
-                        obj.update_image(
-                            crop(frame, bbox, id=tracker_id), self.reid_model
-                        )
+                        reid_due.append((obj, crop(frame, bbox, id=tracker_id)))
                     else:
-                        # 已存在对象，更新最后一次 bbox
-                        global_info[tracker_id].update_bounding_box(bbox)
-                        global_info[tracker_id].update_end_frame(frame_id)
-                        if frame_id % self.fps == 0:
-                            # 每隔 frame_rate 帧更新一次图像
-                            executor.submit(
-                                global_info[tracker_id].update_image,
-                                crop(frame, bbox),
-                                self.reid_model,
+                        obj = global_info[tracker_id]
+                        if new_second:
+                            # 整秒时刻可能落在跳过的帧上, 用上一次检测结果插值
+                            obj.update_bbox(
+                                interpolate_bbox(
+                                    obj.current_bounding_box,
+                                    obj.end_frame,
+                                    bbox,
+                                    frame_id,
+                                    second * self.fps,
+                                )
                             )
-
-                    if frame_id % self.fps == 0:
-                        global_info[tracker_id].update_bbox(bbox)
-                        # 每隔 frame_rate 帧检查一次
-                        executor.submit(
-                            merge_candidates_by_similarity_and_bbox,
-                            global_info,
-                            candidates,
+                        # 已存在对象，更新最后一次 bbox
+                        obj.update_bounding_box(bbox)
+                        obj.update_end_frame(frame_id)
+                        if new_second and second % self.reid_interval == 0:
+                            # 每 reid_interval 秒更新一次图像
+                            reid_due.append((obj, crop(frame, bbox)))
+                    if self.overlap_frames:
+                        self._record_overlap(tracker_id, frame_id, bbox, new_second)
+
+                if new_second and merge_worker is not None:
+                    # 每秒请求一次合并候选比对, 只比对本秒出现过的对象
+                    merge_worker.mark(detections.tracker_id)
+                    merge_worker.request()
+
+                if reid_due:
+                    self._submit_reid(executor, reid_slots, reid_due, merge_worker)
+
+            else:
+                yield (
+                    f"视频检测完成, 共 {self.frame_count} 帧, "
+                    f"检测 {self.detected_frames} 帧, "
+                    f"画面静止跳过 {self.motion_skipped_frames} 帧..."
+                )
+                yield self._resize_report()
+                if self.live:
+                    yield (
+                        f"实时流已结束, 采集 {self.live_reader.frame_id} 帧, "
+                        f"缓冲区满丢弃 {self.live_buffer.dropped} 帧, "
+                        f"超过目标延迟丢弃 {self.live_stale_frames} 帧, "
+                        f"重连 {self.live_reader.reconnects} 次"
+                        + (
+                            f", 分析质量调整 {self.quality.changes} 次"
+                            if self.quality is not None
+                            else ""
                         )
+                    )
 
         finally:
+            # 先停止采集线程, 缓冲区关闭后解码阶段才能结束
+            self._stop_live_reader()
+            pipeline.close()
             self.video.release()
+            if self._shared_stream is not None:
+                self.shared_detector.unregister(self._shared_stream)
+                self._shared_stream = None
+
+        if self._stop_event.is_set():
+            executor.shutdown(wait=True, cancel_futures=True)
+            if merge_worker is not None:
+                merge_worker.close(flush=False)
+            return
 
-        executor.submit(
-            merge_candidates_by_similarity_and_bbox, global_info, candidates
-        )
+        # 等待所有特征更新完成后, 处理剩余的变化
         executor.shutdown(wait=True)
+        if merge_worker is not None:
+            merge_worker.close()
+            logger.info(
+                f"合并候选比对 {merge_worker.passes} 次, 累计比对 {merge_worker.compared} 个对象"
+            )
+
+    def analyze(self):
+        """分析主流程 (同步), 逐条产出进度消息"""
+        try:
+            if (
+                self.config.segment_workers > 1
+                and self.frame_range is None
+                and not self.live
+            ):
+                yield from self._track_segments()
+            else:
+                yield from self.track()
+        finally:
+            # 追踪结束 (包括取消和异常) 后不再读取视频, 释放缓存引用
+            self._release_video()
 
+        if self._stop_event.is_set():
+            logger.info("视频分析已取消")
+            return
+
+        global_info = self.global_info
         yield "目标追踪完成，合并相似对象..."
-        await asyncio.sleep(0.1)
 
-        chains = build_time_ordered_chains_with_position_and_similarity(
-            global_info, candidates
+        chains = link_tracklets(
+            global_info, self.candidates, embedding_bank=self.embedding_bank
         )
+        self.chains = chains
 
         yield f"总共有 {len(global_info)}个对象，需合并 {len(chains)}个链路。"
 
-        # delete temp files
-        os.remove(self.temp_file)
-
-        # TODO save data to s3 and db
+        report = tracker_memory_report(global_info)
+        message = (
+            f"追踪对象内存: {report['tracks']} 个对象共 "
+            f"{report['total_bytes'] / 1024:.1f} KB, "
+            f"实测 {report['bytes_per_track'] / 1024:.1f} KB/个, "
+            f"按全分辨率保存估算约 {report['legacy_bytes_per_track'] / 1024:.1f} KB/个"
+        )
+        logger.info(message)
+        yield message
 
         yield "[DONE]"
+
+    def _release_video(self) -> None:
+        """释放视频缓存的引用, 可重复调用"""
+        if self._cached_file:
+            self._cached_file = False
+            video_cache.release(self.temp_file)
+
+    def _record_overlap(
+        self, tracker_id, frame_id: int, bbox: np.ndarray, new_second: bool
+    ) -> None:
+        """分段分析时, 在与相邻分段重叠的区间内逐帧记录检测框"""
+        start, end = self.frame_range
+        in_head = start > 0 and frame_id <= start + self.overlap_frames
+        in_tail = end is not None and frame_id > end - self.overlap_frames
+        if not (in_head or in_tail):
+            return
+        self.overlap_boxes.setdefault(tracker_id, {})[frame_id] = tuple(
+            float(v) for v in bbox[:4]
+        )
+        if in_tail and new_second:
+            # 该对象本秒的 bbox 会与下一段重复, 拼接时以下一段为准
+            self.tail_second_entries[tracker_id] = (
+                self.tail_second_entries.get(tracker_id, 0) + 1
+            )
+
+    def export_segment(self) -> dict:
+        """
+        导出分段分析结果, 由子进程返回给主进程拼接
+
+        Returns:
+            dict: 分段范围、帧数统计、各轨迹的状态和重叠区间内的检测框
+        """
+        tracklets = []
+        for object_id, obj in self.global_info.items():
+            state = obj.to_state()
+            state["overlap_boxes"] = self.overlap_boxes.get(object_id, {})
+            state["tail_entries"] = self.tail_second_entries.get(object_id, 0)
+            tracklets.append(state)
+        return {
+            "frame_range": self.frame_range,
+            "frame_count": self.frame_count,
+            "detected_frames": self.detected_frames,
+            "motion_skipped_frames": self.motion_skipped_frames,
+            "tracklets": tracklets,
+        }
+
+    def _track_segments(self):
+        """
+        分段并行分析: 视频按时间切成相互重叠的分段, 每段在独立进程中检测和跟踪,
+        再利用重叠区间内的检测框和 ReID 特征拼接跨分段的轨迹
+        """
+        total_frames = int(
+            self.video_meta.get("frame_count")
+            or self.video.get(cv2.CAP_PROP_FRAME_COUNT)
+        )
+        overlap = max(1, round(self.config.segment_overlap_sec * self.fps))
+        segments = plan_segments(
+            total_frames,
+            self.config.segment_workers,
+            overlap,
+            round(self.config.min_segment_sec * self.fps),
+        )
+        if len(segments) == 1:
+            yield from self.track()
+            return
+        self.video.release()
+
+        yield f"分段并行分析: 共 {len(segments)} 段, 相邻分段重叠 {overlap} 帧..."
+        # 每段的 ReID 线程按分段数分摊
+        config = self.config.model_copy(
+            update={
+                "segment_workers": 1,
+                "reid_workers": max(1, self.config.reid_workers // len(segments)),
+            }
+        )
+        context = multiprocessing.get_context("spawn")
+        manager = context.Manager()
+        cancel_event = manager.Event()
+        results: List[Optional[dict]] = [None] * len(segments)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=len(segments), mp_context=context
+            ) as pool:
+                futures = {
+                    pool.submit(
+                        analyze_segment,
+                        self.temp_file,
+                        config,
+                        self.roi_polygons,
+                        frame_range,
+                        overlap,
+                        cancel_event,
+                        self.video_meta,
+                    ): i
+                    for i, frame_range in enumerate(segments)
+                }
+                pending = set(futures)
+                try:
+                    while pending:
+                        done, pending = wait(pending, timeout=0.5)
+                        if self._stop_event.is_set():
+                            break
+                        for future in done:
+                            index = futures[future]
+                            results[index] = future.result()
+                            finished = sum(r is not None for r in results)
+                            yield f"分段 {index + 1} 分析完成 ({finished}/{len(segments)})"
+                finally:
+                    # 取消、出错或生成器被关闭时, 通知仍在运行的分段尽快退出
+                    if pending:
+                        cancel_event.set()
+                        for future in pending:
+                            future.cancel()
+        finally:
+            manager.shutdown()
+        if self._stop_event.is_set():
+            return
+
+        stitched, total = stitch_segments(
+            results,
+            overlap,
+            max_gap=int(self.fps * 2),
+        )
+        for object_id, state in enumerate(stitched, start=1):
+            self.global_info[object_id] = ClassTrackerObject.from_state(
+                state, object_id, embedding_bank=self.embedding_bank
+            )
+        self.frame_count = max(r["frame_count"] for r in results)
+        self.detected_frames = sum(r["detected_frames"] for r in results)
+        self.motion_skipped_frames = sum(r["motion_skipped_frames"] for r in results)
+        yield (
+            f"视频检测完成, 共 {self.frame_count} 帧, "
+            f"检测 {self.detected_frames} 帧 (含重叠区间), "
+            f"画面静止跳过 {self.motion_skipped_frames} 帧, "
+            f"{total} 条分段轨迹拼接为 {len(stitched)} 条..."
+        )
+
+        merge_candidates_by_similarity_and_bbox(
+            self.global_info, self.candidates, embedding_bank=self.embedding_bank
+        )
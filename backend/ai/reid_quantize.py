@@ -0,0 +1,111 @@
+""" ReID 模型离线 INT8 量化
+
+提供校准图像目录时使用静态量化 (QDQ, 逐通道权重), 否则使用动态量化。
+量化后的模型保存为 *.int8.onnx, 设置 REID_INT8=true 后 ReIDModel 优先加载。
+
+用法:
+    cd backend && python -m ai.reid_quantize resnet50_market1501_aicity156.onnx \\
+        --calibration-dir logs --max-images 200
+"""
+
+import argparse
+import glob
+import os
+from typing import List, Optional
+
+import cv2
+from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                      QuantType, quantize_dynamic,
+                                      quantize_static)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from ai.algo_1 import ReIDPreprocessor, int8_model_path
+from common import logger
+
+
+class ReIDCalibrationReader(CalibrationDataReader):
+    """从图像目录读取行人裁剪图, 按 ReID 推理时的方式预处理"""
+
+    def __init__(self, input_name: str, image_paths: List[str]):
+        self.input_name = input_name
+        self.image_paths = image_paths
+        self.preprocessor = ReIDPreprocessor((128, 256), capacity=1)
+        self._iter = iter(self.image_paths)
+
+    def get_next(self) -> Optional[dict]:
+        for path in self._iter:
+            img = cv2.imread(path)
+            if img is None:
+                continue
+            # 缓冲区会被复用, 交给量化工具前复制一份
+            return {self.input_name: self.preprocessor([img], 1).copy()}
+        return None
+
+    def rewind(self) -> None:
+        self._iter = iter(self.image_paths)
+
+
+def quantize_reid_model(
+    model_path: str,
+    output_path: str = None,
+    calibration_dir: str = None,
+    max_images: int = 200,
+) -> str:
+    """
+    将 FP32 ReID 模型量化为 INT8
+
+    Args:
+        model_path: FP32 模型路径
+        output_path: 输出路径, 默认为 *.int8.onnx
+        calibration_dir: 校准图像目录 (jpg/png), 为空时使用动态量化
+        max_images: 最多使用的校准图像数量
+
+    Returns:
+        str: 量化模型路径
+    """
+    import onnx
+
+    output_path = output_path or int8_model_path(model_path)
+
+    image_paths = []
+    if calibration_dir:
+        for pattern in ("*.jpg", "*.jpeg", "*.png"):
+            image_paths.extend(glob.glob(os.path.join(calibration_dir, pattern)))
+        image_paths = sorted(image_paths)[:max_images]
+
+    if not image_paths:
+        logger.info(f"未提供校准图像, 对 {model_path} 进行动态量化")
+        quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+        return output_path
+
+    # 静态量化前先做形状推理和图优化
+    preprocessed = f"{os.path.splitext(output_path)[0]}.pre.onnx"
+    quant_pre_process(model_path, preprocessed)
+    input_name = onnx.load(preprocessed, load_external_data=False).graph.input[0].name
+
+    logger.info(f"使用 {len(image_paths)} 张校准图像对 {model_path} 进行静态量化")
+    quantize_static(
+        preprocessed,
+        output_path,
+        ReIDCalibrationReader(input_name, image_paths),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    os.remove(preprocessed)
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ReID 模型 INT8 量化")
+    parser.add_argument("model_path", help="FP32 ONNX 模型路径")
+    parser.add_argument("--output", default=None, help="输出路径, 默认 *.int8.onnx")
+    parser.add_argument("--calibration-dir", default=None, help="校准图像目录")
+    parser.add_argument("--max-images", type=int, default=200)
+    args = parser.parse_args()
+
+    path = quantize_reid_model(
+        args.model_path, args.output, args.calibration_dir, args.max_images
+    )
+    print(f"量化模型已保存: {path}")
@@ -1,3 +1,4 @@
+import asyncio
 import base64
 from typing import List
 
@@ -13,15 +14,20 @@ from common._openai import chat_client, chat_model, chat_vlm_model
 from common._opendal import s3_operator
 from common._req import PaginatedRequest
 from common._resp import ApiPageResponse, ApiResponse, ListResponse
+from common._video_cache import video_cache
 
 init_db()
 
 
 def download_from_s3(s3_path: str, local_path: str):
+    """分块流式下载到 local_path, 内存占用与文件大小无关; 分析视频请使用 video_cache"""
     try:
-        data = s3_operator.read(s3_path)
-        with open(local_path, "wb") as f:
-            f.write(data)
+        with s3_operator.open(s3_path, "rb") as src, open(local_path, "wb") as dst:
+            while True:
+                chunk = src.read(8 * 1024 * 1024)
+                if not chunk:
+                    break
+                dst.write(chunk)
     except Exception as e:
         logger.error(f"Error downloading from S3: {e}")
         pass
@@ -64,6 +70,19 @@ async def presign_url(s3_path: str) -> str:
     return url
 
 
+def presign_read_url(s3_path: str, expire_second: int) -> str:
+    """
+    同步生成预签名URL，不经过缓存
+
+    供工作进程中的解码器直接读取视频，有效期按分析时长设置，避免读取过程中过期
+    """
+    return asyncio.run(
+        s3_operator.to_async_operator().presign_read(
+            s3_path, expire_second=expire_second
+        )
+    ).url
+
+
 def jieba_cut(text: str) -> List[str]:
     keywords = jieba.analyse.extract_tags(text, topK=5, withWeight=True)
     return list(k for k, _ in keywords)
@@ -90,8 +109,3 @@ def numpy_to_base64(frame: np.ndarray) -> str:
     """
     _, buffer = cv2.imencode(".png", frame)
     return f"data:image/png;base64,{base64.b64encode(buffer).decode('utf-8')}"
-
-
-def save_s3_temp_file(file_path: str) -> str:
-    download_from_s3(file_path, file_path)
-    return file_path
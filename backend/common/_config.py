@@ -12,6 +12,32 @@ class Settings(BaseSettings):
     openai_base_url: str = ""
     openai_model: str = "gpt-3.5-turbo"
     openai_vlm_model: str = "gpt-3.5-turbo-16k"
+    # ReID ONNX Runtime 会话配置
+    reid_intra_op_threads: int = 0  # 单个算子内的线程数, 0 表示由 ONNX Runtime 决定
+    reid_inter_op_threads: int = 0  # 算子间并行的线程数, 0 表示由 ONNX Runtime 决定
+    reid_graph_optimization: str = "all"  # disable / basic / extended / all
+    reid_enable_mem_arena: bool = True  # 是否启用 CPU 内存池
+    reid_io_binding: bool = False  # 是否使用 IO binding 直接绑定输入缓冲区
+    reid_int8: bool = False  # 是否优先加载 INT8 量化模型 (*.int8.onnx)
+    # 后台分析任务
+    job_workers: int = 0  # 分析进程数, 0 表示按 CPU 核数
+    segment_workers: int = 1  # 每个视频文件分析任务分段并行的进程数, 1 表示不分段
+    live_streams: int = 16  # 实时流进程内同时分析的实时流数量
+    live_detect_batch: int = 16  # 各路实时流合并检测的最大帧数, 0 表示各路流单独检测
+    live_detect_max_delay_ms: float = 20  # 合并检测时请求最多等待的毫秒数
+    # 视频本地缓存
+    video_cache_dir: str = ""  # 缓存目录, 为空时使用系统临时目录下的 object-seek-videos
+    video_cache_max_gb: float = 20  # 缓存容量上限 (GB), 超出时淘汰最久未使用的视频
+    s3_download_chunk_mb: int = 8  # 分块下载的块大小 (MB)
+    s3_parallel_threshold_mb: int = 64  # 超过该大小的视频并行分块下载 (MB)
+    s3_download_workers: int = 4  # 并行下载线程数
+    # 分析时的视频输入: cache / url / auto, 见 AlgoConfig.input_mode
+    video_input_mode: str = "cache"
+    video_url_min_size_mb: int = 256  # auto 模式下超过该大小的视频直接从预签名 URL 解码
+    # 视频上传
+    s3_upload_chunk_mb: int = 8  # 分段上传的段大小 (MB), 不小于 5
+    s3_upload_concurrency: int = 4  # 同时上传的分段数
+    video_upload_ttl_min: int = 60  # 上传后超过该分钟数仍未创建数据流的文件被删除
 
     class Config:
         env_prefix = ""  # 不加前缀
@@ -55,6 +55,9 @@ def init_db():
     from models.db.scenario import Scenario
     from models.db.stream import Stream
     from models.db.stream.stream_details import StreamDetails
+    from models.db.stream.stream_job import StreamJob
+    from models.db.stream.stream_roi import StreamRoi
+    from models.db.stream.video_file import VideoFile
 
     logger.info(f"init db, url: {engine.url}")
     create_database_if_not_exists(settings.database_url)
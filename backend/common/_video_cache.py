@@ -0,0 +1,347 @@
+""" 视频本地缓存
+
+从 S3 流式分块下载视频到本地缓存目录, 以对象内容标识 (ETag + 大小) 命名,
+同一视频的重复分析直接复用已下载的文件。
+
+- 小文件顺序分块下载, 大文件按块并行 range 读取后写入对应偏移, 内存占用只与块大小有关
+- 下载先写入 .part 临时文件, 完成后原子重命名, 同一视频同时只有一个进程下载
+- 每次 acquire 对缓存文件持有一把共享文件锁作为引用计数, release 时释放;
+  缓存超过容量上限时按最近使用时间淘汰, 只淘汰能加上独占锁 (没有被任何进程使用) 的文件
+- Windows 没有 fcntl: 下载锁使用 msvcrt.locking, 引用计数依靠打开的文件句柄,
+  被任何进程打开的文件都无法删除
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from common import logger, s3_operator, settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_MB = 1024 * 1024
+_PART_SUFFIX = ".part"
+_LOCK_SUFFIX = ".lock"
+_STALE_PART_SECONDS = 3600  # 超过该时间未更新的 .part 文件视为下载中断的残留
+
+
+class VideoCache:
+    """内容寻址、容量有限的视频本地缓存"""
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int,
+        chunk_size: int = 8 * _MB,
+        parallel_threshold: int = 64 * _MB,
+        parallel_workers: int = 4,
+        operator=None,
+    ):
+        """
+        Args:
+            root: 缓存目录
+            max_bytes: 缓存容量上限 (字节)
+            chunk_size: 分块下载的块大小 (字节)
+            parallel_threshold: 超过该大小的对象并行分块下载
+            parallel_workers: 并行下载线程数
+            operator: OpenDAL Operator, 默认使用全局 s3_operator
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = max(_MB, chunk_size)
+        self.parallel_threshold = parallel_threshold
+        self.parallel_workers = max(1, parallel_workers)
+        self.operator = operator or s3_operator
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._handles: Dict[str, List[int]] = defaultdict(list)  # 本进程持有的共享锁
+        self.hits = 0
+        self.misses = 0
+        self.downloaded_bytes = 0
+        self.evictions = 0
+
+    def acquire(self, s3_path: str) -> str:
+        """
+        获取视频的本地文件, 未缓存时先下载; 使用完毕后须调用 release
+
+        Args:
+            s3_path: 视频的 s3 路径
+
+        Returns:
+            str: 本地缓存文件路径
+        """
+        local_path, size = self._locate(s3_path)
+        with self._lock:
+            key_lock = self._key_locks[local_path]
+        with key_lock, _file_lock(local_path + _LOCK_SUFFIX):
+            if os.path.exists(local_path) and os.path.getsize(local_path) == size:
+                self.hits += 1
+                logger.info(f"视频缓存命中: {s3_path} -> {local_path}")
+            else:
+                self.misses += 1
+                self._evict(size)
+                start = time.perf_counter()
+                self._download(s3_path, local_path, size)
+                elapsed = time.perf_counter() - start
+                self.downloaded_bytes += size
+                logger.info(
+                    f"视频下载完成: {s3_path}, {size / _MB:.1f} MB, "
+                    f"{elapsed:.1f}s ({size / _MB / max(elapsed, 1e-6):.1f} MB/s)"
+                )
+            # 在释放下载锁之前加上共享锁, 避免刚下载完就被其他进程淘汰
+            fd = os.open(local_path, os.O_RDONLY)
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+            os.utime(local_path)
+        with self._lock:
+            self._handles[local_path].append(fd)
+        return local_path
+
+    def lookup(self, s3_path: str) -> Tuple[bool, int]:
+        """
+        查询视频是否已缓存, 不增加引用
+
+        Returns:
+            (是否已缓存, 对象大小)
+        """
+        local_path, size = self._locate(s3_path)
+        cached = os.path.exists(local_path) and os.path.getsize(local_path) == size
+        return cached, size
+
+    def add(self, s3_path: str, local_file: str) -> None:
+        """
+        将刚上传到 S3 的视频的本地副本放入缓存, 首次分析不必再下载
+
+        Args:
+            s3_path: 视频的 s3 路径 (已上传完成)
+            local_file: 本地副本, 应位于缓存目录下以便直接重命名; 放入缓存后不再存在
+        """
+        local_path, size = self._locate(s3_path)
+        with self._lock:
+            key_lock = self._key_locks[local_path]
+        with key_lock, _file_lock(local_path + _LOCK_SUFFIX):
+            if os.path.exists(local_path) or os.path.getsize(local_file) != size:
+                os.remove(local_file)
+                return
+            self._evict(size)
+            os.replace(local_file, local_path)
+
+    def temp_file(self, suffix: str = "") -> str:
+        """在缓存目录下创建一个临时文件名, 用于写入之后通过 add 放入缓存"""
+        return os.path.join(
+            self.root, f"{uuid.uuid4().hex}{suffix}.{os.getpid()}{_PART_SUFFIX}"
+        )
+
+    def release(self, local_path: str) -> None:
+        """释放 acquire 返回的本地文件, 引用全部释放后才可能被淘汰"""
+        with self._lock:
+            handles = self._handles.get(local_path)
+            if not handles:
+                return
+            fd = handles.pop()
+            if not handles:
+                del self._handles[local_path]
+        os.close(fd)
+
+    @contextmanager
+    def open(self, s3_path: str):
+        """with video_cache.open(s3_path) as local_path: ..."""
+        local_path = self.acquire(s3_path)
+        try:
+            yield local_path
+        finally:
+            self.release(local_path)
+
+    def stats(self) -> dict:
+        """缓存统计信息"""
+        files = self._cached_files()
+        return {
+            "root": self.root,
+            "files": len(files),
+            "bytes": sum(size for _, size, _ in files),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "downloaded_bytes": self.downloaded_bytes,
+            "evictions": self.evictions,
+        }
+
+    def _locate(self, s3_path: str) -> Tuple[str, int]:
+        """按对象的 ETag 和大小确定缓存文件名, 保留扩展名便于解码器识别格式"""
+        meta = self.operator.stat(s3_path)
+        size = meta.content_length
+        identity = meta.etag or s3_path
+        key = hashlib.sha256(f"{identity}:{size}".encode("utf-8")).hexdigest()[:32]
+        ext = os.path.splitext(s3_path)[1].lower()
+        return os.path.join(self.root, key + ext), size
+
+    def _download(self, s3_path: str, local_path: str, size: int) -> None:
+        part_path = f"{local_path}.{os.getpid()}{_PART_SUFFIX}"
+        try:
+            if size >= self.parallel_threshold and self.parallel_workers > 1:
+                self._download_parallel(s3_path, part_path, size)
+            else:
+                self._download_sequential(s3_path, part_path)
+            actual = os.path.getsize(part_path)
+            if actual != size:
+                raise IOError(f"下载不完整: {actual}/{size} 字节")
+            os.replace(part_path, local_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    def _download_sequential(self, s3_path: str, part_path: str) -> None:
+        with self.operator.open(s3_path, "rb") as src, open(part_path, "wb") as dst:
+            while True:
+                chunk = src.read(self.chunk_size)
+                if not chunk:
+                    break
+                dst.write(chunk)
+
+    def _download_parallel(self, s3_path: str, part_path: str, size: int) -> None:
+        """按块并行 range 读取, 各线程用各自的文件句柄写入文件对应偏移"""
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+
+        def fetch(offset: int) -> None:
+            length = min(self.chunk_size, size - offset)
+            src = self.operator.open(s3_path, "rb")
+            with src, open(part_path, "r+b") as dst:
+                src.seek(offset)
+                dst.seek(offset)
+                while length > 0:
+                    data = src.read(length)
+                    if not data:
+                        raise IOError(f"读取 {s3_path} 偏移 {offset} 时提前结束")
+                    dst.write(data)
+                    offset += len(data)
+                    length -= len(data)
+
+        with ThreadPoolExecutor(max_workers=self.parallel_workers) as executor:
+            # list() 使任一分块的异常在这里抛出
+            list(executor.map(fetch, range(0, size, self.chunk_size)))
+
+    def _cached_files(self) -> List[Tuple[str, int, float]]:
+        """缓存目录中已下载完成的文件: [(路径, 大小, 最近使用时间)]"""
+        files = []
+        for entry in os.scandir(self.root):
+            if not entry.is_file() or entry.name.endswith((_PART_SUFFIX, _LOCK_SUFFIX)):
+                continue
+            stat = entry.stat()
+            files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict(self, incoming: int) -> None:
+        """为即将下载的 incoming 字节腾出空间, 按最近使用时间从旧到新淘汰未被使用的文件"""
+        now = time.time()
+        for entry in os.scandir(self.root):
+            if (
+                entry.name.endswith(_PART_SUFFIX)
+                and now - entry.stat().st_mtime > _STALE_PART_SECONDS
+            ):
+                os.remove(entry.path)
+
+        files = sorted(self._cached_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total + incoming <= self.max_bytes:
+                break
+            if self._try_remove(path):
+                total -= size
+                self.evictions += 1
+                logger.info(f"视频缓存淘汰: {path}, {size / _MB:.1f} MB")
+        if total + incoming > self.max_bytes:
+            logger.warning(
+                f"视频缓存超出容量上限: {(total + incoming) / _MB:.1f} MB > "
+                f"{self.max_bytes / _MB:.1f} MB, 其余文件正在使用"
+            )
+
+    @staticmethod
+    def _try_remove(path: str) -> bool:
+        """文件没有正在下载或被引用时删除, 返回是否删除"""
+        with _file_lock(path + _LOCK_SUFFIX, blocking=False) as locked:
+            if not locked:
+                return False
+            return _remove_unused(path)
+
+
+def _remove_unused(path: str) -> bool:
+    """删除没有被任何进程引用 (持有共享锁或打开) 的文件, 返回是否删除"""
+    if fcntl is None:
+        # Windows 上被其他进程打开的文件无法删除
+        try:
+            os.remove(path)
+        except (FileNotFoundError, PermissionError):
+            return False
+        return True
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    else:
+        os.remove(path)
+        return True
+    finally:
+        os.close(fd)
+
+
+def _lock(fd: int, blocking: bool) -> bool:
+    """对文件加独占锁, 返回是否加锁成功"""
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+
+@contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    """跨进程的独占文件锁, 非阻塞模式下产出是否加锁成功"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        locked = _lock(fd, blocking)
+        try:
+            yield locked
+        finally:
+            if locked and fcntl is None:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+video_cache = VideoCache(
+    root=settings.video_cache_dir
+    or os.path.join(tempfile.gettempdir(), "object-seek-videos"),
+    max_bytes=int(settings.video_cache_max_gb * 1024 * _MB),
+    chunk_size=settings.s3_download_chunk_mb * _MB,
+    parallel_threshold=settings.s3_parallel_threshold_mb * _MB,
+    parallel_workers=settings.s3_download_workers,
+)
@@ -2,8 +2,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from common._background_tasks import start_cache_cleanup
-from routers import (algorithm_router, dashboard_router, scenario_router,
-                     status_router, stream_router)
+from routers import (algorithm_router, dashboard_router, job_router,
+                     scenario_router, status_router, stream_router)
 
 app = FastAPI()
 
@@ -23,6 +23,7 @@ app.include_router(algorithm_router)
 app.include_router(scenario_router)
 app.include_router(dashboard_router)
 app.include_router(stream_router)
+app.include_router(job_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Annotated, List, Optional
 
 from openai import BaseModel
+from pydantic import Field
 
 
 class CreateStreamRequest(BaseModel):
@@ -10,3 +11,10 @@ class CreateStreamRequest(BaseModel):
     scenario_id: Optional[int]
     stream_type: str
     stream_path: str
+
+
+class StreamRoiRequest(BaseModel):
+    # 多边形列表, 每个多边形为归一化坐标 [[x, y], ...], 取值范围[0,1]
+    polygons: List[List[List[float]]]
+    # 区域名称, 与 polygons 一一对应, 不超过 stream_roi.name 的长度
+    names: Optional[List[Annotated[str, Field(max_length=20)]]] = None
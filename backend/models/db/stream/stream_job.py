@@ -0,0 +1,43 @@
+import time
+
+from sqlalchemy import Column, Integer, SmallInteger, String, event
+
+from models.db import Base, ToDictMixin
+
+
+class StreamJob(Base, ToDictMixin):
+    __tablename__ = "stream_job"
+    __table_args__ = {"comment": "stream analysis job table"}
+
+    id = Column("job_id", Integer, primary_key=True, autoincrement=True)
+    stream_id = Column("stream_id", Integer, nullable=False, index=True)
+    created_at = Column(
+        Integer, default=lambda: int(time.time()), comment="创建时间(秒级时间戳)"
+    )
+    updated_at = Column(
+        Integer,
+        default=lambda: int(time.time()),
+        onupdate=lambda: int(time.time()),
+        comment="更新时间(秒级时间戳)",
+    )
+    is_deleted = Column(SmallInteger, default=0, comment="逻辑删除标记")
+
+    status = Column(
+        "status",
+        String(20),
+        nullable=False,
+        default="pending",
+        comment="任务状态, 包括 `pending`、`running`、`succeeded`、`failed`和`cancelled`",
+    )
+    progress = Column("progress", String(1024), nullable=True, comment="最新进度消息")
+    error = Column("error", String(1024), nullable=True, comment="失败原因")
+    result_path = Column(
+        "result_path", String(1024), nullable=True, comment="分析结果的S3路径"
+    )
+    started_at = Column(Integer, nullable=True, comment="开始时间(秒级时间戳)")
+    finished_at = Column(Integer, nullable=True, comment="结束时间(秒级时间戳)")
+
+
+@event.listens_for(StreamJob, "before_update", propagate=True)
+def update_timestamp_before_update(mapper, connection, target):
+    target.updated_at = int(time.time())
@@ -0,0 +1,94 @@
+from typing import List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from models.db.stream.stream import Stream
+from models.db.stream.stream_job import StreamJob
+
+# 未结束的任务状态
+ACTIVE_STATUSES = ("pending", "running")
+
+
+class StreamJobCrud:
+    @staticmethod
+    def create(session: Session, obj: Union[StreamJob, dict]) -> StreamJob:
+        if isinstance(obj, dict):
+            obj = StreamJob(**obj)
+
+        session.add(obj)
+        session.commit()
+        session.refresh(obj)
+        return obj
+
+    @staticmethod
+    def get_by_id(session: Session, id: int) -> Optional[StreamJob]:
+        return session.query(StreamJob).filter_by(id=id, is_deleted=0).first()
+
+    @staticmethod
+    def get_active_by_stream_id(
+        session: Session, stream_id: int
+    ) -> Optional[StreamJob]:
+        return (
+            session.query(StreamJob)
+            .filter(
+                StreamJob.stream_id == stream_id,
+                StreamJob.is_deleted == 0,
+                StreamJob.status.in_(ACTIVE_STATUSES),
+            )
+            .order_by(StreamJob.id.desc())
+            .first()
+        )
+
+    @staticmethod
+    def list_active(session: Session) -> List[StreamJob]:
+        return (
+            session.query(StreamJob)
+            .filter(StreamJob.is_deleted == 0, StreamJob.status.in_(ACTIVE_STATUSES))
+            .order_by(StreamJob.id)
+            .all()
+        )
+
+    @staticmethod
+    def list_by_stream_id(
+        session: Session, stream_id: int, offset: int = 0, limit: int = 20
+    ) -> List[StreamJob]:
+        return (
+            session.query(StreamJob)
+            .filter_by(stream_id=stream_id, is_deleted=0)
+            .order_by(StreamJob.id.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+
+    @staticmethod
+    def list_succeeded_by_stream_path(
+        session: Session, stream_path: str, exclude_stream_id: int, limit: int = 20
+    ) -> List[StreamJob]:
+        """指向同一文件的其他数据流已成功的任务, 最新的在前"""
+        return (
+            session.query(StreamJob)
+            .join(Stream, Stream.id == StreamJob.stream_id)
+            .filter(
+                Stream.stream_path == stream_path,
+                StreamJob.stream_id != exclude_stream_id,
+                StreamJob.is_deleted == 0,
+                StreamJob.status == "succeeded",
+                StreamJob.result_path.isnot(None),
+            )
+            .order_by(StreamJob.id.desc())
+            .limit(limit)
+            .all()
+        )
+
+    @staticmethod
+    def update(session: Session, id: int, updates: dict) -> Optional[StreamJob]:
+        obj = session.query(StreamJob).filter_by(id=id, is_deleted=0).first()
+        if not obj:
+            return None
+        for key, value in updates.items():
+            if hasattr(obj, key):
+                setattr(obj, key, value)
+        session.commit()
+        session.refresh(obj)
+        return obj
@@ -0,0 +1,35 @@
+import time
+
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, event
+
+from models.db import Base, ToDictMixin
+
+
+class StreamRoi(Base, ToDictMixin):
+    __tablename__ = "stream_roi"
+    __table_args__ = {"comment": "stream region of interest table"}
+
+    id = Column("id", Integer, primary_key=True, autoincrement=True)
+    stream_id = Column("stream_id", Integer, nullable=False, index=True)
+    created_at = Column(
+        Integer, default=lambda: int(time.time()), comment="创建时间(秒级时间戳)"
+    )
+    updated_at = Column(
+        Integer,
+        default=lambda: int(time.time()),
+        onupdate=lambda: int(time.time()),
+        comment="更新时间(秒级时间戳)",
+    )
+    is_deleted = Column(SmallInteger, default=0, comment="逻辑删除标记")
+    name = Column("name", String(20), nullable=True, comment="区域名称")
+    points = Column(
+        "points",
+        Text,
+        nullable=False,
+        comment="多边形顶点 JSON, 归一化坐标 [[x, y], ...], 取值范围[0,1]",
+    )
+
+
+@event.listens_for(StreamRoi, "before_update", propagate=True)
+def update_timestamp_before_update(mapper, connection, target):
+    target.updated_at = int(time.time())
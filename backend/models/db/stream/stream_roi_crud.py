@@ -0,0 +1,28 @@
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from models.db.stream.stream_roi import StreamRoi
+
+
+class StreamRoiCrud:
+    @staticmethod
+    def get_by_stream_id(session: Session, stream_id: int) -> List[StreamRoi]:
+        return (
+            session.query(StreamRoi)
+            .filter_by(stream_id=stream_id, is_deleted=0)
+            .order_by(StreamRoi.id)
+            .all()
+        )
+
+    @staticmethod
+    def replace(session: Session, stream_id: int, rois: List[dict]) -> List[StreamRoi]:
+        """用新的区域列表替换数据流已有的全部区域"""
+        for obj in StreamRoiCrud.get_by_stream_id(session, stream_id):
+            obj.is_deleted = 1
+        objs = [StreamRoi(stream_id=stream_id, **roi) for roi in rois]
+        session.add_all(objs)
+        session.commit()
+        for obj in objs:
+            session.refresh(obj)
+        return objs
@@ -0,0 +1,50 @@
+import time
+
+from sqlalchemy import (BigInteger, Column, Float, Integer, SmallInteger,
+                        String, event)
+
+from models.db import Base, ToDictMixin
+
+
+class VideoFile(Base, ToDictMixin):
+    __tablename__ = "video_file"
+    __table_args__ = {"comment": "content-addressed uploaded video file table"}
+
+    id = Column("video_file_id", Integer, primary_key=True, autoincrement=True)
+    created_at = Column(
+        Integer, default=lambda: int(time.time()), comment="创建时间(秒级时间戳)"
+    )
+    updated_at = Column(
+        Integer,
+        default=lambda: int(time.time()),
+        onupdate=lambda: int(time.time()),
+        comment="更新时间(秒级时间戳)",
+    )
+    is_deleted = Column(SmallInteger, default=0, comment="逻辑删除标记")
+
+    path = Column("path", String(255), nullable=False, index=True, comment="S3路径")
+    sha256 = Column(
+        "sha256", String(64), nullable=False, index=True, comment="文件内容的SHA-256"
+    )
+    size = Column("size", BigInteger, nullable=False, comment="文件大小(字节)")
+    fps = Column("fps", Float, nullable=True, comment="帧率")
+    width = Column("width", Integer, nullable=True, comment="宽度(像素)")
+    height = Column("height", Integer, nullable=True, comment="高度(像素)")
+    frame_count = Column("frame_count", Integer, nullable=True, comment="总帧数")
+    duration = Column("duration", Float, nullable=True, comment="时长(秒)")
+    codec = Column("codec", String(20), nullable=True, comment="视频编码 (FourCC)")
+    ref_count = Column(
+        "ref_count", Integer, nullable=False, default=0, comment="引用该文件的数据流数量"
+    )
+    pending_refs = Column(
+        "pending_refs",
+        Integer,
+        nullable=False,
+        default=0,
+        comment="上传后尚未创建数据流的预占引用数量",
+    )
+
+
+@event.listens_for(VideoFile, "before_update", propagate=True)
+def update_timestamp_before_update(mapper, connection, target):
+    target.updated_at = int(time.time())
@@ -0,0 +1,120 @@
+from typing import List, Optional, Union
+
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+
+from models.db.stream.video_file import VideoFile
+
+
+class VideoFileCrud:
+    @staticmethod
+    def create(session: Session, obj: Union[VideoFile, dict]) -> VideoFile:
+        if isinstance(obj, dict):
+            obj = VideoFile(**obj)
+
+        session.add(obj)
+        session.commit()
+        session.refresh(obj)
+        return obj
+
+    @staticmethod
+    def get_by_path(session: Session, path: str) -> Optional[VideoFile]:
+        return (
+            session.query(VideoFile)
+            .filter_by(path=path, is_deleted=0)
+            .order_by(VideoFile.id)
+            .first()
+        )
+
+    @staticmethod
+    def get_by_sha256(session: Session, sha256: str) -> Optional[VideoFile]:
+        """内容相同的文件中最早上传的一个"""
+        return (
+            session.query(VideoFile)
+            .filter_by(sha256=sha256, is_deleted=0)
+            .order_by(VideoFile.id)
+            .first()
+        )
+
+    @staticmethod
+    def _update(session: Session, id: int, values: dict) -> Optional[VideoFile]:
+        """原子地更新未删除的记录, 返回更新后的记录, 记录已删除时返回 None"""
+        updated = (
+            session.query(VideoFile)
+            .filter_by(id=id, is_deleted=0)
+            .update(values, synchronize_session=False)
+        )
+        session.commit()
+        if not updated:
+            return None
+        return session.query(VideoFile).filter_by(id=id).first()
+
+    @staticmethod
+    def add_ref(session: Session, id: int, delta: int) -> Optional[VideoFile]:
+        """原子地增减引用计数, 返回更新后的记录"""
+        return VideoFileCrud._update(
+            session, id, {VideoFile.ref_count: VideoFile.ref_count + delta}
+        )
+
+    @staticmethod
+    def add_pending_ref(session: Session, id: int) -> Optional[VideoFile]:
+        """上传后预占一次引用, 记录已删除时返回 None"""
+        return VideoFileCrud._update(
+            session, id, {VideoFile.pending_refs: VideoFile.pending_refs + 1}
+        )
+
+    @staticmethod
+    def attach(session: Session, id: int) -> Optional[VideoFile]:
+        """数据流创建后引用计数加一, 同时消耗一次上传时的预占引用"""
+        pending = case(
+            (VideoFile.pending_refs > 0, VideoFile.pending_refs - 1), else_=0
+        )
+        return VideoFileCrud._update(
+            session,
+            id,
+            {
+                VideoFile.ref_count: VideoFile.ref_count + 1,
+                VideoFile.pending_refs: pending,
+            },
+        )
+
+    @staticmethod
+    def clear_pending_refs(session: Session, before: int) -> List[VideoFile]:
+        """清除 before 之后没有更新过的预占引用, 返回被清除的记录"""
+        query = session.query(VideoFile).filter(
+            VideoFile.is_deleted == 0,
+            VideoFile.pending_refs > 0,
+            VideoFile.updated_at < before,
+        )
+        videos = query.all()
+        if videos:
+            query.filter(VideoFile.id.in_([v.id for v in videos])).update(
+                {VideoFile.pending_refs: 0}, synchronize_session=False
+            )
+            session.commit()
+        return videos
+
+    @staticmethod
+    def soft_delete_unreferenced(session: Session, id: int) -> bool:
+        """没有数据流引用也没有预占引用时删除记录, 判断和删除在同一条 UPDATE 中完成"""
+        updated = (
+            session.query(VideoFile)
+            .filter(
+                VideoFile.id == id,
+                VideoFile.is_deleted == 0,
+                VideoFile.ref_count <= 0,
+                VideoFile.pending_refs <= 0,
+            )
+            .update({VideoFile.is_deleted: 1}, synchronize_session=False)
+        )
+        session.commit()
+        return bool(updated)
+
+    @staticmethod
+    def soft_delete(session: Session, id: int) -> bool:
+        obj = session.query(VideoFile).filter_by(id=id, is_deleted=0).first()
+        if not obj:
+            return False
+        obj.is_deleted = 1
+        session.commit()
+        return True
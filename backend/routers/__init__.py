@@ -1,5 +1,6 @@
 from routers.algorithm_router import router as algorithm_router
 from routers.dashboard_router import router as dashboard_router
+from routers.job_router import router as job_router
 from routers.scenario_router import router as scenario_router
 from routers.status_router import router as status_router
 from routers.stream_router import router as stream_router
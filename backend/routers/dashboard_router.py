@@ -8,7 +8,7 @@ from common import ApiResponse, get_session, get_sync_session, logger
 from models.api.dashboard import Dashboard
 from models.db.algorithm.algorithm_crud import AlgorithmCrud
 from models.db.scenario.scenario_crud import ScenarioCrud
-from services import stream_service
+from services import stream_service, video_service
 from services.dashboard_service import (global_data, set_word_cloud,
                                         sync_refresh)
 
@@ -29,6 +29,13 @@ async def lifespan(app):
         id="refresh_globals",
         misfire_grace_time=300,
     )
+    scheduler.add_job(
+        video_service.expire_uploads,
+        args=[get_sync_session()],
+        trigger=IntervalTrigger(minutes=10),
+        id="expire_uploads",
+        misfire_grace_time=300,
+    )
     scheduler.start()
     logger.info("定时任务启动")
 
@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from sse_starlette.sse import EventSourceResponse
+
+from common import ApiResponse, get_session, logger
+from services import job_service
+from services.job_service import job_manager
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # 启动分析进程池, 模型在工作进程中加载和预热
+    await asyncio.to_thread(job_manager.start)
+
+    yield
+
+    await asyncio.to_thread(job_manager.shutdown)
+
+
+router = APIRouter(
+    prefix="/job",
+    tags=["job"],
+    lifespan=lifespan,
+)
+
+
+@router.post("/submit/{stream_id}", response_model=ApiResponse)
+async def submit_handler(
+    stream_id: int, session: Session = Depends(get_session)
+) -> ApiResponse:
+    """提交数据流分析任务, 已有未结束的任务时返回该任务"""
+    job = job_service.submit_job(session, stream_id)
+    if job is None:
+        return ApiResponse(message="数据不存在", code=500)
+    return ApiResponse(data=job.to_dict())
+
+
+@router.get("/list/{stream_id}", response_model=ApiResponse)
+async def list_handler(
+    stream_id: int, session: Session = Depends(get_session)
+) -> ApiResponse:
+    """获取数据流的分析任务列表"""
+    return ApiResponse(
+        data=[job.to_dict() for job in job_service.list_jobs(session, stream_id)]
+    )
+
+
+@router.get("/status/{id}", response_model=ApiResponse)
+async def status_handler(
+    id: int, session: Session = Depends(get_session)
+) -> ApiResponse:
+    """查看任务状态"""
+    job = job_service.get_job(session, id)
+    if job is None:
+        return ApiResponse(message="数据不存在", code=500)
+    return ApiResponse(data=job.to_dict())
+
+
+@router.post("/cancel/{id}", response_model=ApiResponse)
+async def cancel_handler(id: int) -> ApiResponse:
+    """取消排队中或执行中的任务"""
+    if not job_manager.cancel(id):
+        return ApiResponse(message="任务不存在或已结束", code=500)
+    return ApiResponse(data=id, message="已请求取消")
+
+
+@router.get("/result/{id}", response_model=ApiResponse)
+async def result_handler(
+    id: int, session: Session = Depends(get_session)
+) -> ApiResponse:
+    """获取任务的分析结果"""
+    job = job_service.get_job(session, id)
+    if job is None:
+        return ApiResponse(message="数据不存在", code=500)
+    try:
+        result = await asyncio.to_thread(job_service.load_result, job)
+    except Exception as e:
+        logger.error(f"读取任务结果失败: {e}")
+        return ApiResponse(message=f"读取任务结果失败: {e}", code=500)
+    if result is None:
+        return ApiResponse(data=job.to_dict(), message=f"任务状态: {job.status}", code=500)
+    return ApiResponse(data=result)
+
+
+@router.get("/events/{id}")
+async def events_handler(id: int):
+    """订阅任务进度, 断开连接不会影响任务执行"""
+    return EventSourceResponse(
+        job_manager.subscribe(id), media_type="text/event-stream"
+    )
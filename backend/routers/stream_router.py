@@ -1,15 +1,13 @@
-import uuid
-from pathlib import Path
-
 from fastapi import APIRouter, Depends, File, UploadFile
 from sqlalchemy.orm import Session
 from sse_starlette.sse import EventSourceResponse
 
 from common import (ApiPageResponse, ApiResponse, ListResponse,
                     PaginatedRequest, clear_expired_cache, get_cache_stats,
-                    get_session, logger, presign_url, s3_operator)
-from models.api.stream import CreateStreamRequest
-from services import stream_service
+                    get_session, logger, presign_url)
+from models.api.stream import CreateStreamRequest, StreamRoiRequest
+from services import job_service, stream_service, video_service
+from services.job_service import job_manager
 
 router = APIRouter(
     prefix="/stream",
@@ -52,13 +50,43 @@ async def catalog(session: Session = Depends(get_session)) -> ApiResponse:
 
 @router.get("/analyze/{id}")
 async def analyze(id: int, session: Session = Depends(get_session)):
-    from ai.algo_1 import Algo_1
-
-    obj = stream_service.get_by_id(session, id)
-    if obj is None:
+    """提交分析任务 (已有未结束的任务时直接复用) 并订阅进度"""
+    job = job_service.submit_job(session, id)
+    if job is None:
         return EventSourceResponse(["error: object not found", "[DONE]"])
-    al = Algo_1(video_path=obj.stream_path)
-    return EventSourceResponse(al.run(), media_type="text/event-stream")
+    return EventSourceResponse(
+        job_manager.subscribe(job.id), media_type="text/event-stream"
+    )
+
+
+@router.get("/roi/{id}", response_model=ApiResponse)
+async def get_roi_handler(
+    id: int, session: Session = Depends(get_session)
+) -> ApiResponse:
+    """获取数据流的感兴趣区域"""
+    return ApiResponse(data=stream_service.get_roi(session, id))
+
+
+@router.post("/roi/{id}", response_model=ApiResponse)
+async def set_roi_handler(
+    id: int, request: StreamRoiRequest, session: Session = Depends(get_session)
+) -> ApiResponse:
+    """设置数据流的感兴趣区域, 分析时只检测区域内的行人"""
+    try:
+        data = stream_service.set_roi(session, id, request)
+    except ValueError as e:
+        return ApiResponse(message=str(e), code=500)
+    if data is None:
+        return ApiResponse(message="数据不存在", code=500)
+    return ApiResponse(data=data)
+
+
+@router.get("/delete/{id}", response_model=ApiResponse)
+async def delete_stream_handler(
+    id: int, session: Session = Depends(get_session)
+) -> ApiResponse:
+    """删除数据流, 上传的文件没有其他数据流引用时一并删除"""
+    return ApiResponse(data=stream_service.delete(session, id))
 
 
 @router.get("/view/{id}", response_model=ApiResponse)
@@ -75,42 +103,46 @@ async def view_handler(id: int, session: Session = Depends(get_session)) -> ApiR
 
 
 @router.post("/upload", response_model=ApiResponse)
-async def upload_file_handler(file: UploadFile = File(...)):
+async def upload_file_handler(
+    file: UploadFile = File(...), session: Session = Depends(get_session)
+):
     """
     文件上传接口
-    上传文件到本地 MinIO，文件名使用 UUID + 原始文件后缀
+    流式上传文件到本地 MinIO，文件名使用 UUID + 原始文件后缀，同时保存 SHA-256 和视频元数据
+    与已上传文件内容相同时复用已有文件
     成功返回文件名，失败返回 None
     """
     try:
         logger.info(f"开始上传文件: {file.filename}")
-
-        # 获取文件后缀
-        file_suffix = Path(file.filename).suffix if file.filename else ""
-
-        # 生成新的文件名: UUID + 原始后缀
-        new_filename = f"{uuid.uuid4()}{file_suffix}"
-
-        # 读取文件内容
-        file_content = await file.read()
-
-        # 使用 OpenDAL 上传到 MinIO
-        s3_operator.write(new_filename, file_content)
-
-        logger.info(f"文件上传成功: {new_filename}")
-        return ApiResponse(data=new_filename, message="文件上传成功", code=200)
+        video, duplicated = await video_service.upload_video(session, file)
+        logger.info(f"文件上传成功: {video.path}")
+        message = "文件已存在, 复用已上传的文件" if duplicated else "文件上传成功"
+        return ApiResponse(data=video.path, message=message, code=200)
 
     except Exception as e:
         logger.error(f"文件上传失败: {str(e)}")
         return ApiResponse(data=None, message=f"文件上传失败: {str(e)}", code=500)
 
 
+@router.get("/video/{id}", response_model=ApiResponse)
+async def video_meta_handler(
+    id: int, session: Session = Depends(get_session)
+) -> ApiResponse:
+    """获取数据流的视频元数据 (帧率、分辨率、时长、编码等), 上传时探测得到"""
+    obj = stream_service.get_by_id(session, id)
+    if not obj:
+        return ApiResponse(message="数据不存在", code=500)
+    return ApiResponse(data=video_service.get_video_meta(session, obj))
+
+
 @router.get("/cache/stats", response_model=ApiResponse)
 async def get_cache_stats_handler() -> ApiResponse:
     """
-    获取缓存统计信息
+    获取缓存统计信息, 包括各分析进程已加载模型的加载耗时和内存占用
     """
     try:
         stats = get_cache_stats()
+        stats["models"] = job_manager.model_stats()
         return ApiResponse(data=stats, message="获取缓存统计成功", code=200)
     except Exception as e:
         logger.error(f"获取缓存统计失败: {str(e)}")
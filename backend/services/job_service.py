@@ -0,0 +1,761 @@
+""" 后台分析任务
+
+任务持久化在 stream_job 表中, 在进程池中执行, 与发起请求的 SSE 连接解耦:
+客户端断开后任务继续执行, 重新订阅即可继续接收进度。
+服务重启时, 未结束的任务重新入队。
+
+实时流任务不占用进程池, 而是以线程方式运行在一个单独的实时流进程中,
+各路流共享模型, 检测请求合并为批量推理。
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from common import get_sync_session, logger, s3_operator, settings
+from models.db.stream.stream import Stream
+from models.db.stream.stream_details_crud import StreamDetailsCrud
+from models.db.stream.stream_job import StreamJob
+from models.db.stream.stream_job_crud import StreamJobCrud
+from services import stream_service, video_service
+
+_JOB_STARTED = "__JOB_STARTED__"  # 工作进程开始执行任务
+_JOB_END = "__JOB_END__"  # 任务结束 (成功、失败或取消)
+_JOB_RESULT = "__JOB_RESULT__"  # 实时流进程中的任务结束, 附带结果路径或错误
+_MODEL_STATS = "__MODEL_STATS__"  # 工作进程上报模型注册表统计, job_id 为 None
+_LIVE_HOST_EXITED = "__LIVE_HOST_EXITED__"  # 实时流进程异常退出, job_id 为 None
+_DONE = "[DONE]"
+_HISTORY_LIMIT = 1000  # 每个任务回放给新订阅者的最多消息数, 实时流任务会持续产生消息
+_LIVE_CHECK_SEC = 5  # 分发线程检查实时流进程是否存活的间隔
+_WARMUP_TIMEOUT_SEC = 600  # 启动时等待全部工作进程完成预热的最长时间
+
+
+def _init_worker(messages) -> None:
+    """工作进程初始化: 加载并预热模型, 同一进程内的后续任务直接复用"""
+    from ai.algo_1 import warmup_models
+
+    try:
+        warmup_models()
+    except Exception as e:
+        logger.error(f"模型预热失败: {e}")
+    _report_models(messages)
+
+
+def _model_stats() -> Tuple[str, dict]:
+    """本进程的名称和模型注册表的加载耗时、内存占用"""
+    from ai._registry import model_registry
+
+    process = multiprocessing.current_process()
+    return process.name, {"pid": process.pid, "models": model_registry.stats()}
+
+
+def _report_models(messages) -> None:
+    """把本进程的模型统计发给 API 进程"""
+    messages.put((None, (_MODEL_STATS, *_model_stats())))
+
+
+def _wait_workers(barrier) -> Tuple[str, dict]:
+    """
+    进程池启动任务: 每个任务占住一个工作进程, 直到全部工作进程都已启动并完成预热
+
+    Returns:
+        本进程的名称和模型统计
+    """
+    barrier.wait(_WARMUP_TIMEOUT_SEC)
+    return _model_stats()
+
+
+def run_analysis_job(
+    job_id: int,
+    stream_id: int,
+    stream_path: str,
+    roi: Optional[list],
+    video_meta: Optional[dict],
+    reid_workers: int,
+    messages,
+    cancel_event,
+    live: bool = False,
+) -> Optional[str]:
+    """
+    在工作进程中执行一次分析
+
+    Args:
+        job_id: 任务 id
+        stream_id: 数据流 id
+        stream_path: 视频的 s3 路径或实时流地址
+        roi: 感兴趣区域多边形
+        video_meta: 上传时探测的视频元数据
+        reid_workers: 每个任务的 ReID 推理线程数
+        messages: 进度队列, 元素为 (job_id, message)
+        cancel_event: 取消标记
+        live: 在实时流进程中执行, 与其他实时流合并检测
+
+    Returns:
+        Optional[str]: 结果的 S3 路径, 任务被取消时返回 None
+    """
+    from ai._basic import AlgoConfig
+    from ai.algo_1 import Algo_1
+
+    messages.put((job_id, _JOB_STARTED))
+    algo = Algo_1(
+        video_path=stream_path,
+        config=AlgoConfig(
+            reid_workers=reid_workers,
+            segment_workers=settings.segment_workers,
+            input_mode=settings.video_input_mode,
+            url_min_size_mb=settings.video_url_min_size_mb,
+            shared_detect_batch_size=settings.live_detect_batch if live else 0,
+            shared_detect_max_delay_ms=settings.live_detect_max_delay_ms,
+        ),
+        roi=roi,
+        video_meta=video_meta,
+    )
+    # 任务可能加载了预热以外的模型
+    _report_models(messages)
+
+    # 取消标记在 Manager 进程中, 由后台线程轮询后转给分析线程
+    finished = threading.Event()
+
+    def watch_cancel() -> None:
+        while not finished.wait(0.5):
+            if cancel_event.is_set():
+                algo.cancel()
+                return
+
+    threading.Thread(target=watch_cancel, daemon=True).start()
+    try:
+        for message in algo.analyze():
+            if message != _DONE:
+                messages.put((job_id, message))
+    finally:
+        finished.set()
+
+    if algo.cancelled:
+        return None
+
+    result_path = f"results/{stream_id}/{job_id}.json"
+    s3_operator.write(result_path, json.dumps(algo.summary()).encode("utf-8"))
+    return result_path
+
+
+def run_live_host(commands, messages, max_streams: int) -> None:
+    """
+    实时流进程的入口: 每个实时流任务在一个线程中执行, 同一进程内共享模型和批量检测服务
+
+    Args:
+        commands: 任务队列, 元素为 run_analysis_job 除 messages 以外的参数, None 表示退出
+        messages: 进度队列, 任务结束时写入 (job_id, (_JOB_RESULT, 结果路径, 错误))
+        max_streams: 同时分析的实时流数量, 超出的任务排队等待
+    """
+    _init_worker(messages)
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, max_streams), thread_name_prefix="live-job"
+    )
+
+    def run(job_id, stream_id, stream_path, roi, video_meta, reid_workers, cancel):
+        if cancel.is_set():
+            # 排队期间已被取消
+            return None
+        return run_analysis_job(
+            job_id,
+            stream_id,
+            stream_path,
+            roi,
+            video_meta,
+            reid_workers,
+            messages,
+            cancel,
+            live=True,
+        )
+
+    def report(job_id: int, future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.error(f"实时流任务 {job_id} 执行失败: {error}")
+            messages.put((job_id, (_JOB_RESULT, None, str(error))))
+        else:
+            messages.put((job_id, (_JOB_RESULT, future.result(), None)))
+
+    try:
+        while True:
+            command = commands.get()
+            if command is None:
+                break
+            future = executor.submit(run, *command)
+            future.add_done_callback(lambda f, job_id=command[0]: report(job_id, f))
+    finally:
+        executor.shutdown(wait=True)
+
+
+class _LiveHost:
+    """
+    实时流进程, 首次提交实时流任务时启动
+
+    进程异常退出后, 向消息队列写入 (None, (_LIVE_HOST_EXITED, 启动序号)),
+    该进程此前发出的消息都排在它前面; 下次提交任务时重新启动进程。
+    """
+
+    def __init__(self, context, manager, messages, max_streams: int):
+        self.max_streams = max_streams
+        self._context = context
+        self._manager = manager
+        self._messages = messages
+        self._commands = None
+        self._process = None
+        self._generation = 0  # 进程的启动序号
+        self._lock = threading.Lock()
+
+    def submit(self, command: tuple) -> int:
+        """
+        提交任务, 实时流进程未启动或已退出时 (重新) 启动
+
+        Returns:
+            int: 执行该任务的进程的启动序号
+        """
+        with self._lock:
+            self._reap()
+            if self._process is None:
+                self._generation += 1
+                self._commands = self._manager.Queue()
+                self._process = self._context.Process(
+                    target=run_live_host,
+                    args=(self._commands, self._messages, self.max_streams),
+                    name="live-host",
+                    daemon=True,
+                )
+                self._process.start()
+                logger.info(f"实时流进程已启动, 最多同时分析 {self.max_streams} 路流")
+            self._commands.put(command)
+            return self._generation
+
+    def check(self) -> None:
+        """检查实时流进程是否存活, 由分发线程定期调用"""
+        with self._lock:
+            self._reap()
+
+    def _reap(self) -> None:
+        if self._process is None or self._process.is_alive():
+            return
+        logger.error(f"实时流进程异常退出, 退出码: {self._process.exitcode}")
+        self._process = None
+        self._messages.put((None, (_LIVE_HOST_EXITED, self._generation)))
+
+    def stop(self, timeout: float = 30) -> None:
+        """通知实时流进程退出, 调用前应先设置各任务的取消标记"""
+        with self._lock:
+            if self._process is None:
+                return
+            self._commands.put(None)
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+
+
+class _JobState:
+    """运行中任务在 API 进程内的状态"""
+
+    def __init__(self, job_id: int, stream_id: int, cancel_event, live: bool = False):
+        self.job_id = job_id
+        self.stream_id = stream_id
+        self.cancel_event = cancel_event
+        self.live = live  # 在实时流进程中执行, future 由分发线程根据消息完成
+        self.generation = 0  # 实时流任务所在实时流进程的启动序号
+        self.future: Optional[Future] = None
+        # 最近产生的进度消息, 新订阅者先回放
+        self.history: deque = deque(maxlen=_HISTORY_LIMIT)
+        self.subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+
+
+class JobManager:
+    """
+    分析任务管理器
+
+    - 任务在 spawn 方式创建的进程池中执行, 进程数默认等于 CPU 核数
+    - 启动时即创建全部工作进程并预热模型; 工作进程异常退出后重建进程池
+    - 工作进程通过 Manager 队列回传进度, 由一个分发线程写入数据库并推送给订阅者
+    - 每个任务的 ReID 线程数按 CPU 核数 / 进程数分配, 避免超额订阅
+    - 实时流 (stream_type 为 stream) 的任务提交到实时流进程, 与其他实时流合并检测
+    """
+
+    def __init__(self, max_workers: int = None):
+        cpu_count = os.cpu_count() or 1
+        self.max_workers = max_workers or settings.job_workers or cpu_count
+        self.reid_workers = max(1, cpu_count // self.max_workers)
+        self.live_reid_workers = max(1, cpu_count // max(1, settings.live_streams))
+        self._jobs: Dict[int, _JobState] = {}
+        self._model_stats: Dict[str, dict] = {}  # 进程名 → 该进程的模型注册表统计
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._context = None
+        self._live_host: Optional[_LiveHost] = None
+        self._manager = None
+        self._messages = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._closing = False
+
+    def start(self) -> None:
+        """启动并预热全部工作进程和分发线程, 并重新提交上次未结束的任务"""
+        self._context = multiprocessing.get_context("spawn")
+        self._manager = self._context.Manager()
+        self._messages = self._manager.Queue()
+        self._live_host = _LiveHost(
+            self._context, self._manager, self._messages, settings.live_streams
+        )
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name="job-dispatcher", daemon=True
+        )
+        self._dispatcher.start()
+        self._start_executor(wait=True)
+        logger.info(f"分析任务进程池已启动, 进程数: {self.max_workers}")
+
+        session = get_sync_session()
+        try:
+            for job in StreamJobCrud.list_active(session):
+                stream = stream_service.get_by_id(session, job.stream_id)
+                if stream is None:
+                    StreamJobCrud.update(
+                        session,
+                        job.id,
+                        {
+                            "status": "failed",
+                            "error": "数据流不存在",
+                            "finished_at": int(time.time()),
+                        },
+                    )
+                    continue
+                StreamJobCrud.update(session, job.id, {"status": "pending"})
+                self._enqueue(session, job, stream)
+                logger.info(f"重新提交未完成的任务 {job.id}")
+        finally:
+            session.close()
+
+    def _start_executor(self, wait: bool) -> None:
+        """
+        创建进程池并立即启动全部工作进程, 工作进程初始化时加载和预热模型
+
+        进程池默认在提交任务时才按需创建工作进程, 这里提交 max_workers 个互相等待的任务,
+        使每个工作进程都执行一个, 首个分析任务不必再等待模型加载。
+
+        Args:
+            wait: 是否等待全部工作进程完成预热
+        """
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(self._messages,),
+        )
+        barrier = self._manager.Barrier(self.max_workers)
+        futures = [
+            executor.submit(_wait_workers, barrier) for _ in range(self.max_workers)
+        ]
+        self._executor = executor
+        if not wait:
+            return
+        for future in futures:
+            try:
+                name, stats = future.result()
+            except Exception as e:
+                logger.error(f"工作进程预热失败: {e}")
+                continue
+            with self._lock:
+                self._model_stats[name] = stats
+
+    def _submit(self, fn, *args) -> Future:
+        """提交到进程池, 进程池因工作进程异常退出而损坏时重建后再提交"""
+        executor = self._executor
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._restart_executor(executor)
+            executor = self._executor
+            future = executor.submit(fn, *args)
+        future.add_done_callback(lambda f: self._check_executor(executor, f))
+        return future
+
+    def _check_executor(self, executor: ProcessPoolExecutor, future: Future) -> None:
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._restart_executor(executor)
+
+    def _restart_executor(self, broken: ProcessPoolExecutor) -> None:
+        """
+        工作进程异常退出 (例如内存不足) 后进程池不再可用, 重建进程池
+
+        原进程池中执行和排队的任务以 BrokenProcessPool 结束, 按失败处理
+        """
+        with self._executor_lock:
+            if self._executor is not broken or self._closing:
+                return
+            logger.error("分析进程池中有工作进程异常退出, 重建进程池")
+            broken.shutdown(wait=False)
+            self._start_executor(wait=False)
+
+    def shutdown(self) -> None:
+        """
+        停止所有任务并关闭进程池
+
+        任务状态保持不变, 下次启动时重新提交
+        """
+        self._closing = True
+        with self._lock:
+            states = list(self._jobs.values())
+        for state in states:
+            state.cancel_event.set()
+        with self._executor_lock:
+            executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if self._live_host is not None:
+            self._live_host.stop()
+        if self._messages is not None:
+            self._messages.put(None)
+            self._dispatcher.join(timeout=5)
+            self._manager.shutdown()
+        logger.info("分析任务进程池已关闭")
+
+    def submit(self, session: Session, stream: Stream) -> StreamJob:
+        """
+        提交分析任务, 该数据流已有未结束的任务时直接返回该任务;
+        内容相同的文件已在其他数据流上分析过 (感兴趣区域也相同) 时直接复用其结果
+
+        Args:
+            session: 数据库会话
+            stream: 数据流
+
+        Returns:
+            StreamJob: 新建或已存在的任务
+        """
+        with self._lock:
+            job = StreamJobCrud.get_active_by_stream_id(session, stream.id)
+            if job is not None:
+                return job
+            job = self._reuse_result(session, stream)
+            if job is not None:
+                return job
+            job = StreamJobCrud.create(
+                session, {"stream_id": stream.id, "status": "pending"}
+            )
+            self._enqueue(session, job, stream, locked=True)
+        return job
+
+    def model_stats(self) -> Dict[str, dict]:
+        """各工作进程已加载模型的加载耗时和内存占用, 进程启动或执行任务后上报"""
+        # 已退出的工作进程 (例如进程池重建前的) 不再展示
+        alive = {process.pid for process in multiprocessing.active_children()}
+        with self._lock:
+            return {
+                name: dict(stats)
+                for name, stats in self._model_stats.items()
+                if stats["pid"] in alive
+            }
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        取消任务, 排队中的任务直接移出队列, 执行中的任务在下一帧停止
+
+        Returns:
+            bool: 任务是否在运行或排队
+        """
+        with self._lock:
+            state = self._jobs.get(job_id)
+        if state is None:
+            return False
+        state.cancel_event.set()
+        state.future.cancel()
+        return True
+
+    async def subscribe(self, job_id: int):
+        """
+        订阅任务进度, 先回放已产生的消息, 再推送新消息, 以 [DONE] 结束
+
+        客户端断开只会取消订阅, 不会影响任务执行
+        """
+        loop = asyncio.get_running_loop()
+        subscriber_queue: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is not None:
+                history = list(state.history)
+                state.subscribers.append((loop, subscriber_queue))
+
+        if state is None:
+            # 任务已结束 (或不存在), 返回数据库中的最终状态
+            job = await asyncio.to_thread(self._load, job_id)
+            if job is None:
+                yield "error: job not found"
+            else:
+                yield _final_message(job.status, job.progress, job.error)
+            yield _DONE
+            return
+
+        try:
+            for message in history:
+                yield message
+                if message == _DONE:
+                    return
+            while True:
+                message = await subscriber_queue.get()
+                yield message
+                if message == _DONE:
+                    break
+        finally:
+            with self._lock:
+                if (loop, subscriber_queue) in state.subscribers:
+                    state.subscribers.remove((loop, subscriber_queue))
+
+    @staticmethod
+    def _reuse_result(session: Session, stream: Stream) -> Optional[StreamJob]:
+        """
+        上传文件按内容去重后, 多个数据流可能指向同一个 S3 对象,
+        其中任一数据流以相同的感兴趣区域分析成功过时, 直接创建一个引用该结果的已完成任务
+        """
+        if video_service.get_video_file(session, stream) is None:
+            return None
+        roi = stream_service.get_roi(session, stream.id)
+        for source in StreamJobCrud.list_succeeded_by_stream_path(
+            session, stream.stream_path, stream.id
+        ):
+            if stream_service.get_roi(session, source.stream_id) != roi:
+                continue
+            now = int(time.time())
+            job = StreamJobCrud.create(
+                session,
+                {
+                    "stream_id": stream.id,
+                    "status": "succeeded",
+                    "progress": f"视频内容与已分析的文件相同, 复用任务 {source.id} 的分析结果",
+                    "result_path": source.result_path,
+                    "started_at": now,
+                    "finished_at": now,
+                },
+            )
+            StreamDetailsCrud.create(
+                session, {"stream_id": stream.id, "save_path": source.result_path}
+            )
+            logger.info(f"数据流 {stream.id} 复用任务 {source.id} 的分析结果")
+            return job
+        return None
+
+    def _enqueue(
+        self, session: Session, job: StreamJob, stream: Stream, locked: bool = False
+    ) -> None:
+        job_id = job.id
+        live = stream.stream_type == "stream"
+        state = _JobState(job_id, stream.id, self._manager.Event(), live=live)
+        roi = stream_service.get_roi(session, stream.id) or None
+        video_meta = video_service.get_video_meta(session, stream)
+        if live:
+            state.future = Future()
+            state.generation = self._live_host.submit(
+                (
+                    job_id,
+                    stream.id,
+                    stream.stream_path,
+                    roi,
+                    video_meta,
+                    self.live_reid_workers,
+                    state.cancel_event,
+                )
+            )
+        else:
+            state.future = self._submit(
+                run_analysis_job,
+                job_id,
+                stream.id,
+                stream.stream_path,
+                roi,
+                video_meta,
+                self.reid_workers,
+                self._messages,
+                state.cancel_event,
+            )
+        if locked:
+            self._jobs[job_id] = state
+        else:
+            with self._lock:
+                self._jobs[job_id] = state
+        # 工作进程的进度消息先于结束标记进入队列
+        state.future.add_done_callback(lambda _: self._messages.put((job_id, _JOB_END)))
+
+    def _dispatch(self) -> None:
+        """分发线程: 读取工作进程的消息, 更新数据库并推送给订阅者"""
+        checked_at = time.monotonic()
+        while True:
+            if time.monotonic() - checked_at >= _LIVE_CHECK_SEC:
+                checked_at = time.monotonic()
+                self._live_host.check()
+            try:
+                item = self._messages.get(timeout=_LIVE_CHECK_SEC)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            job_id, message = item
+            try:
+                if isinstance(message, tuple) and message[0] == _MODEL_STATS:
+                    with self._lock:
+                        self._model_stats[message[1]] = message[2]
+                elif isinstance(message, tuple) and message[0] == _LIVE_HOST_EXITED:
+                    self._fail_live(message[1])
+                elif message == _JOB_STARTED:
+                    self._start_live(job_id)
+                    self._update(
+                        job_id, {"status": "running", "started_at": int(time.time())}
+                    )
+                elif message == _JOB_END:
+                    self._finish(job_id)
+                elif isinstance(message, tuple) and message[0] == _JOB_RESULT:
+                    self._resolve_live(job_id, *message[1:])
+                else:
+                    self._update(job_id, {"progress": str(message)[:1024]})
+                    self._broadcast(job_id, message)
+            except Exception as e:
+                logger.error(f"处理任务 {job_id} 的消息出错: {e}")
+
+    def _start_live(self, job_id: int) -> None:
+        """实时流任务开始执行后不能再直接取消 future, 需等待任务检查到取消标记"""
+        with self._lock:
+            state = self._jobs.get(job_id)
+        if state is not None and state.live:
+            state.future.set_running_or_notify_cancel()
+
+    def _resolve_live(
+        self, job_id: int, result: Optional[str], error: Optional[str]
+    ) -> None:
+        """实时流进程中的任务结束, 完成对应的 future, 之后按普通任务处理结束状态"""
+        with self._lock:
+            state = self._jobs.get(job_id)
+        if state is None or not state.live or state.future.done():
+            return
+        if error is not None:
+            state.future.set_exception(RuntimeError(error))
+        else:
+            state.future.set_result(result)
+
+    def _fail_live(self, generation: int) -> None:
+        """实时流进程异常退出, 其中未结束的任务按失败处理"""
+        with self._lock:
+            states = [
+                state
+                for state in self._jobs.values()
+                if state.live and state.generation == generation
+            ]
+        for state in states:
+            if not state.future.done():
+                state.future.set_exception(RuntimeError("实时流进程异常退出"))
+
+    def _finish(self, job_id: int) -> None:
+        with self._lock:
+            state = self._jobs.get(job_id)
+        if state is None or self._closing:
+            # 服务关闭时保留任务状态, 下次启动时重新提交
+            return
+
+        future = state.future
+        updates = {"finished_at": int(time.time())}
+        if future.cancelled():
+            updates["status"] = "cancelled"
+        elif future.exception() is not None:
+            updates["status"] = "failed"
+            updates["error"] = str(future.exception())[:1024]
+            logger.error(f"任务 {job_id} 执行失败: {future.exception()}")
+        elif future.result() is None:
+            updates["status"] = "cancelled"
+        else:
+            updates["status"] = "succeeded"
+            updates["result_path"] = future.result()
+            session = get_sync_session()
+            try:
+                StreamDetailsCrud.create(
+                    session,
+                    {"stream_id": state.stream_id, "save_path": future.result()},
+                )
+            finally:
+                session.close()
+
+        self._update(job_id, updates)
+        if updates["status"] != "succeeded":
+            self._broadcast(
+                job_id, _final_message(updates["status"], None, updates.get("error"))
+            )
+        self._broadcast(job_id, _DONE)
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _broadcast(self, job_id: int, message: str) -> None:
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is None:
+                return
+            state.history.append(message)
+            subscribers = list(state.subscribers)
+        for loop, subscriber_queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(subscriber_queue.put_nowait, message)
+            except RuntimeError:
+                # 订阅者的事件循环已关闭
+                pass
+
+    @staticmethod
+    def _update(job_id: int, updates: dict) -> None:
+        session = get_sync_session()
+        try:
+            StreamJobCrud.update(session, job_id, updates)
+        finally:
+            session.close()
+
+    @staticmethod
+    def _load(job_id: int) -> Optional[StreamJob]:
+        session = get_sync_session()
+        try:
+            return StreamJobCrud.get_by_id(session, job_id)
+        finally:
+            session.close()
+
+
+def _final_message(status: str, progress: Optional[str], error: Optional[str]) -> str:
+    """已结束任务的最终状态消息"""
+    if status == "failed":
+        return f"error: {error}"
+    if status == "cancelled":
+        return "任务已取消"
+    return progress or status
+
+
+# 全局任务管理器, 由 job_router 的 lifespan 启动和关闭
+job_manager = JobManager()
+
+
+def get_job(session: Session, job_id: int) -> Optional[StreamJob]:
+    return StreamJobCrud.get_by_id(session, job_id)
+
+
+def list_jobs(session: Session, stream_id: int) -> List[StreamJob]:
+    return StreamJobCrud.list_by_stream_id(session, stream_id)
+
+
+def submit_job(session: Session, stream_id: int) -> Optional[StreamJob]:
+    """提交或复用数据流的分析任务, 数据流不存在时返回 None"""
+    stream = stream_service.get_by_id(session, stream_id)
+    if stream is None:
+        return None
+    return job_manager.submit(session, stream)
+
+
+def load_result(job: StreamJob) -> Optional[dict]:
+    """读取任务结果, 任务未成功时返回 None"""
+    if job.status != "succeeded" or not job.result_path:
+        return None
+    return json.loads(s3_operator.read(job.result_path))
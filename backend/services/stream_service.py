@@ -1,19 +1,60 @@
+import json
 from typing import Any, Dict, List, Optional
 
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from common import PaginatedRequest
-from models.api.stream import CreateStreamRequest
+from models.api.stream import CreateStreamRequest, StreamRoiRequest
 from models.db.scenario.scenario import Scenario
 from models.db.stream.stream import Stream
 from models.db.stream.stream_crud import StreamCrud
+from models.db.stream.stream_roi_crud import StreamRoiCrud
+from services import video_service
 
 
 def get_by_id(session: Session, id: int) -> Optional[Stream]:
     return StreamCrud.get_by_id(session, id)
 
 
+def get_roi(session: Session, stream_id: int) -> List[List[List[float]]]:
+    """获取数据流的感兴趣区域多边形, 未设置时返回空列表"""
+    return [
+        json.loads(roi.points)
+        for roi in StreamRoiCrud.get_by_stream_id(session, stream_id)
+    ]
+
+
+def set_roi(
+    session: Session, stream_id: int, req: StreamRoiRequest
+) -> Optional[List[List[List[float]]]]:
+    """
+    设置数据流的感兴趣区域, 替换已有区域; polygons 为空时清除区域
+
+    Returns:
+        数据流不存在时返回 None
+    """
+    if StreamCrud.get_by_id(session, stream_id) is None:
+        return None
+
+    names = req.names or []
+    rois = []
+    for i, polygon in enumerate(req.polygons):
+        if len(polygon) < 3:
+            raise ValueError(f"第 {i + 1} 个区域顶点数少于 3 个")
+        if any(len(p) != 2 or not all(0 <= v <= 1 for v in p) for p in polygon):
+            raise ValueError(f"第 {i + 1} 个区域的顶点须为 [0,1] 范围内的 [x, y]")
+        rois.append(
+            {
+                "name": names[i] if i < len(names) else None,
+                "points": json.dumps(polygon),
+            }
+        )
+
+    StreamRoiCrud.replace(session, stream_id, rois)
+    return req.polygons
+
+
 def group(session: Session) -> dict:
     stream_type_counts = (
         session.query(Stream.stream_type, func.count(Stream.id).label("count"))
@@ -66,9 +107,19 @@ def create_stream(req: CreateStreamRequest, session: Session) -> int:
     }
 
     stream = StreamCrud.create(session, d)
+    video_service.retain(session, stream)
     return stream.id
 
 
+def delete(session: Session, id: int) -> bool:
+    """删除数据流, 并释放其引用的上传文件"""
+    stream = StreamCrud.get_by_id(session, id)
+    if stream is None or not StreamCrud.soft_delete(session, id):
+        return False
+    video_service.release(session, stream)
+    return True
+
+
 def count(session) -> int:
     return StreamCrud.count(session)
 
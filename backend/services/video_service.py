@@ -0,0 +1,223 @@
+""" 视频上传与元数据
+
+上传的视频按块流式写入 S3 (OpenDAL 分段上传), 同时计算 SHA-256 并写入本地副本,
+内存占用只与块大小和并发分段数有关。上传完成后用本地副本探测视频元数据并保存,
+本地副本放入视频缓存, 首次分析不必再从 S3 下载。
+
+文件按 SHA-256 去重, 内容相同的上传共用一个 S3 对象。数据流创建时引用计数加一,
+删除时减一, 计数归零后才删除 S3 对象, 删除一个数据流不影响共用该文件的其他数据流。
+上传时先预占一次引用, 数据流创建时转为正式引用, 避免数据流创建前文件被其他数据流的
+删除操作一并删除; 超时仍未创建数据流的预占引用由定时任务清除。
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+import cv2
+from fastapi import UploadFile
+from sqlalchemy.orm import Session
+
+from common import logger, s3_operator, settings, video_cache
+from models.db.stream.stream import Stream
+from models.db.stream.video_file import VideoFile
+from models.db.stream.video_file_crud import VideoFileCrud
+
+_MB = 1024 * 1024
+_MIN_PART_MB = 5  # S3 分段上传除最后一段外每段至少 5MB
+
+
+def probe_video(local_path: str) -> dict:
+    """
+    读取视频元数据
+
+    Returns:
+        dict: fps / width / height / frame_count / duration / codec, 无法解码时返回空 dict
+    """
+    video = cv2.VideoCapture(local_path)
+    try:
+        if not video.isOpened():
+            return {}
+        fps = video.get(cv2.CAP_PROP_FPS)
+        frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        fourcc = int(video.get(cv2.CAP_PROP_FOURCC))
+        codec = "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4))
+        return {
+            "fps": fps or None,
+            "width": int(video.get(cv2.CAP_PROP_FRAME_WIDTH)) or None,
+            "height": int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)) or None,
+            "frame_count": frame_count or None,
+            "duration": frame_count / fps if fps and frame_count else None,
+            "codec": codec.strip("\x00 ") or None,
+        }
+    finally:
+        video.release()
+
+
+def _consume(sha256, local: BinaryIO, chunk: bytes) -> None:
+    sha256.update(chunk)
+    local.write(chunk)
+
+
+async def _delete_object(operator, s3_path: str) -> None:
+    try:
+        await operator.delete(s3_path)
+    except Exception as e:
+        logger.warning(f"删除 S3 对象失败: {s3_path}, {e}")
+
+
+async def upload_video(session: Session, file: UploadFile) -> Tuple[VideoFile, bool]:
+    """
+    流式上传视频, 文件名使用 UUID + 原始文件后缀
+
+    上传的同时计算 SHA-256, 内容与已有文件相同时删除刚上传的对象, 返回已有文件,
+    后续创建的数据流指向同一个 S3 对象, 分析结果也可以复用。
+
+    Args:
+        session: 数据库会话
+        file: 上传的文件
+
+    Returns:
+        (上传记录, 是否与已有文件重复), 上传记录包含 S3 路径、SHA-256 和视频元数据
+    """
+    suffix = Path(file.filename).suffix.lower() if file.filename else ""
+    s3_path = f"{uuid.uuid4()}{suffix}"
+    chunk_size = max(_MIN_PART_MB, settings.s3_upload_chunk_mb) * _MB
+    operator = s3_operator.to_async_operator()
+    local_file = video_cache.temp_file(suffix)
+    sha256 = hashlib.sha256()
+    size = 0
+
+    try:
+        writer = await operator.open(
+            s3_path,
+            "wb",
+            chunk=chunk_size,
+            concurrent=max(1, settings.s3_upload_concurrency),
+        )
+        try:
+            with open(local_file, "wb") as local:
+                while True:
+                    chunk = await file.read(chunk_size)
+                    if not chunk:
+                        break
+                    await asyncio.to_thread(_consume, sha256, local, chunk)
+                    await writer.write(chunk)
+                    size += len(chunk)
+        finally:
+            await writer.close()
+
+        digest = sha256.hexdigest()
+        # 已有文件在预占引用前被删除时按新文件处理
+        video = VideoFileCrud.get_by_sha256(session, digest)
+        if video is not None:
+            video = VideoFileCrud.add_pending_ref(session, video.id)
+        if video is None:
+            meta = await asyncio.to_thread(probe_video, local_file)
+            row = {"path": s3_path, "sha256": digest, "size": size, **meta}
+            video = VideoFileCrud.create(session, {**row, "pending_refs": 1})
+            # 相同内容同时上传时各自插入了记录, 以最早的记录为准
+            earliest = VideoFileCrud.get_by_sha256(session, digest)
+            if earliest.id != video.id:
+                reserved = VideoFileCrud.add_pending_ref(session, earliest.id)
+                if reserved is not None:
+                    VideoFileCrud.soft_delete(session, video.id)
+                    video = reserved
+    except BaseException:
+        if os.path.exists(local_file):
+            os.remove(local_file)
+        await _delete_object(operator, s3_path)
+        raise
+
+    duplicated = video.path != s3_path
+    if duplicated:
+        await _delete_object(operator, s3_path)
+        logger.info(f"上传的文件与 {video.path} 内容相同 (sha256={digest}), 复用已有文件")
+    else:
+        # loguru 会再次格式化消息, 不能直接输出 dict 中的花括号
+        fields = ", ".join(f"{key}={value}" for key, value in meta.items())
+        logger.info(
+            f"视频上传完成: {s3_path}, {size / _MB:.1f} MB, sha256={digest}, {fields}"
+        )
+
+    try:
+        await asyncio.to_thread(video_cache.add, video.path, local_file)
+    except Exception as e:
+        logger.warning(f"本地副本放入视频缓存失败: {e}")
+        if os.path.exists(local_file):
+            os.remove(local_file)
+    return video, duplicated
+
+
+def get_video_file(session: Session, stream: Stream) -> Optional[VideoFile]:
+    """数据流对应的上传记录, 非上传的文件 (例如 rtsp 流) 返回 None"""
+    if stream.stream_type != "file" or not stream.stream_path:
+        return None
+    return VideoFileCrud.get_by_path(session, stream.stream_path)
+
+
+def get_video_meta(session: Session, stream: Stream) -> Optional[dict]:
+    """数据流的视频元数据, 没有上传记录时返回 None"""
+    video = get_video_file(session, stream)
+    if video is None:
+        return None
+    return {
+        "fps": video.fps,
+        "width": video.width,
+        "height": video.height,
+        "frame_count": video.frame_count,
+        "duration": video.duration,
+        "codec": video.codec,
+        "size": video.size,
+        "sha256": video.sha256,
+    }
+
+
+def retain(session: Session, stream: Stream) -> None:
+    """数据流创建后, 对其引用的上传文件增加一次引用, 并消耗上传时的预占引用"""
+    video = get_video_file(session, stream)
+    if video is not None:
+        VideoFileCrud.attach(session, video.id)
+
+
+def _remove_unreferenced(session: Session, video: VideoFile) -> bool:
+    """没有数据流引用也没有预占引用时删除上传记录和 S3 对象"""
+    if not VideoFileCrud.soft_delete_unreferenced(session, video.id):
+        return False
+    try:
+        s3_operator.delete(video.path)
+        logger.info(f"上传文件已无数据流引用, 删除 S3 对象: {video.path}")
+    except Exception as e:
+        logger.warning(f"删除 S3 对象失败: {video.path}, {e}")
+    return True
+
+
+def release(session: Session, stream: Stream) -> None:
+    """数据流删除后释放其引用的上传文件, 没有其他数据流引用时删除 S3 对象"""
+    video = get_video_file(session, stream)
+    if video is None:
+        return
+    video = VideoFileCrud.add_ref(session, video.id, -1)
+    if video is not None:
+        _remove_unreferenced(session, video)
+
+
+def expire_uploads(session: Session) -> int:
+    """
+    清除超时仍未创建数据流的预占引用, 没有数据流引用的文件随之删除
+
+    Returns:
+        int: 删除的文件数
+    """
+    before = int(time.time()) - settings.video_upload_ttl_min * 60
+    removed = 0
+    for video in VideoFileCrud.clear_pending_refs(session, before):
+        if _remove_unreferenced(session, video):
+            removed += 1
+    if removed:
+        logger.info(f"清除超时未创建数据流的上传文件 {removed} 个")
+    return removed
@@ -0,0 +1,97 @@
+"""
+跳帧检测性能对比: detect_stride=1 与 detect_stride=k
+
+报告处理帧率的提升, 以及与逐帧检测相比轨迹的变化
+(轨迹数量、平均时长、按时间重叠匹配后的每秒 bbox IoU)。
+
+用法: cd backend && python tests/bench_detect_stride.py ../resources/video.mp4 3
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import ai.algo_1 as algo_1
+from ai._basic import AlgoConfig
+
+
+def run_local(video_path: str, stride: int):
+    """对本地视频执行分析, 返回 (耗时, Algo_1 实例)"""
+    # 直接读取本地视频, 不经过 S3 和视频缓存
+    algo = algo_1.Algo_1(
+        video_path, config=AlgoConfig(detect_stride=stride), local_path=video_path
+    )
+
+    start = time.perf_counter()
+    for message in algo.analyze():
+        print(f"  [stride={stride}] {message}")
+    elapsed = time.perf_counter() - start
+    return elapsed, algo
+
+
+def box_iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def frame_overlap(a, b) -> float:
+    """两条轨迹在时间上的 IoU"""
+    inter = min(a.end_frame, b.end_frame) - max(a.start_frame, b.start_frame) + 1
+    if inter <= 0:
+        return 0.0
+    return inter / (a.get_duration() + b.get_duration() - inter)
+
+
+def compare_tracks(reference, candidate):
+    """按时间重叠贪心匹配轨迹, 返回 (匹配率, 平均每秒 bbox IoU)"""
+    ref = list(reference.values())
+    cand = list(candidate.values())
+    used = set()
+    matched, ious = 0, []
+    for a in sorted(ref, key=lambda o: -o.get_duration()):
+        best, best_score = None, 0.5
+        for i, b in enumerate(cand):
+            if i in used:
+                continue
+            score = frame_overlap(a, b)
+            if score > best_score:
+                best, best_score = i, score
+        if best is None:
+            continue
+        used.add(best)
+        matched += 1
+        b = cand[best]
+        for box_a, box_b in zip(a.bndbox_per_sec, b.bndbox_per_sec):
+            ious.append(box_iou(box_a, box_b))
+    rate = matched / len(ref) if ref else 1.0
+    return rate, float(np.mean(ious)) if ious else 0.0
+
+
+if __name__ == "__main__":
+    video_path = sys.argv[1] if len(sys.argv) > 1 else "../resources/video.mp4"
+    stride = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    base_time, base = run_local(video_path, 1)
+    stride_time, strided = run_local(video_path, stride)
+
+    def summary(name, elapsed, algo):
+        durations = [o.get_duration() for o in algo.global_info.values()]
+        print(
+            f"{name}: {algo.frame_count / elapsed:.1f} fps, "
+            f"检测 {algo.detected_frames}/{algo.frame_count} 帧, "
+            f"{len(durations)} 条轨迹, 平均时长 {np.mean(durations or [0]):.1f} 帧"
+        )
+
+    print()
+    summary("stride=1", base_time, base)
+    summary(f"stride={stride}", stride_time, strided)
+    rate, iou = compare_tracks(base.global_info, strided.global_info)
+    print(f"加速比: {base_time / stride_time:.2f}x")
+    print(f"轨迹匹配率: {rate:.2%}, 每秒 bbox 平均 IoU: {iou:.3f}")
@@ -0,0 +1,104 @@
+"""
+合并候选搜索性能对比: 逐对比较 (itertools.combinations) vs 网格 + 矩阵乘法
+
+用法: cd backend && python tests/bench_merge_candidates.py 10000
+"""
+
+import os
+import sys
+import time
+from itertools import combinations
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from ai.algo_1 import (ToBeMergedCadidate,
+                       merge_candidates_by_similarity_and_bbox)
+
+
+def legacy_merge_candidates(global_info, candidates, sim_threshold=0.85):
+    """旧实现: 两两比对"""
+    objs = list(global_info.values())
+    objs.sort(key=lambda o: o.start_frame)
+
+    def bbox_center(bbox):
+        x1, y1, x2, y2 = bbox
+        return (0.5 * (x1 + x2), 0.5 * (y1 + y2))
+
+    for obj_a, obj_b in combinations(objs, 2):
+        end_a = obj_a.end_frame if obj_a.end_frame is not None else obj_a.start_frame
+        start_b = (
+            obj_b.start_frame if obj_b.start_frame is not None else obj_b.end_frame
+        )
+        if start_b <= end_a:
+            continue
+        center_a = bbox_center(obj_a.bounding_box)
+        center_b = bbox_center(obj_b.bounding_box)
+        dist = (
+            (center_a[0] - center_b[0]) ** 2 + (center_a[1] - center_b[1]) ** 2
+        ) ** 0.5
+        if dist > 50:
+            continue
+        v_a = getattr(obj_a, "embed_vector", None)
+        v_b = getattr(obj_b, "embed_vector", None)
+        if v_a is None or v_b is None:
+            continue
+        cos_sim = np.dot(v_a, v_b) / (np.linalg.norm(v_a) * np.linalg.norm(v_b) + 1e-6)
+        if cos_sim < sim_threshold:
+            continue
+        tbm = ToBeMergedCadidate(obj_b.object_id, obj_a.object_id)
+        tbm.similarity = cos_sim
+        tbm.dist = dist
+        candidates.add(tbm)
+
+
+def make_global_info(n: int, seed: int = 0, dim: int = 64, identities: int = 300):
+    """
+    生成 n 条模拟轨迹: 每条轨迹属于某个身份, 同一身份的向量相近;
+    一小时视频 (25fps), 1920x1080 画面
+    """
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(identities, dim)).astype(np.float32)
+    global_info = {}
+    for i in range(n):
+        identity = rng.integers(identities)
+        vec = centroids[identity] + 0.3 * rng.normal(size=dim).astype(np.float32)
+        vec /= np.linalg.norm(vec)
+        start = int(rng.integers(0, 25 * 3600))
+        cx, cy = rng.uniform(0, 1920), rng.uniform(0, 1080)
+        w, h = rng.uniform(30, 120), rng.uniform(80, 300)
+        global_info[i] = SimpleNamespace(
+            object_id=i,
+            start_frame=start,
+            end_frame=start + int(rng.integers(1, 25 * 30)),
+            bounding_box=(cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2),
+            embed_vector=vec,
+        )
+    return global_info
+
+
+def timed(fn, global_info):
+    candidates = set()
+    start = time.perf_counter()
+    fn(global_info, candidates)
+    return time.perf_counter() - start, candidates
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    # 小规模下校验两种实现结果一致
+    small = make_global_info(min(n, 2000))
+    legacy_time, legacy = timed(legacy_merge_candidates, small)
+    new_time, new = timed(merge_candidates_by_similarity_and_bbox, small)
+    print(f"{len(small)} 条轨迹: 旧实现 {legacy_time:.2f}s, 新实现 {new_time:.3f}s")
+    print(f"  候选数 {len(legacy)} / {len(new)}, 结果一致: {legacy == new}")
+
+    global_info = make_global_info(n)
+    new_time, new = timed(merge_candidates_by_similarity_and_bbox, global_info)
+    # 旧实现为 O(N²), 按小规模耗时估算
+    estimated = legacy_time * (n / len(small)) ** 2
+    print(f"{n} 条轨迹: 新实现 {new_time:.3f}s, 旧实现约 {estimated:.1f}s (估算)")
+    print(f"  候选数 {len(new)}")
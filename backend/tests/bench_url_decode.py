@@ -0,0 +1,188 @@
+"""
+视频输入方式对比: 下载到本地缓存后解码 vs 从 URL 直接解码
+
+以支持 Range 请求的本地 HTTP 文件服务器模拟 S3 (可限速模拟网络带宽),
+分别统计两种方式的首帧检测耗时 (time-to-first-detection) 和总耗时, 并比较轨迹数量。
+
+- cache: 先流式下载完整文件 (与视频缓存相同的分块下载), 再从本地文件分析
+- url: Algo_1 直接从 http 地址解码, FFmpeg 按需发起 range 请求
+
+也可以对接已配置的 S3 (例如 MinIO), 按 AlgoConfig.input_mode 分别以 cache / url 方式分析:
+    cd backend && python tests/bench_url_decode.py --s3 <s3 路径>
+
+用法:
+    cd backend && python tests/bench_url_decode.py ../resources/video.mp4
+    cd backend && python tests/bench_url_decode.py ../resources/video.mp4 --mbps 20
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from ai._basic import AlgoConfig
+from ai.algo_1 import Algo_1
+
+_BLOCK = 64 * 1024
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """支持单段 Range 请求和限速的静态文件服务"""
+
+    bytes_per_second = 0  # 0 表示不限速
+    served_bytes = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return super().send_head()
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.match(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else size - 1
+            else:
+                start = size - int(match.group(2))
+            end = min(end, size - 1)
+            if start > end:
+                self.send_error(416)
+                return None
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        f = open(path, "rb")
+        f.seek(start)
+        self._remaining = end - start + 1
+        return f
+
+    def copyfile(self, source, outputfile):
+        remaining = getattr(self, "_remaining", None)
+        started = time.perf_counter()
+        sent = 0
+        while remaining is None or remaining > 0:
+            data = source.read(_BLOCK if remaining is None else min(_BLOCK, remaining))
+            if not data:
+                break
+            try:
+                outputfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                break
+            sent += len(data)
+            RangeRequestHandler.served_bytes += len(data)
+            if remaining is not None:
+                remaining -= len(data)
+            if self.bytes_per_second:
+                delay = sent / self.bytes_per_second - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+
+def serve(directory: str, mbps: float) -> ThreadingHTTPServer:
+    RangeRequestHandler.bytes_per_second = mbps * 1024 * 1024 / 8
+
+    def handler(*args, **kwargs):
+        return RangeRequestHandler(*args, directory=directory, **kwargs)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(algo: Algo_1, label: str, offset: float = 0.0):
+    """执行分析, 返回 (首帧检测耗时, 总耗时)"""
+    start = time.perf_counter()
+    for message in algo.analyze():
+        print(f"  [{label}] {message}")
+    elapsed = time.perf_counter() - start
+    return offset + algo.first_detection_seconds, offset + elapsed
+
+
+def bench_http(video_path: str, mbps: float):
+    directory, name = os.path.split(os.path.abspath(video_path))
+    server = serve(directory, mbps)
+    url = f"http://127.0.0.1:{server.server_port}/{name}"
+    size_mb = os.path.getsize(video_path) / 1024 / 1024
+    bandwidth = f"{mbps} Mbps" if mbps else "不限速"
+    print(f"视频 {name}, {size_mb:.1f} MB, HTTP 服务器 {bandwidth}")
+
+    results = {}
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        # cache: 先完整下载, 再分析本地文件
+        local = os.path.join(tmp_dir, name)
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as src, open(local, "wb") as dst:
+            shutil.copyfileobj(src, dst, 8 * 1024 * 1024)
+        download = time.perf_counter() - start
+        algo = Algo_1(url, config=AlgoConfig(), local_path=local)
+        results["cache"] = (*run(algo, "cache", download), len(algo.global_info))
+        print(f"  [cache] 下载耗时 {download:.2f}s")
+
+        # url: 直接解码
+        RangeRequestHandler.served_bytes = 0
+        algo = Algo_1(url, config=AlgoConfig())
+        assert algo.input_mode == "url", algo.input_mode
+        results["url"] = (*run(algo, "url"), len(algo.global_info))
+        print(f"  [url] 读取 {RangeRequestHandler.served_bytes / 1024 / 1024:.1f} MB")
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    report(results)
+
+
+def bench_s3(s3_path: str):
+    from common import video_cache
+
+    results = {}
+    cached, size = video_cache.lookup(s3_path)
+    print(f"视频 {s3_path}, {size / 1024 / 1024:.1f} MB, 已缓存: {cached}")
+    if cached:
+        print("视频已在本地缓存中, cache 方式的耗时不包含下载, 清空缓存目录后重新运行")
+    for mode in ("cache", "url"):
+        algo = Algo_1(s3_path, config=AlgoConfig(input_mode=mode))
+        results[algo.input_mode] = (*run(algo, mode), len(algo.global_info))
+    report(results)
+
+
+def report(results: dict):
+    print(f"{'输入方式':<8}{'首帧检测(s)':>12}{'总耗时(s)':>12}{'轨迹数':>8}")
+    for mode, (first, total, tracks) in results.items():
+        print(f"{mode:<12}{first:>12.2f}{total:>12.2f}{tracks:>8}")
+    if {"cache", "url"} <= results.keys():
+        cache, url = results["cache"], results["url"]
+        print(
+            f"url 相比 cache: 首帧检测提前 {cache[0] - url[0]:.2f}s, "
+            f"总耗时 {cache[1] / url[1]:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video", nargs="?", help="本地视频文件, 通过本地 HTTP 服务器读取")
+    parser.add_argument("--mbps", type=float, default=0, help="HTTP 服务器限速 (Mbps)")
+    parser.add_argument("--s3", help="改为读取已配置 S3 中的视频")
+    args = parser.parse_args()
+    if args.s3:
+        bench_s3(args.s3)
+    elif args.video:
+        bench_http(args.video, args.mbps)
+    else:
+        parser.print_help()
@@ -0,0 +1,94 @@
+"""
+实时流自适应质量控制测试
+
+1. 质量等级: 从全质量开始逐级降低, 每级只调整一项, 最低一级达到配置的边界
+2. 控制器: 过载时逐级降低, 负载下降后逐级恢复到全质量;
+   恢复后立即又过载时, 下一次恢复需要等待更多周期
+
+用法: cd backend && python tests/test_adaptive_quality.py
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from ai._quality import QualityController, QualityLevel, build_quality_levels
+
+TARGET = 2.0
+OVERLOADED = dict(lag=1.9, dropped=5, utilization=1.0, backlog=1.0)
+IDLE = dict(lag=0.1, dropped=0, utilization=0.3, backlog=0.0)
+BUSY = dict(lag=0.5, dropped=0, utilization=0.8, backlog=0.1)  # 跟得上, 但不宜提高质量
+
+
+def test_levels():
+    full = QualityLevel(analysis_height=0, detect_stride=1, reid_interval_sec=1)
+    levels = build_quality_levels(full, 1080, 360, 4, 4)
+    assert levels[0] == full
+    assert levels[-1] == QualityLevel(
+        analysis_height=360, detect_stride=4, reid_interval_sec=4
+    ), levels[-1]
+    for higher, lower in zip(levels, levels[1:]):
+        changed = [
+            name
+            for name in QualityLevel.model_fields
+            if getattr(higher, name) != getattr(lower, name)
+        ]
+        assert len(changed) == 1, (higher, lower)
+    assert levels[1].reid_interval_sec == 2, "首先降低 ReID 刷新频率"
+
+    # 配置已是最低质量时只有一级
+    bounded = QualityLevel(analysis_height=360, detect_stride=4, reid_interval_sec=4)
+    assert build_quality_levels(bounded, 1080, 360, 4, 4) == [bounded]
+    # 原始分辨率低于下限时不调整分辨率
+    small = build_quality_levels(QualityLevel(), 240, 360, 2, 1)
+    assert [lv.analysis_height for lv in small] == [0, 0]
+    print(f"✓ 质量等级: 共 {len(levels)} 级, 每级只调整一项")
+    for i, level in enumerate(levels):
+        print(f"  {i}: {level}")
+
+
+def run(controller: QualityController, windows: list) -> list:
+    return [controller.update(**w) is not None and controller.level for w in windows]
+
+
+def test_controller():
+    levels = build_quality_levels(QualityLevel(), 1080, 360, 4, 4)
+    controller = QualityController(levels, TARGET, recover_windows=3)
+
+    # 过载时每两个周期降低一级 (调整后的周期只观察不调整), 直到最低一级
+    run(controller, [OVERLOADED] * (2 * len(levels) + 2))
+    assert controller.level == len(levels) - 1
+    # 负载适中时保持不变
+    run(controller, [BUSY] * 10)
+    assert controller.level == len(levels) - 1
+
+    # 负载下降后, 每 3 个低负载周期 + 1 个观察周期恢复一级
+    changes = run(controller, [IDLE] * 4)
+    assert changes == [False, False, len(levels) - 2, False], changes
+    run(controller, [IDLE] * 4 * (len(levels) - 2))
+    assert controller.level == 0
+
+    # 恢复后立即过载: 降回去, 下一次恢复需要 6 个周期
+    controller = QualityController(levels, TARGET, recover_windows=3)
+    run(controller, [OVERLOADED])
+    assert controller.level == 1
+    run(controller, [IDLE] * 4)
+    assert controller.level == 0
+    run(controller, [OVERLOADED] * 2)
+    assert controller.level == 1
+    run(controller, [IDLE] * 6)
+    assert controller.level == 1
+    run(controller, [IDLE])
+    assert controller.level == 0
+    # 这次恢复后负载正常, 之后再过载时恢复周期数回到 3
+    run(controller, [IDLE, IDLE, OVERLOADED, IDLE, IDLE, IDLE])
+    assert controller.level == 1
+    run(controller, [IDLE])
+    assert controller.level == 0
+    print("✓ 控制器: 过载时逐级降低, 负载下降后逐级恢复, 恢复失败时延长恢复等待")
+
+
+if __name__ == "__main__":
+    test_levels()
+    test_controller()
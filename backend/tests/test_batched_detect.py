@@ -0,0 +1,207 @@
+"""
+多路流合并检测测试
+
+用模拟的检测模型 (每次推理有固定开销, 另加每帧耗时) 验证共享批量检测服务:
+1. 结果分发: 每路流取回的检测结果对应自己提交的帧, 顺序不变
+2. 合并推理: 多路流同时检测时合并成批, 总吞吐高于各路流分别推理
+3. 公平性: 某一路流每次提交更多帧时, 其他流的检测帧数不受挤占
+4. 最大等待: 只有部分流在检测时, 请求最多等待 max_delay 后即推理
+
+也可以用真实模型比较 N 路流分别推理与合并推理的吞吐:
+    cd backend && python tests/test_batched_detect.py --real ../resources/video.mp4 16
+
+用法: cd backend && python tests/test_batched_detect.py
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import supervision as sv
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from ai._batch_detect import BatchedDetector
+
+OVERHEAD = 0.02  # 每次推理的固定开销 (秒)
+PER_FRAME = 0.002  # 每帧耗时 (秒)
+
+
+class FakeModel:
+    """检测框的 x1 等于帧的标记值, 用来核对结果是否分发回正确的流"""
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, frames):
+        with self.lock:
+            self.calls += 1
+            time.sleep(OVERHEAD + PER_FRAME * len(frames))
+        return [
+            sv.Detections(xyxy=np.array([[f[0, 0], 0, 1, 1]], dtype=np.float32))
+            for f in frames
+        ]
+
+
+def mark(stream: int, index: int) -> np.ndarray:
+    return np.full((2, 2), stream * 100000 + index, dtype=np.float32)
+
+
+def run_streams(
+    detect, streams: int, seconds: float, frames_per_call=None, make=mark, check=True
+):
+    """各路流循环提交检测, 返回每路流完成的帧数"""
+    frames_per_call = frames_per_call or [1] * streams
+    counts = [0] * streams
+    stop = threading.Event()
+    errors = []
+
+    def worker(stream: int):
+        index = 0
+        while not stop.is_set():
+            n = frames_per_call[stream]
+            frames = [make(stream, index + i) for i in range(n)]
+            results = detect(stream, frames)
+            if check:
+                got = [int(det.xyxy[0, 0]) for det in results]
+                if got != [stream * 100000 + index + i for i in range(n)]:
+                    errors.append((stream, index, got))
+            index += n
+            counts[stream] += n
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(streams)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    assert not errors, errors[:3]
+    return counts
+
+
+def test_throughput(streams: int = 8, seconds: float = 2.0):
+    model = FakeModel()
+    separate = run_streams(lambda s, frames: model(frames), streams, seconds)
+
+    model = FakeModel()
+    shared = BatchedDetector(model, max_batch=streams, max_delay=0.05)
+    ids = [shared.register() for _ in range(streams)]
+    batched = run_streams(
+        lambda s, frames: shared.detect(ids[s], frames), streams, seconds
+    )
+    stats = shared.stats()
+    for stream_id in ids:
+        shared.unregister(stream_id)
+
+    assert stats["avg_batch"] > streams / 2, stats
+    assert sum(batched) > 2 * sum(separate), (batched, separate)
+    print(
+        f"✓ {streams} 路流: 分别推理 {sum(separate) / seconds:.0f} 帧/s, "
+        f"合并推理 {sum(batched) / seconds:.0f} 帧/s, "
+        f"平均每批 {stats['avg_batch']} 帧, 平均等待 {stats['avg_wait_ms']}ms, "
+        f"结果均分发回对应的流"
+    )
+
+
+def test_fairness(streams: int = 4, seconds: float = 2.0):
+    """第 0 路流每次提交 8 帧, 其余每次 1 帧, 批大小只有 4"""
+    model = FakeModel()
+    shared = BatchedDetector(model, max_batch=4, max_delay=0.05)
+    ids = [shared.register() for _ in range(streams)]
+    counts = run_streams(
+        lambda s, frames: shared.detect(ids[s], frames),
+        streams,
+        seconds,
+        frames_per_call=[8] + [1] * (streams - 1),
+    )
+    for stream_id in ids:
+        shared.unregister(stream_id)
+    calls = [c / n for c, n in zip(counts, [8] + [1] * (streams - 1))]
+    # 大请求单独成批, 小请求的流不会被饿死, 各路流完成的请求数相近
+    assert min(calls) > 0.5 * max(calls), calls
+    print(f"✓ 公平性: 各路流完成的检测请求数 {[int(c) for c in calls]}")
+
+
+def test_max_delay():
+    """注册 4 路流但只有 1 路在检测, 每个请求最多等待 max_delay"""
+    model = FakeModel()
+    shared = BatchedDetector(model, max_batch=16, max_delay=0.03)
+    ids = [shared.register() for _ in range(4)]
+    waits = []
+    for i in range(10):
+        start = time.perf_counter()
+        shared.detect(ids[0], [mark(0, i)])
+        waits.append(time.perf_counter() - start - OVERHEAD - PER_FRAME)
+    for stream_id in ids[1:]:
+        shared.unregister(stream_id)
+    # 只剩一路流注册时不必等待
+    start = time.perf_counter()
+    shared.detect(ids[0], [mark(0, 10)])
+    alone = time.perf_counter() - start - OVERHEAD - PER_FRAME
+    shared.unregister(ids[0])
+    assert 0.02 < np.mean(waits) < 0.05, waits
+    assert alone < 0.01, alone
+    print(
+        f"✓ 最大等待: 平均等待 {np.mean(waits) * 1000:.0f}ms (max_delay 30ms), "
+        f"所有注册的流都在等待时立即推理 ({alone * 1000:.1f}ms)"
+    )
+
+
+def bench_real(video_path: str, streams: int, seconds: float = 20.0):
+    """真实模型: N 路流各自推理 vs 合并推理, 每路流读取同一个视频"""
+    import cv2
+
+    from ai._basic import AlgoConfig
+    from ai.algo_1 import load_yolo_model, run_detector
+
+    config = AlgoConfig()
+    model = load_yolo_model()
+    video = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < 64:
+        ret, frame = video.read()
+        if not ret:
+            break
+        frames.append(frame)
+    video.release()
+
+    def infer(batch):
+        return run_detector(model, batch, config.detect_imgsz, config.detect_classes)
+
+    def make(stream: int, index: int) -> np.ndarray:
+        return frames[(stream * 7 + index) % len(frames)]
+
+    infer(frames[:1])
+    separate = run_streams(
+        lambda s, batch: infer(batch), streams, seconds, make=make, check=False
+    )
+    shared = BatchedDetector(infer, max_batch=streams)
+    ids = [shared.register() for _ in range(streams)]
+    batched = run_streams(
+        lambda s, batch: shared.detect(ids[s], batch),
+        streams,
+        seconds,
+        make=make,
+        check=False,
+    )
+    print(
+        f"{streams} 路流, 真实模型: 分别推理 {sum(separate) / seconds:.1f} 帧/s, "
+        f"合并推理 {sum(batched) / seconds:.1f} 帧/s, {shared.stats()}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--real", nargs=2, metavar=("VIDEO", "STREAMS"))
+    args = parser.parse_args()
+    if args.real:
+        bench_real(args.real[0], int(args.real[1]))
+    else:
+        test_throughput()
+        test_fairness()
+        test_max_delay()
@@ -0,0 +1,73 @@
+"""
+分析进程池测试
+
+1. 启动后全部工作进程已创建并完成预热, 缓存统计接口立即返回各进程已加载的模型
+2. 工作进程异常退出后进程池被重建, 之后提交的任务在新的工作进程中正常执行
+
+用法: cd backend && python tests/test_job_workers.py
+"""
+
+import asyncio
+import importlib
+import os
+import sys
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from services import job_service
+
+# routers 包把 stream_router 这个名字导出为 APIRouter, 这里需要的是模块
+stream_router = importlib.import_module("routers.stream_router")
+
+WORKERS = 2
+REID_MODEL = "resnet50_market1501_aicity156.onnx"
+
+
+def start_manager() -> job_service.JobManager:
+    # 不重新提交数据库中未结束的任务
+    job_service.get_sync_session = lambda: SimpleNamespace(close=lambda: None)
+    job_service.StreamJobCrud = SimpleNamespace(list_active=lambda session: [])
+    manager = job_service.JobManager(max_workers=WORKERS)
+    manager.start()
+    return manager
+
+
+def test_warm_start():
+    manager = start_manager()
+    try:
+        stream_router.job_manager = manager
+        response = asyncio.run(stream_router.get_cache_stats_handler())
+        assert response.code == 200, response.message
+        models = response.data["models"]
+        assert len(models) == WORKERS, models
+        if os.path.exists(REID_MODEL):
+            assert all(stats["models"] for stats in models.values()), models
+        else:
+            print(f"- 未找到 {REID_MODEL}, 只检查各工作进程已启动并上报")
+        print(f"✓ 启动后 {len(models)} 个工作进程已预热: {models}")
+    finally:
+        manager.shutdown()
+
+
+def test_broken_pool():
+    manager = start_manager()
+    try:
+        pids = {stats["pid"] for stats in manager.model_stats().values()}
+        try:
+            manager._submit(os._exit, 1).result()
+            raise AssertionError("工作进程退出后任务应失败")
+        except BrokenProcessPool:
+            pass
+
+        pid = manager._submit(os.getpid).result(timeout=600)
+        assert pid not in pids, (pid, pids)
+        print(f"✓ 工作进程异常退出后进程池已重建, 新任务在进程 {pid} 中执行")
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    test_warm_start()
+    test_broken_pool()
@@ -0,0 +1,269 @@
+"""
+实时流输入测试
+
+1. 环形缓冲区: 写满时丢弃最旧的帧, 关闭后读完剩余帧再结束
+2. 采集线程: 以本地视频按固定帧率模拟实时流, 消费速度慢于采集速度时,
+   缓冲区丢弃最旧的帧, 采集不被阻塞, 每帧从采集到处理的延迟不超过缓冲区容量对应的时长
+3. 本地 RTSP 流: 采集线程以 listen 模式打开 RTSP 地址充当服务端, FFmpeg 按实时速度推流,
+   验证网络流同样丢弃最旧的帧且延迟有界; 找不到 ffmpeg 时跳过
+4. RTSP (手动): 对真实的 RTSP 流运行 Algo_1, 打印周期推送的轨迹和丢帧、延迟统计
+
+本地 RTSP 流也可以用 mediamtx 加 FFmpeg 推流模拟:
+    ./mediamtx &
+    ffmpeg -re -stream_loop -1 -i ../resources/video.mp4 -c copy -f rtsp rtsp://127.0.0.1:8554/live
+
+用法:
+    cd backend && python tests/test_live_stream.py
+    cd backend && python tests/test_live_stream.py rtsp://127.0.0.1:8554/live 30
+"""
+
+import contextlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from ai._live import FrameRingBuffer, LiveReader, open_capture
+
+FPS = 50
+FRAMES = 150
+
+
+def make_video(path: str, frames: int = FRAMES, size=(160, 120)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, size)
+    for i in range(frames):
+        frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        cv2.putText(frame, str(i), (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (255,) * 3)
+        writer.write(frame)
+    writer.release()
+
+
+@contextlib.contextmanager
+def temp_video():
+    tmp = tempfile.mkdtemp()
+    try:
+        video_path = os.path.join(tmp, "live.avi")
+        make_video(video_path)
+        yield video_path
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def rtsp_stand_in(video_path: str):
+    """
+    用 FFmpeg 在本地模拟 RTSP 摄像头, 没有 ffmpeg 时返回 None
+
+    读取端以 listen 模式打开 RTSP 地址充当服务端, FFmpeg 按实时速度推流到该地址。
+
+    Returns:
+        (RTSP 地址, 已打开的 VideoCapture)
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        yield None
+        return
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        url = f"rtsp://127.0.0.1:{s.getsockname()[1]}/live"
+    command = [
+        ffmpeg,
+        "-loglevel",
+        "error",
+        "-re",
+        "-i",
+        video_path,
+        "-c:v",
+        "mpeg4",
+        "-rtsp_transport",
+        "tcp",
+        "-f",
+        "rtsp",
+        url,
+    ]
+
+    opened = {}
+    option = "OPENCV_FFMPEG_CAPTURE_OPTIONS"
+    previous = os.environ.get(option)
+    os.environ[option] = "rtsp_flags;listen|listen_timeout;10"
+    listener = threading.Thread(
+        target=lambda: opened.setdefault("video", open_capture(url, 10000))
+    )
+    publisher = None
+    try:
+        try:
+            listener.start()
+            # 推流可能早于读取端开始监听, 连接失败时重新推流
+            deadline = time.monotonic() + 10
+            while listener.is_alive() and time.monotonic() < deadline:
+                if publisher is None or publisher.poll() is not None:
+                    publisher = subprocess.Popen(command, stdin=subprocess.DEVNULL)
+                listener.join(0.2)
+            listener.join()
+        finally:
+            if previous is None:
+                os.environ.pop(option)
+            else:
+                os.environ[option] = previous
+        assert opened["video"].isOpened(), "无法打开本地 RTSP 流"
+        yield url, opened["video"]
+    finally:
+        if publisher is not None:
+            publisher.kill()
+            publisher.wait()
+
+
+def test_ring_buffer():
+    buffer = FrameRingBuffer(3)
+    for i in range(1, 6):
+        buffer.put((i, 0.0, None))
+    assert buffer.dropped == 2 and len(buffer) == 3
+    assert [buffer.get()[0] for _ in range(3)] == [3, 4, 5]
+
+    start = time.perf_counter()
+    assert buffer.get(timeout=0.1) is None
+    assert time.perf_counter() - start >= 0.09
+
+    buffer.put((6, 0.0, None))
+    buffer.close()
+    assert not buffer.finished
+    assert buffer.get()[0] == 6
+    assert buffer.get(timeout=1) is None and buffer.finished
+
+    # 关闭时唤醒正在等待的读取方
+    buffer = FrameRingBuffer(1)
+    threading.Timer(0.1, buffer.close).start()
+    start = time.perf_counter()
+    assert buffer.get(timeout=5) is None
+    assert time.perf_counter() - start < 1
+    print("✓ 环形缓冲区: 写满丢弃最旧的帧, 关闭后读完剩余帧")
+
+
+def consume(buffer: FrameRingBuffer, consume_seconds: float):
+    """每帧处理 consume_seconds 秒直到缓冲区结束, 返回处理的帧号和每帧的延迟"""
+    frame_ids, lags = [], []
+    while True:
+        item = buffer.get(timeout=1)
+        if item is None:
+            if buffer.finished:
+                break
+            continue
+        frame_id, captured_at, frame = item
+        frame_ids.append(frame_id)
+        lags.append(time.monotonic() - captured_at)
+        time.sleep(consume_seconds)
+    return frame_ids, lags
+
+
+def check_reader(video_path: str, stride: int = 1, consume_seconds: float = 0.05):
+    """采集 FPS 帧/秒, 每帧处理 consume_seconds 秒, 处理速度只有采集速度的一半"""
+    latency = 0.2
+    capacity = max(1, round(latency * FPS / stride))
+    buffer = FrameRingBuffer(capacity)
+    reader = LiveReader(
+        video_path,
+        cv2.VideoCapture(video_path),
+        buffer,
+        stride=stride,
+        reconnect_attempts=0,
+        realtime_fps=FPS,
+    )
+    start = time.perf_counter()
+    reader.start()
+    frame_ids, lags = consume(buffer, consume_seconds)
+    elapsed = time.perf_counter() - start
+    reader.join()
+
+    assert reader.frame_id == FRAMES, reader.frame_id
+    assert frame_ids == sorted(frame_ids) and len(set(frame_ids)) == len(frame_ids)
+    assert all(i % stride == 1 % stride for i in frame_ids), frame_ids
+    assert buffer.dropped > 0
+    assert len(frame_ids) + buffer.dropped == len(range(1, FRAMES + 1, stride))
+    # 采集不被消费方阻塞: 总耗时接近视频时长, 而不是按处理速度处理完所有帧的时长
+    assert elapsed < FRAMES / FPS + capacity * consume_seconds + 1, elapsed
+    # 缓冲区中最多排队 capacity 帧, 延迟不超过处理完这些帧的时间
+    max_lag = max(lags)
+    assert max_lag <= (capacity + 1) * consume_seconds + 0.1, max_lag
+    print(
+        f"✓ 采集线程 (stride={stride}): 采集 {reader.frame_id} 帧, "
+        f"处理 {len(frame_ids)} 帧, 丢弃 {buffer.dropped} 帧, 耗时 {elapsed:.2f}s, "
+        f"延迟 平均 {np.mean(lags) * 1000:.0f}ms / 最大 {max_lag * 1000:.0f}ms"
+    )
+
+
+def test_reader():
+    with temp_video() as video_path:
+        check_reader(video_path)
+        check_reader(video_path, stride=2, consume_seconds=0.1)
+
+
+def test_rtsp_reader():
+    """FFmpeg 按实时速度推送 RTSP 流, 处理速度只有推流速度的一半"""
+    consume_seconds = 0.05
+    capacity = round(0.2 * FPS)
+    with temp_video() as video_path, rtsp_stand_in(video_path) as stand_in:
+        if stand_in is None:
+            print("- 未找到 ffmpeg, 跳过本地 RTSP 流测试")
+            return
+        url, video = stand_in
+        buffer = FrameRingBuffer(capacity)
+        reader = LiveReader(url, video, buffer, reconnect_attempts=0)
+        start = time.perf_counter()
+        reader.start()
+        frame_ids, lags = consume(buffer, consume_seconds)
+        elapsed = time.perf_counter() - start
+        reader.join()
+
+    # 推流结束后采集线程读取失败, 不重连, 关闭缓冲区
+    assert reader.frame_id > FRAMES // 2, reader.frame_id
+    assert frame_ids == sorted(frame_ids) and len(set(frame_ids)) == len(frame_ids)
+    assert buffer.dropped > 0
+    assert len(frame_ids) + buffer.dropped == reader.frame_id
+    assert elapsed < FRAMES / FPS + capacity * consume_seconds + 2, elapsed
+    max_lag = max(lags)
+    assert max_lag <= (capacity + 1) * consume_seconds + 0.1, max_lag
+    print(
+        f"✓ 本地 RTSP 流 {url}: 采集 {reader.frame_id} 帧, 处理 {len(frame_ids)} 帧, "
+        f"丢弃 {buffer.dropped} 帧, 耗时 {elapsed:.2f}s, "
+        f"延迟 平均 {np.mean(lags) * 1000:.0f}ms / 最大 {max_lag * 1000:.0f}ms"
+    )
+
+
+def run_rtsp(url: str, seconds: float):
+    """对 RTSP 流运行完整的分析, seconds 秒后取消"""
+    from ai._basic import AlgoConfig
+    from ai.algo_1 import Algo_1
+
+    algo = Algo_1(url, config=AlgoConfig())
+    assert algo.input_mode == "live", algo.input_mode
+    timer = threading.Timer(seconds, algo.cancel)
+    timer.start()
+    try:
+        for message in algo.analyze():
+            print(f"  {message}")
+    finally:
+        timer.cancel()
+    print(
+        f"实时流分析结束: 共 {algo.frame_count} 帧, 对象 {len(algo.global_info)} 个, "
+        f"缓冲区满丢弃 {algo.live_buffer.dropped} 帧, "
+        f"超过目标延迟丢弃 {algo.live_stale_frames} 帧"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_rtsp(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 30)
+        sys.exit(0)
+
+    test_ring_buffer()
+    test_reader()
+    test_rtsp_reader()
@@ -0,0 +1,182 @@
+"""
+分段并行分析的拼接测试
+
+1. 合成数据: 按单进程分析的输出 (每个行人一条轨迹) 模拟各分段子进程的输出,
+   拼接后应与单进程结果完全一致 (轨迹数量、起止帧、每秒 bbox)
+2. 真实视频: 分别以单进程和分段并行方式分析同一视频 (默认 resources/video.mp4, 不存在时跳过),
+   报告加速比以及按时间重叠匹配的轨迹匹配率和每秒 bbox IoU
+
+用法:
+    cd backend && python tests/test_segment_stitching.py
+    cd backend && python tests/test_segment_stitching.py ../resources/video.mp4 8
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from ai._segments import plan_segments, stitch_segments
+
+FPS = 25
+VIDEO_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "resources", "video.mp4"
+)
+
+
+def make_people(n: int, frame_count: int, seed: int = 0, dim: int = 64):
+    """生成 n 个行人: 匀速移动, 部分行人中途短暂消失 (不超过 tracker 丢失缓冲)"""
+    rng = np.random.default_rng(seed)
+    people = []
+    for _ in range(n):
+        start = int(rng.integers(1, frame_count - 200))
+        end = min(frame_count, start + int(rng.integers(100, 3000)))
+        frames = np.arange(start, end + 1)
+        if rng.random() < 0.3:
+            gap_start = int(rng.integers(start, end))
+            gap = int(rng.integers(5, 2 * FPS))
+            frames = frames[(frames < gap_start) | (frames >= gap_start + gap)]
+        x, y = rng.uniform(100, 1700), rng.uniform(100, 900)
+        vx, vy = rng.uniform(-1, 1, size=2)
+        embed = rng.normal(size=dim).astype(np.float32)
+        people.append(
+            {
+                "frames": frames,
+                "x": x + vx * (frames - start),
+                "y": y + vy * (frames - start),
+                "embed": embed / np.linalg.norm(embed),
+            }
+        )
+    return people
+
+
+def box_at(person: dict, i: int):
+    x, y = person["x"][i], person["y"][i]
+    return (float(x - 20), float(y - 50), float(x + 20), float(y + 50))
+
+
+def single_process(people):
+    """单进程的结果: 每个行人一条轨迹, 每秒整秒帧记录一次 bbox"""
+    result = []
+    for person in people:
+        frames = person["frames"]
+        per_sec = [box_at(person, i) for i, f in enumerate(frames) if f % FPS == 0]
+        boxes = np.array(per_sec, np.float32).reshape(-1, 4)
+        result.append((int(frames[0]), int(frames[-1]), boxes))
+    return sorted(result, key=lambda r: (r[0], r[1]))
+
+
+def simulate_segment(people, frame_range, overlap, rng):
+    """模拟一个分段子进程的 export_segment() 输出"""
+    start, end = frame_range
+    end = end if end is not None else 10**9
+    tracklets = []
+    for tid, person in enumerate(people):
+        idx = [i for i, f in enumerate(person["frames"]) if start < f <= end]
+        if not idx:
+            continue
+        frames = person["frames"][idx]
+        per_sec = [box_at(person, i) for i in idx if person["frames"][i] % FPS == 0]
+        overlap_boxes = {
+            int(person["frames"][i]): box_at(person, i)
+            for i in idx
+            if (start > 0 and person["frames"][i] <= start + overlap)
+            or person["frames"][i] > end - overlap
+        }
+        tail_entries = sum(
+            1
+            for i in idx
+            if person["frames"][i] % FPS == 0 and person["frames"][i] > end - overlap
+        )
+        noise = rng.normal(scale=0.05, size=person["embed"].shape).astype(np.float32)
+        tracklets.append(
+            {
+                "object_id": tid,
+                "start_frame": int(frames[0]),
+                "end_frame": int(frames[-1]),
+                "bounding_box": box_at(person, idx[0]),
+                "current_bounding_box": box_at(person, idx[-1]),
+                "bndbox_per_sec": np.array(per_sec, np.float32).reshape(-1, 4),
+                "embed_vector": person["embed"] + noise,
+                "cover": None,
+                "images": [],
+                "crop_nbytes": [],
+                "overlap_boxes": overlap_boxes,
+                "tail_entries": tail_entries,
+            }
+        )
+    # 各分段的 tracker id 互不相关
+    rng.shuffle(tracklets)
+    return {"frame_range": frame_range, "tracklets": tracklets}
+
+
+def test_synthetic(workers: int = 8, minutes: int = 30, people: int = 400):
+    frame_count = FPS * 60 * minutes
+    overlap = 3 * FPS
+    rng = np.random.default_rng(1)
+    persons = make_people(people, frame_count)
+    segments = plan_segments(frame_count, workers, overlap, 60 * FPS)
+    results = [simulate_segment(persons, r, overlap, rng) for r in segments]
+
+    stitched, total = stitch_segments(results, overlap, max_gap=2 * FPS)
+    expected = single_process(persons)
+    actual = sorted(
+        [(s["start_frame"], s["end_frame"], s["bndbox_per_sec"]) for s in stitched],
+        key=lambda r: (r[0], r[1]),
+    )
+
+    assert len(actual) == len(expected), (len(actual), len(expected))
+    for (s0, e0, b0), (s1, e1, b1) in zip(expected, actual):
+        assert (s0, e0) == (s1, e1), ((s0, e0), (s1, e1))
+        assert b0.shape == b1.shape and np.allclose(b0, b1), (s0, e0)
+    summary = f"{total} 条分段轨迹拼接为 {len(actual)} 条"
+    print(f"✓ 合成数据: {len(segments)} 段, {summary}, 与单进程结果一致")
+
+
+def test_video():
+    if not os.path.exists(VIDEO_PATH):
+        print(f"跳过真实视频测试: 未找到 {VIDEO_PATH}")
+        return
+    run_video(VIDEO_PATH, 2)
+
+
+def run_video(video_path: str, workers: int):
+    from bench_detect_stride import compare_tracks
+
+    from ai._basic import AlgoConfig
+    from ai.algo_1 import Algo_1
+
+    def run(config):
+        algo = Algo_1(video_path, config=config, local_path=video_path)
+        start = time.perf_counter()
+        for message in algo.analyze():
+            print(f"  [segment_workers={config.segment_workers}] {message}")
+        return time.perf_counter() - start, algo
+
+    single_time, single = run(AlgoConfig())
+    # 测试视频较短时也按 workers 分段
+    parallel_time, parallel = run(
+        AlgoConfig(segment_workers=workers, min_segment_sec=5)
+    )
+
+    rate, iou = compare_tracks(single.global_info, parallel.global_info)
+    print(
+        f"单进程 {single_time:.1f}s, {len(single.global_info)} 条轨迹; "
+        f"分段并行 {parallel_time:.1f}s, {len(parallel.global_info)} 条轨迹; "
+        f"加速比 {single_time / parallel_time:.2f}x"
+    )
+    print(f"轨迹匹配率: {rate:.2%}, 每秒 bbox 平均 IoU: {iou:.3f}")
+    assert rate >= 0.9, rate
+    print("✓ 分段并行结果与单进程结果一致")
+
+
+if __name__ == "__main__":
+    test_synthetic()
+    if len(sys.argv) > 1:
+        run_video(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 8)
+    else:
+        test_video()
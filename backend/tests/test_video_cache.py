@@ -0,0 +1,195 @@
+"""
+视频本地缓存测试
+
+用本地目录模拟 S3 (只实现 stat / open), 验证:
+1. 顺序分块下载与并行 range 下载的文件内容一致, 重复获取直接命中缓存
+2. 多个线程同时获取同一视频只下载一次
+3. 超出容量时按最近使用时间淘汰, 正在使用的文件不会被淘汰
+
+用法: cd backend && python tests/test_video_cache.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from common._video_cache import VideoCache
+
+KB = 1024
+
+
+class LocalOperator:
+    """以本地目录模拟 S3, 统计读取的字节数和打开次数"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.opened = 0
+        self.read_bytes = 0
+        self._lock = threading.Lock()
+
+    def stat(self, path: str):
+        full = os.path.join(self.root, path)
+        size = os.path.getsize(full)
+        etag = f'"{size}-{os.path.getmtime(full)}"'
+        return SimpleNamespace(content_length=size, etag=etag)
+
+    def open(self, path: str, mode: str):
+        operator = self
+
+        class Reader:
+            def __init__(self):
+                self.f = open(os.path.join(operator.root, path), mode)
+
+            def read(self, size=None):
+                time.sleep(0.001)  # 模拟网络延迟
+                data = self.f.read(size)
+                with operator._lock:
+                    operator.read_bytes += len(data)
+                return data
+
+            def seek(self, pos, whence=0):
+                return self.f.seek(pos, whence)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.f.close()
+
+        with self._lock:
+            self.opened += 1
+        return Reader()
+
+
+def make_video(root: str, name: str, size: int) -> bytes:
+    data = os.urandom(size)
+    with open(os.path.join(root, name), "wb") as f:
+        f.write(data)
+    return data
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def in_temp_dirs(check) -> None:
+    """在临时的模拟 S3 目录和缓存目录中执行检查"""
+    tmp = tempfile.mkdtemp()
+    try:
+        s3_root = os.path.join(tmp, "s3")
+        os.makedirs(s3_root)
+        check(s3_root, os.path.join(tmp, "cache"))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def check_download(s3_root: str, cache_root: str):
+    operator = LocalOperator(s3_root)
+    small = make_video(s3_root, "small.mp4", 300 * KB)
+    large = make_video(s3_root, "large.mp4", 5000 * KB + 123)
+    cache = VideoCache(
+        cache_root,
+        max_bytes=100 * 1024 * KB,
+        chunk_size=1024 * KB,
+        parallel_threshold=1024 * KB,
+        parallel_workers=4,
+        operator=operator,
+    )
+
+    with cache.open("small.mp4") as path:
+        assert read(path) == small
+    with cache.open("large.mp4") as path:
+        assert read(path) == large
+        assert path.endswith(".mp4")
+    # large.mp4 按 1MB 分为 5 块并行下载
+    assert operator.opened == 1 + 5, operator.opened
+
+    downloaded = operator.read_bytes
+    with cache.open("large.mp4") as path:
+        assert read(path) == large
+    assert operator.read_bytes == downloaded
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert not [name for name in os.listdir(cache_root) if name.endswith(".part")]
+    print(f"✓ 分块下载与并行 range 下载内容一致, 重复获取命中缓存: {cache.stats()}")
+
+
+def check_concurrent(s3_root: str, cache_root: str):
+    operator = LocalOperator(s3_root)
+    data = make_video(s3_root, "shared.mp4", 3000 * KB)
+    cache = VideoCache(
+        cache_root,
+        max_bytes=100 * 1024 * KB,
+        chunk_size=1024 * KB,
+        parallel_threshold=1024 * KB,
+        operator=operator,
+    )
+
+    def analyze(_):
+        path = cache.acquire("shared.mp4")
+        try:
+            return read(path) == data
+        finally:
+            cache.release(path)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert all(executor.map(analyze, range(8)))
+    assert operator.read_bytes == len(data), operator.read_bytes
+    print("✓ 8 个线程同时获取同一视频, 只下载一次")
+
+
+def check_eviction(s3_root: str, cache_root: str):
+    operator = LocalOperator(s3_root)
+    for name in ["a.mp4", "b.mp4", "c.mp4"]:
+        make_video(s3_root, name, 400 * KB)
+    cache = VideoCache(
+        cache_root,
+        max_bytes=1000 * KB,
+        chunk_size=1024 * KB,
+        operator=operator,
+    )
+
+    held = cache.acquire("a.mp4")  # a 一直在使用
+    with cache.open("b.mp4") as path_b:
+        pass
+    time.sleep(0.01)
+    # 容量只够两个文件: c 下载前淘汰 b (a 最久未使用但正在使用)
+    with cache.open("c.mp4"):
+        pass
+    assert os.path.exists(held)
+    assert not os.path.exists(path_b)
+    assert cache.evictions == 1
+
+    cache.release(held)
+    time.sleep(0.01)
+    with cache.open("b.mp4"):
+        pass
+    # a 释放后成为最久未使用的文件
+    assert not os.path.exists(held)
+    assert cache.evictions == 2
+    print(f"✓ 超出容量时淘汰最久未使用且未被引用的文件: {cache.stats()}")
+
+
+def test_download():
+    in_temp_dirs(check_download)
+
+
+def test_concurrent():
+    in_temp_dirs(check_concurrent)
+
+
+def test_eviction():
+    in_temp_dirs(check_eviction)
+
+
+if __name__ == "__main__":
+    test_download()
+    test_concurrent()
+    test_eviction()
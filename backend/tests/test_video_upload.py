@@ -0,0 +1,220 @@
+"""
+视频流式上传测试
+
+用本地目录模拟 S3 分段上传, 验证:
+1. 上传内容与原文件一致, SHA-256 正确, 每次写入不超过一个分段大小
+2. 探测到的视频元数据 (fps、分辨率、帧数、编码) 与生成的视频一致
+3. 本地副本已放入视频缓存, 首次分析不再下载
+4. 再次上传相同内容时复用已有文件, 刚上传的对象被删除
+5. 上传后预占引用, 数据流创建前不会被其他数据流的删除操作删除, 超时后才被清除
+
+用法: cd backend && python tests/test_video_upload.py
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from test_video_cache import LocalOperator
+
+import services.video_service as video_service
+from common._video_cache import VideoCache
+
+
+class LocalAsyncOperator:
+    """以本地目录模拟 S3 的异步写入, 记录每次写入的大小"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.writes = []
+
+    async def open(self, path: str, mode: str, **options):
+        operator = self
+        f = open(os.path.join(self.root, path), mode)
+
+        class Writer:
+            async def write(self, bs: bytes):
+                operator.writes.append(len(bs))
+                f.write(bs)
+
+            async def close(self):
+                f.close()
+
+        return Writer()
+
+    async def delete(self, path: str):
+        os.remove(os.path.join(self.root, path))
+
+
+class MemoryVideoFileCrud:
+    """内存中的 VideoFileCrud"""
+
+    def __init__(self):
+        self.rows = []
+
+    def create(self, session, obj: dict):
+        row = SimpleNamespace(
+            id=len(self.rows) + 1,
+            is_deleted=0,
+            ref_count=0,
+            updated_at=int(time.time()),
+            **obj,
+        )
+        self.rows.append(row)
+        return row
+
+    def get_by_path(self, session, path: str):
+        rows = [r for r in self.rows if r.path == path and not r.is_deleted]
+        return rows[0] if rows else None
+
+    def get_by_sha256(self, session, sha256: str):
+        rows = [r for r in self.rows if r.sha256 == sha256 and not r.is_deleted]
+        return rows[0] if rows else None
+
+    def _update(self, id: int, **deltas):
+        row = self.rows[id - 1]
+        if row.is_deleted:
+            return None
+        for key, delta in deltas.items():
+            setattr(row, key, max(0, getattr(row, key) + delta))
+        row.updated_at = int(time.time())
+        return row
+
+    def add_ref(self, session, id: int, delta: int):
+        return self._update(id, ref_count=delta)
+
+    def add_pending_ref(self, session, id: int):
+        return self._update(id, pending_refs=1)
+
+    def attach(self, session, id: int):
+        return self._update(id, ref_count=1, pending_refs=-1)
+
+    def clear_pending_refs(self, session, before: int):
+        rows = [
+            r
+            for r in self.rows
+            if not r.is_deleted and r.pending_refs > 0 and r.updated_at < before
+        ]
+        for row in rows:
+            row.pending_refs = 0
+        return rows
+
+    def soft_delete_unreferenced(self, session, id: int):
+        row = self.rows[id - 1]
+        if row.is_deleted or row.ref_count > 0 or row.pending_refs > 0:
+            return False
+        row.is_deleted = 1
+        return True
+
+    def soft_delete(self, session, id: int):
+        self.rows[id - 1].is_deleted = 1
+        return True
+
+
+class FakeUpload:
+    """与 fastapi.UploadFile 相同的异步读取接口"""
+
+    def __init__(self, path: str):
+        self.filename = os.path.basename(path)
+        self.file = open(path, "rb")
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+
+def make_video(path: str, fps: int = 25, frames: int = 100, size=(320, 240)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    rng = np.random.default_rng(0)
+    for _ in range(frames):
+        writer.write(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8))
+    writer.release()
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    try:
+        s3_root = os.path.join(tmp, "s3")
+        os.makedirs(s3_root)
+        source = os.path.join(tmp, "video.avi")
+        make_video(source)
+
+        async_operator = LocalAsyncOperator(s3_root)
+        cache = VideoCache(
+            os.path.join(tmp, "cache"), 10 * 1024**3, operator=LocalOperator(s3_root)
+        )
+        video_service.s3_operator = SimpleNamespace(
+            to_async_operator=lambda: async_operator,
+            delete=lambda path: os.remove(os.path.join(s3_root, path)),
+        )
+        video_service.video_cache = cache
+        video_service.settings = SimpleNamespace(
+            s3_upload_chunk_mb=5, s3_upload_concurrency=4, video_upload_ttl_min=60
+        )
+        crud = MemoryVideoFileCrud()
+        video_service.VideoFileCrud = crud
+
+        video, duplicated = asyncio.run(
+            video_service.upload_video(None, FakeUpload(source))
+        )
+        assert not duplicated
+
+        with open(source, "rb") as f:
+            data = f.read()
+        with open(os.path.join(s3_root, video.path), "rb") as f:
+            assert f.read() == data
+        assert video.sha256 == hashlib.sha256(data).hexdigest()
+        assert video.size == len(data)
+        assert max(async_operator.writes) <= 5 * 1024 * 1024
+        print(
+            f"✓ 上传 {len(data) / 1024 / 1024:.1f} MB, 分 {len(async_operator.writes)} "
+            f"次写入, SHA-256 正确"
+        )
+
+        assert (video.fps, video.width, video.height) == (25, 320, 240), video
+        assert video.frame_count == 100 and video.codec == "MJPG", video
+        assert abs(video.duration - 4.0) < 1e-6
+        print(f"✓ 视频元数据: {vars(video)}")
+
+        with cache.open(video.path) as local_path:
+            assert os.path.getsize(local_path) == len(data)
+        assert (cache.hits, cache.misses) == (1, 0)
+        print("✓ 本地副本已放入视频缓存, 首次分析无需下载")
+
+        again, duplicated = asyncio.run(
+            video_service.upload_video(None, FakeUpload(source))
+        )
+        assert duplicated and again.path == video.path
+        assert os.listdir(s3_root) == [video.path]
+        assert len(crud.rows) == 1 and video.pending_refs == 2
+        print("✓ 再次上传相同内容, 复用已有文件, 不产生新的 S3 对象")
+
+        # 第一次上传创建了数据流并删除, 第二次上传尚未创建数据流
+        stream = SimpleNamespace(stream_type="file", stream_path=video.path)
+        video_service.retain(None, stream)
+        video_service.release(None, stream)
+        assert (video.ref_count, video.pending_refs, video.is_deleted) == (0, 1, 0)
+        assert os.listdir(s3_root) == [video.path]
+        assert video_service.expire_uploads(None) == 0
+        print("✓ 数据流创建前文件不会被其他数据流的删除操作删除")
+
+        video.updated_at -= 2 * 3600
+        assert video_service.expire_uploads(None) == 1
+        assert video.is_deleted and os.listdir(s3_root) == []
+        print("✓ 超时仍未创建数据流的上传文件被清除")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()